@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+AI 분석 캐시 보존 정책, 압축, DB 용량 관리
+
+perplexity_analysis 테이블을 기간/종목별 개수 기준으로 정리하고,
+기존 평문 행을 압축하며, VACUUM으로 DB 파일 크기를 줄입니다.
+현재 시그널(signal_state)에 해당하는 분석은 보존 정책과 무관하게 유지합니다.
+
+사용 예:
+    python3 analysis_cache_retention.py --report
+    python3 analysis_cache_retention.py --max-age-days 180 --keep-per-ticker 5 --compress --vacuum
+"""
+
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Optional
+
+from perplexity_analyzer import (
+    decode_analysis_text,
+    decode_citations,
+    encode_analysis_text,
+    encode_citations,
+)
+
+DB_FILE = "stock_data.db"
+
+# 기본 보존 정책 (환경변수, 비어 있으면 적용 안 함)
+ANALYSIS_RETENTION_DAYS = os.getenv('ANALYSIS_RETENTION_DAYS')
+ANALYSIS_RETENTION_PER_TICKER = os.getenv('ANALYSIS_RETENTION_PER_TICKER')
+
+
+def _protected_condition() -> str:
+    """현재 시그널에 해당하는 분석은 삭제하지 않는 조건"""
+    return '''
+        NOT EXISTS (
+            SELECT 1 FROM signal_state s
+            WHERE s.ticker = perplexity_analysis.ticker
+              AND s.last_signal_date = perplexity_analysis.date
+        )
+    '''
+
+
+def _has_table(conn, name: str) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone()
+    return row is not None
+
+
+def apply_retention(
+    max_age_days: Optional[int] = None,
+    keep_per_ticker: Optional[int] = None,
+    dry_run: bool = False
+) -> dict:
+    """
+    보존 정책 적용
+
+    Args:
+        max_age_days: 시그널 날짜가 이 일수보다 오래된 분석 삭제
+        keep_per_ticker: 종목별로 최근 시그널 날짜 N개만 유지
+        dry_run: True면 삭제 대상 개수만 계산
+
+    Returns:
+        {'expired': 기간 초과 삭제 수, 'overflow': 개수 초과 삭제 수}
+    """
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+
+    protected = _protected_condition() if _has_table(conn, 'signal_state') else '1'
+    deleted = {'expired': 0, 'overflow': 0}
+
+    if max_age_days is not None:
+        cutoff = (datetime.now() - timedelta(days=max_age_days)).strftime('%Y-%m-%d')
+        where = f'date < ? AND {protected}'
+        if dry_run:
+            cursor.execute(f'SELECT COUNT(*) FROM perplexity_analysis WHERE {where}', (cutoff,))
+            deleted['expired'] = cursor.fetchone()[0]
+        else:
+            cursor.execute(f'DELETE FROM perplexity_analysis WHERE {where}', (cutoff,))
+            deleted['expired'] = cursor.rowcount
+
+    if keep_per_ticker is not None:
+        where = f'''
+            rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid,
+                           ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY date DESC) AS rank
+                    FROM perplexity_analysis
+                ) WHERE rank > ?
+            ) AND {protected}
+        '''
+        if dry_run:
+            cursor.execute(f'SELECT COUNT(*) FROM perplexity_analysis WHERE {where}', (keep_per_ticker,))
+            deleted['overflow'] = cursor.fetchone()[0]
+        else:
+            cursor.execute(f'DELETE FROM perplexity_analysis WHERE {where}', (keep_per_ticker,))
+            deleted['overflow'] = cursor.rowcount
+
+    conn.commit()
+    conn.close()
+    return deleted
+
+
+def compress_existing() -> int:
+    """압축 이전 형식(평문)으로 저장된 분석을 압축 형식으로 다시 저장"""
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        SELECT rowid, analysis, citations FROM perplexity_analysis
+        WHERE typeof(analysis) = 'text' OR typeof(citations) = 'text'
+    ''')
+    rows = cursor.fetchall()
+
+    updates = []
+    for rowid, analysis, citations in rows:
+        new_analysis = encode_analysis_text(decode_analysis_text(analysis))
+        new_citations = encode_citations(decode_citations(citations))
+        if new_analysis != analysis or new_citations != citations:
+            updates.append((new_analysis, new_citations, rowid))
+
+    cursor.executemany(
+        'UPDATE perplexity_analysis SET analysis = ?, citations = ? WHERE rowid = ?',
+        updates
+    )
+    conn.commit()
+    conn.close()
+    return len(updates)
+
+
+def compact(incremental: bool = False) -> tuple:
+    """
+    DB 파일 압축
+
+    Args:
+        incremental: True면 auto_vacuum=INCREMENTAL로 전환 후 빈 페이지만 반환
+            (최초 전환 시에는 전체 VACUUM 1회 필요)
+
+    Returns:
+        (압축 전 크기, 압축 후 크기) 바이트
+    """
+    before = os.path.getsize(DB_FILE)
+
+    conn = sqlite3.connect(DB_FILE)
+    if incremental:
+        mode = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+        if mode != 2:  # 2 = INCREMENTAL
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+        conn.execute('PRAGMA incremental_vacuum')
+        conn.commit()
+    else:
+        conn.execute('VACUUM')
+    conn.close()
+
+    return before, os.path.getsize(DB_FILE)
+
+
+def table_space_report() -> list:
+    """
+    테이블별 사용 공간 (인덱스 포함)
+
+    Returns:
+        [(테이블, 행 수, 바이트), ...] 큰 순서
+    """
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+
+    tables = [row[0] for row in cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+    )]
+
+    try:
+        cursor.execute('''
+            SELECT m.tbl_name, SUM(d.pgsize)
+            FROM dbstat d JOIN sqlite_master m ON m.name = d.name
+            GROUP BY m.tbl_name
+        ''')
+        sizes = dict(cursor.fetchall())
+    except sqlite3.OperationalError:
+        # dbstat 미지원 빌드
+        sizes = {}
+
+    report = []
+    for table in tables:
+        count = cursor.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+        report.append((table, count, sizes.get(table)))
+
+    conn.close()
+    return sorted(report, key=lambda r: r[2] or 0, reverse=True)
+
+
+def print_space_report():
+    """테이블별 사용 공간 출력"""
+    report = table_space_report()
+    file_size = os.path.getsize(DB_FILE)
+
+    print(f"{'테이블':<24}{'행 수':>10}{'크기':>14}")
+    print("-" * 48)
+    for table, count, size in report:
+        size_text = f"{size / 1024:,.1f} KB" if size is not None else "N/A"
+        print(f"{table:<24}{count:>10,}{size_text:>14}")
+    print("-" * 48)
+    print(f"{'파일 크기':<24}{'':>10}{file_size / 1024:>11,.1f} KB")
+
+
+def main():
+    """메인 함수"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='AI 분석 캐시 보존 정책 및 DB 용량 관리')
+    parser.add_argument('--max-age-days', type=int,
+                        default=int(ANALYSIS_RETENTION_DAYS) if ANALYSIS_RETENTION_DAYS else None,
+                        help='시그널 날짜 기준 보존 기간 (일)')
+    parser.add_argument('--keep-per-ticker', type=int,
+                        default=int(ANALYSIS_RETENTION_PER_TICKER) if ANALYSIS_RETENTION_PER_TICKER else None,
+                        help='종목별 보존할 최근 분석 개수')
+    parser.add_argument('--compress', action='store_true', help='평문으로 저장된 기존 분석 압축')
+    parser.add_argument('--vacuum', action='store_true', help='VACUUM으로 DB 파일 압축')
+    parser.add_argument('--incremental', action='store_true', help='--vacuum 시 incremental vacuum 사용')
+    parser.add_argument('--report', action='store_true', help='테이블별 사용 공간 출력')
+    parser.add_argument('--dry-run', action='store_true', help='삭제하지 않고 대상 개수만 출력')
+
+    args = parser.parse_args()
+
+    if args.max_age_days is not None or args.keep_per_ticker is not None:
+        deleted = apply_retention(args.max_age_days, args.keep_per_ticker, dry_run=args.dry_run)
+        label = "삭제 대상" if args.dry_run else "삭제"
+        print(f"🧹 보존 정책 {label}: 기간 초과 {deleted['expired']}개, 개수 초과 {deleted['overflow']}개")
+
+    if args.compress and not args.dry_run:
+        print(f"🗜️  압축 저장: {compress_existing()}개")
+
+    if args.vacuum and not args.dry_run:
+        before, after = compact(incremental=args.incremental)
+        print(f"📦 DB 크기: {before / 1024:,.1f} KB → {after / 1024:,.1f} KB")
+
+    has_policy = args.max_age_days is not None or args.keep_per_ticker is not None
+    if args.report or not (has_policy or args.compress or args.vacuum):
+        print_space_report()
+
+
+if __name__ == "__main__":
+    main()
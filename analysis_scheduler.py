@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+AI 분석 작업 우선순위 스케줄러
+
+최근 시그널, STRONG BUY/WARNING 상태, 즐겨찾기 그룹 종목을 먼저 분석하여
+시간 제한 안에서 가장 중요한 분석이 먼저 끝나도록 합니다.
+"""
+
+import heapq
+import time
+from datetime import datetime
+from typing import Callable, Optional
+
+from favorites_store import load_favorite_tickers
+
+# 우선순위 보너스 (시그널 경과 일수에서 차감되는 일수)
+URGENT_STATUS_BONUS_DAYS = 3    # STRONG BUY / WARNING
+FAVORITE_BONUS_DAYS = 5         # 즐겨찾기 그룹 종목
+
+URGENT_STATUSES = ('STRONG BUY', 'WARNING')
+
+
+def analysis_priority(task: dict, favorite_tickers: set, today: Optional[datetime] = None) -> float:
+    """
+    분석 작업 우선순위 점수 (낮을수록 먼저 처리)
+
+    시그널 경과 일수를 기준으로, 긴급 상태와 즐겨찾기 종목은 보너스 일수만큼 앞당깁니다.
+    """
+    today = today or datetime.now()
+    signal_date = datetime.strptime(task['date'], '%Y-%m-%d')
+    score = float((today - signal_date).days)
+
+    if task.get('status') in URGENT_STATUSES:
+        score -= URGENT_STATUS_BONUS_DAYS
+    if task['ticker'] in favorite_tickers:
+        score -= FAVORITE_BONUS_DAYS
+
+    return score
+
+
+class AnalysisQueue:
+    """우선순위 순서로 분석 작업을 꺼내는 큐"""
+
+    def __init__(self, favorite_tickers: Optional[set] = None):
+        self.favorite_tickers = load_favorite_tickers() if favorite_tickers is None else favorite_tickers
+        self._heap = []
+        self._today = datetime.now()
+
+    def push(self, task: dict):
+        """
+        작업 추가
+
+        Args:
+            task: {'ticker', 'date', 'signal_type', 'status'} 를 포함한 딕셔너리
+        """
+        score = analysis_priority(task, self.favorite_tickers, self._today)
+        heapq.heappush(self._heap, (score, task['ticker'], task))
+
+    def pop(self) -> dict:
+        """가장 우선순위가 높은 작업 꺼내기"""
+        return heapq.heappop(self._heap)[2]
+
+    def __len__(self):
+        return len(self._heap)
+
+    def run(
+        self,
+        worker: Callable[[dict], dict],
+        time_budget: Optional[float] = None,
+        on_result: Optional[Callable[[dict, dict], None]] = None
+    ) -> dict:
+        """
+        우선순위 순서로 작업 실행
+
+        평균 작업 시간을 추적하여 남은 시간 안에 끝낼 수 없는 작업은 시작하지 않습니다.
+
+        Args:
+            worker: 작업을 받아 결과 딕셔너리를 반환하는 함수
+            time_budget: 전체 시간 제한 (초, None이면 제한 없음)
+            on_result: 작업 완료마다 (task, result)로 호출되는 콜백
+
+        Returns:
+            {'completed': [...], 'skipped': [...], 'elapsed': 초}
+        """
+        start_time = time.time()
+        completed = []
+        avg_duration = None
+
+        while self._heap:
+            elapsed = time.time() - start_time
+            if time_budget is not None:
+                remaining = time_budget - elapsed
+                if remaining <= 0 or (avg_duration is not None and avg_duration > remaining):
+                    break
+
+            task = self.pop()
+            task_start = time.time()
+            result = worker(task)
+            duration = time.time() - task_start
+
+            # 지수이동평균으로 작업 시간 추정
+            avg_duration = duration if avg_duration is None else 0.7 * avg_duration + 0.3 * duration
+
+            completed.append((task, result))
+            if on_result:
+                on_result(task, result)
+
+        skipped = [self.pop() for _ in range(len(self._heap))]
+
+        return {
+            'completed': completed,
+            'skipped': skipped,
+            'elapsed': time.time() - start_time
+        }
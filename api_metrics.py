@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Perplexity API 호출 지표 기록 및 리포트
+
+StockAnalyzer의 모든 분석 요청(캐시 적중 포함)을 perplexity_call_metrics 테이블에 기록하고,
+지연시간 p50/p95, 캐시 적중률, 예상 비용, 오류 유형을 집계합니다.
+
+사용 예:
+    python3 api_metrics.py --days 30
+"""
+
+import math
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Optional
+
+from db_snapshot import READ_ONLY
+
+DB_FILE = "stock_data.db"
+
+# 요금 (USD, sonar 기준 기본값 - 환경변수로 조정)
+PRICE_INPUT_PER_M = float(os.getenv('PERPLEXITY_PRICE_INPUT_PER_M', '1.0'))
+PRICE_OUTPUT_PER_M = float(os.getenv('PERPLEXITY_PRICE_OUTPUT_PER_M', '1.0'))
+PRICE_PER_REQUEST = float(os.getenv('PERPLEXITY_PRICE_PER_REQUEST', '0.005'))
+
+# 호출 결과 구분
+OUTCOME_FRESH = 'fresh'
+OUTCOME_CACHED = 'cached'
+OUTCOME_REUSED = 'reused'
+OUTCOME_ERROR = 'error'
+
+
+def init_metrics_db():
+    """API 호출 지표 테이블 초기화"""
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS perplexity_call_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            called_at TEXT,
+            ticker TEXT,
+            date TEXT,
+            outcome TEXT,
+            latency_ms REAL,
+            http_status INTEGER,
+            prompt_tokens INTEGER,
+            completion_tokens INTEGER,
+            retries INTEGER,
+            error_class TEXT,
+            cost_usd REAL
+        )
+    ''')
+
+    conn.commit()
+    conn.close()
+
+
+def classify_error(exc: Optional[Exception] = None, http_status: Optional[int] = None) -> str:
+    """오류 유형 분류"""
+    if http_status == 429:
+        return 'rate_limited'
+    if http_status is not None and http_status >= 500:
+        return 'server_error'
+    if http_status is not None and http_status >= 400:
+        return 'client_error'
+    if exc is None:
+        return 'unknown'
+
+    import requests
+    if isinstance(exc, requests.exceptions.Timeout):
+        return 'timeout'
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        return 'connection'
+    if isinstance(exc, (KeyError, IndexError, ValueError)):
+        return 'parse_error'
+    return type(exc).__name__
+
+
+def estimate_cost(prompt_tokens: int, completion_tokens: int) -> float:
+    """토큰 사용량 기준 예상 비용 (USD)"""
+    return (
+        prompt_tokens * PRICE_INPUT_PER_M / 1_000_000
+        + completion_tokens * PRICE_OUTPUT_PER_M / 1_000_000
+        + PRICE_PER_REQUEST
+    )
+
+
+def record_api_call(
+    ticker: str,
+    date: str,
+    outcome: str,
+    latency_ms: float,
+    http_status: Optional[int] = None,
+    usage: Optional[dict] = None,
+    retries: int = 0,
+    error_class: Optional[str] = None
+):
+    """
+    분석 요청 1건의 지표 저장
+
+    Args:
+        outcome: fresh / cached / reused / error
+        usage: API 응답의 usage 블록 (prompt_tokens, completion_tokens)
+    """
+    prompt_tokens = (usage or {}).get('prompt_tokens') or 0
+    completion_tokens = (usage or {}).get('completion_tokens') or 0
+
+    # API 서버가 응답을 생성한 경우에만 비용 발생
+    if outcome == OUTCOME_FRESH or usage:
+        cost = estimate_cost(prompt_tokens, completion_tokens)
+    else:
+        cost = 0.0
+
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        conn.execute('''
+            INSERT INTO perplexity_call_metrics
+            (called_at, ticker, date, outcome, latency_ms, http_status,
+             prompt_tokens, completion_tokens, retries, error_class, cost_usd)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (datetime.now().isoformat(), ticker, date, outcome, latency_ms, http_status,
+              prompt_tokens, completion_tokens, retries, error_class, cost))
+        conn.commit()
+        conn.close()
+    except sqlite3.Error as e:
+        # 지표 기록 실패가 분석을 막지 않도록 함
+        print(f"Metrics Error: {e}")
+
+
+def percentile(values: list, pct: float) -> Optional[float]:
+    """nearest-rank 백분위수"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize_metrics(days: int = 30) -> dict:
+    """
+    최근 N일 호출 지표 집계
+
+    Returns:
+        {'total', 'fresh', 'cached', 'reused', 'errors', 'hit_ratio',
+         'p50_ms', 'p95_ms', 'retries', 'cost_usd', 'prompt_tokens',
+         'completion_tokens', 'error_classes': {...}, 'daily': [...]}
+    """
+    since = (datetime.now() - timedelta(days=days)).isoformat()
+
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT substr(called_at, 1, 10), outcome, latency_ms, retries,
+               error_class, cost_usd, prompt_tokens, completion_tokens
+        FROM perplexity_call_metrics
+        WHERE called_at >= ?
+        ORDER BY called_at
+    ''', (since,))
+    rows = cursor.fetchall()
+    conn.close()
+
+    counts = {OUTCOME_FRESH: 0, OUTCOME_CACHED: 0, OUTCOME_REUSED: 0, OUTCOME_ERROR: 0}
+    fresh_latencies = []
+    error_classes = {}
+    daily = {}
+    retries = 0
+    cost = 0.0
+    prompt_tokens = 0
+    completion_tokens = 0
+
+    for day, outcome, latency_ms, row_retries, error_class, row_cost, row_prompt, row_completion in rows:
+        counts[outcome] = counts.get(outcome, 0) + 1
+        retries += row_retries or 0
+        cost += row_cost or 0.0
+        prompt_tokens += row_prompt or 0
+        completion_tokens += row_completion or 0
+
+        if outcome == OUTCOME_FRESH and latency_ms is not None:
+            fresh_latencies.append(latency_ms)
+        if error_class:
+            error_classes[error_class] = error_classes.get(error_class, 0) + 1
+
+        day_stats = daily.setdefault(day, {'date': day, 'calls': 0, 'hits': 0, 'cost_usd': 0.0, 'latencies': []})
+        day_stats['calls'] += 1
+        day_stats['cost_usd'] += row_cost or 0.0
+        if outcome in (OUTCOME_CACHED, OUTCOME_REUSED):
+            day_stats['hits'] += 1
+        if outcome == OUTCOME_FRESH and latency_ms is not None:
+            day_stats['latencies'].append(latency_ms)
+
+    daily_list = []
+    for day_stats in daily.values():
+        latencies = day_stats.pop('latencies')
+        day_stats['p50_ms'] = percentile(latencies, 50)
+        day_stats['p95_ms'] = percentile(latencies, 95)
+        day_stats['hit_ratio'] = day_stats['hits'] / day_stats['calls']
+        daily_list.append(day_stats)
+
+    total = len(rows)
+    hits = counts[OUTCOME_CACHED] + counts[OUTCOME_REUSED]
+
+    return {
+        'total': total,
+        'fresh': counts[OUTCOME_FRESH],
+        'cached': counts[OUTCOME_CACHED],
+        'reused': counts[OUTCOME_REUSED],
+        'errors': counts[OUTCOME_ERROR],
+        'hit_ratio': hits / total if total else None,
+        'p50_ms': percentile(fresh_latencies, 50),
+        'p95_ms': percentile(fresh_latencies, 95),
+        'retries': retries,
+        'cost_usd': cost,
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'error_classes': error_classes,
+        'daily': daily_list
+    }
+
+
+def print_metrics_report(days: int = 30):
+    """호출 지표 리포트 출력"""
+    summary = summarize_metrics(days)
+
+    print("="*80)
+    print(f"📊 Perplexity API 호출 지표 (최근 {days}일)")
+    print("="*80)
+
+    if not summary['total']:
+        print("\n❌ 기록된 호출이 없습니다.")
+        return
+
+    def fmt_ms(value):
+        return f"{value:,.0f}ms" if value is not None else "-"
+
+    print(f"\n총 요청: {summary['total']:,}")
+    print(f"  - 신규 조회: {summary['fresh']:,}")
+    print(f"  - 캐시 적중: {summary['cached']:,}")
+    print(f"  - 분석 재사용: {summary['reused']:,}")
+    print(f"  - 오류: {summary['errors']:,}")
+    print(f"\n캐시 적중률: {summary['hit_ratio'] * 100:.1f}%")
+    print(f"지연시간 (신규 조회): p50 {fmt_ms(summary['p50_ms'])} / p95 {fmt_ms(summary['p95_ms'])}")
+    print(f"재시도: {summary['retries']:,}회")
+    print(f"토큰: 입력 {summary['prompt_tokens']:,} / 출력 {summary['completion_tokens']:,}")
+    print(f"예상 비용: ${summary['cost_usd']:.3f}")
+
+    if summary['error_classes']:
+        print("\n오류 유형:")
+        for error_class, count in sorted(summary['error_classes'].items(), key=lambda x: -x[1]):
+            print(f"  - {error_class}: {count}")
+
+    print(f"\n{'날짜':<12}{'요청':>6}{'적중률':>9}{'p50':>10}{'p95':>10}{'비용':>10}")
+    print("-" * 57)
+    for day in summary['daily']:
+        print(f"{day['date']:<12}{day['calls']:>6}{day['hit_ratio'] * 100:>8.0f}%"
+              f"{fmt_ms(day['p50_ms']):>10}{fmt_ms(day['p95_ms']):>10}{'$' + format(day['cost_usd'], '.3f'):>10}")
+    print("="*80)
+
+
+# DB 초기화
+if not READ_ONLY:
+    init_metrics_db()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Perplexity API 호출 지표 리포트')
+    parser.add_argument('--days', type=int, default=30, help='집계 기간 (일, 기본값: 30)')
+    args = parser.parse_args()
+
+    print_metrics_report(args.days)
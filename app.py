@@ -1,13 +1,23 @@
 import streamlit as st
-import yfinance as yf
+from market_data import get_ticker
 import pandas as pd
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
-import json
-import os
-import requests
+import hashlib
 import sqlite3
-from perplexity_analyzer import StockAnalyzer
+import time
+from data_version import get_data_version
+from sparklines import get_sparklines
+from stock_cache import load_stock_data, update_stock_cache
+from changesets import apply_pending_changesets
+from corporate_actions import sync_cache_invalidations
+from db_snapshot import READ_ONLY, connect_read
+from migrations import migrate
+from figure_cache import figure_cache
+from fear_greed import refresh_fear_greed, load_fear_greed
+from macro_indicators import INDICATORS_BY_NAME, MACRO_INDICATORS, refresh_macro_data, load_macro_data
+from favorites_store import load_favorites, add_favorite_group, delete_favorite_group, update_group_tickers
+
+# plotly, requests, perplexity_analyzer는 사용하는 함수 안에서 import (시작 시간 단축)
 
 # 페이지 설정
 
@@ -24,8 +34,13 @@ st.set_page_config(
 # 데이터베이스 설정
 DB_FILE = "stock_data.db"
 
+@st.cache_resource
 def init_db():
-    """데이터베이스 초기화"""
+    """데이터베이스 초기화 (프로세스당 1회 - 재실행 시에는 건너뜀)"""
+    # 읽기 전용 모드에서는 스키마/변경분 적용을 쓰는 쪽이 담당
+    if READ_ONLY:
+        return
+
     conn = sqlite3.connect(DB_FILE)
     cursor = conn.cursor()
 
@@ -83,9 +98,17 @@ def init_db():
     conn.commit()
     conn.close()
 
+    # 인덱스/스키마 변경 (migrations.py, 최신이면 PRAGMA 한 번만 읽음)
+    migrate()
+
+    # 배포 후 아직 반영하지 않은 변경분(changesets/) 적용
+    result = apply_pending_changesets()
+    if result['files']:
+        print(f"📦 Changesets applied: {result['files']} (seq {result['applied']})")
+
 def get_last_date(table, ticker=None, indicator=None):
     """테이블의 마지막 날짜 가져오기"""
-    conn = sqlite3.connect(DB_FILE)
+    conn = connect_read()
     cursor = conn.cursor()
 
     if table == 'stock_data' and ticker:
@@ -104,78 +127,23 @@ def get_last_date(table, ticker=None, indicator=None):
     return result
 
 def get_cached_stock_data(ticker, period="1y"):
-    """캐시된 주식 데이터 가져오기 및 업데이트"""
-    conn = sqlite3.connect(DB_FILE)
-
-    # 기존 데이터 가져오기
-    query = 'SELECT * FROM stock_data WHERE ticker = ? ORDER BY date'
-    df = pd.read_sql_query(query, conn, params=(ticker,))
-
-    # 마지막 날짜 확인
-    last_date = get_last_date('stock_data', ticker=ticker)
-
+    """캐시된 주식 데이터 가져오기 및 업데이트 (읽기 전용 모드에서는 저장된 데이터만)"""
     # 필요한 기간 계산
     period_map = {"1mo": 30, "3mo": 90, "6mo": 180, "1y": 365, "2y": 730}
     days = period_map.get(period, 365)
     start_date = datetime.now() - timedelta(days=days)
 
-    # 업데이트 필요 여부 확인
-    if last_date is None:
-        # 데이터가 없으면 전체 가져오기
-        stock = yf.Ticker(ticker)
-        new_df = stock.history(period=period)
-        # timezone 제거
-        if new_df.index.tz is not None:
-            new_df.index = new_df.index.tz_localize(None)
-    else:
-        last_datetime = pd.to_datetime(last_date)
-        today = datetime.now()
-
-        # 오늘 데이터가 이미 있으면 DB 데이터만 반환
-        if last_datetime.date() >= today.date():
-            if not df.empty:
-                df['date'] = pd.to_datetime(df['date'])
-                df = df.set_index('date')
-                df = df[df.index >= start_date]
-                df.columns = ['ticker', 'Open', 'High', 'Low', 'Close', 'Volume']
-                df = df.drop('ticker', axis=1)
-                return df
-
-        # 마지막 날짜 이후 데이터만 가져오기
-        stock = yf.Ticker(ticker)
-        days_to_fetch = (today - last_datetime).days + 5  # 여유분
-        new_df = stock.history(period=f"{days_to_fetch}d")
-
-        # timezone 제거
-        if not new_df.empty and new_df.index.tz is not None:
-            new_df.index = new_df.index.tz_localize(None)
-
-        if not new_df.empty:
-            new_df = new_df[new_df.index > last_datetime]
-
-    # 새 데이터 저장
-    if not new_df.empty:
-        save_df = new_df.copy()
-        save_df['ticker'] = ticker
-        save_df['date'] = save_df.index.strftime('%Y-%m-%d')
-        save_df = save_df.reset_index(drop=True)
-        save_df = save_df[['ticker', 'date', 'Open', 'High', 'Low', 'Close', 'Volume']]
-        save_df.columns = ['ticker', 'date', 'open', 'high', 'low', 'close', 'volume']
-
-        save_df.to_sql('stock_data', conn, if_exists='append', index=False)
-
-    # 전체 데이터 다시 가져오기
-    df = pd.read_sql_query(query, conn, params=(ticker,))
-    conn.close()
-
-    if not df.empty:
-        df['date'] = pd.to_datetime(df['date'])
-        df = df.set_index('date')
-        df = df[df.index >= start_date]
-        df.columns = ['ticker', 'open', 'high', 'low', 'close', 'volume']
-        df = df.drop('ticker', axis=1)
-        df.columns = ['Open', 'High', 'Low', 'Close', 'Volume']
-
+    # 업데이트 필요 여부 확인 (오늘 봉이 이미 있으면 DB 데이터만 사용,
+    # 읽기 전용 모드는 새 봉을 쓰는 쪽이 다음 스냅샷에 반영)
+    last_date = get_last_date('stock_data', ticker=ticker)
+    if not READ_ONLY and (last_date is None or pd.to_datetime(last_date).date() < datetime.now().date()):
+        # 배치 작업과 같은 경로: 마지막 저장일 이후 봉 + 최근 봉 재확인
+        # (분할/배당으로 수정 주가가 바뀌었으면 전체 이력 교체)
+        update_stock_cache([ticker], period=period)
+
+    df = load_stock_data([ticker], start=start_date).get(ticker)
+    if df is None:
+        return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
     return df
 
 def get_company_description(ticker, info):
@@ -290,7 +258,7 @@ def get_company_description(ticker, info):
 
 def get_cached_stock_info(ticker):
     """캐시된 주식 정보 가져오기 (종목명, 설명 등)"""
-    conn = sqlite3.connect(DB_FILE)
+    conn = connect_read()
     cursor = conn.cursor()
 
     # 캐시된 정보 확인 (30일 이내)
@@ -311,159 +279,66 @@ def get_cached_stock_info(ticker):
 
     # 캐시가 없거나 오래되면 새로 가져오기
     try:
-        stock = yf.Ticker(ticker)
+        stock = get_ticker(ticker)
         info = stock.info
         long_name = info.get('longName', ticker)
         description = get_company_description(ticker, info)
 
-        # 캐시 업데이트
-        cursor.execute('''
-            INSERT OR REPLACE INTO stock_info (ticker, long_name, description, updated_at)
-            VALUES (?, ?, ?, ?)
-        ''', (ticker, long_name, description, datetime.now().strftime('%Y-%m-%d')))
-
-        conn.commit()
         conn.close()
+
+        # 캐시 업데이트 (읽기 전용 모드에서는 저장하지 않음)
+        if not READ_ONLY:
+            write_conn = sqlite3.connect(DB_FILE)
+            write_conn.execute('''
+                INSERT OR REPLACE INTO stock_info (ticker, long_name, description, updated_at)
+                VALUES (?, ?, ?, ?)
+            ''', (ticker, long_name, description, datetime.now().strftime('%Y-%m-%d')))
+            write_conn.commit()
+            write_conn.close()
         return {'name': long_name, 'description': description}
     except Exception as e:
         conn.close()
         return {'name': ticker, 'description': '정보 없음'}
 
-def get_cached_macro_data(indicator, ticker, period="1y"):
-    """캐시된 거시경제 데이터 가져오기 및 업데이트"""
-    conn = sqlite3.connect(DB_FILE)
-
-    # 기존 데이터 가져오기
-    query = 'SELECT date, value FROM macro_data WHERE indicator = ? ORDER BY date'
-    df = pd.read_sql_query(query, conn, params=(indicator,))
-
-    last_date = get_last_date('macro_data', indicator=indicator)
-
-    # 필요한 기간 계산
+def get_macro_start_date(period="1y"):
+    """조회 기간 시작일"""
     period_map = {"1mo": 30, "3mo": 90, "6mo": 180, "1y": 365, "2y": 730}
     days = period_map.get(period, 365)
-    start_date = datetime.now() - timedelta(days=days)
-
-    # 업데이트 필요 여부 확인
-    if last_date is None:
-        # 데이터가 없으면 전체 가져오기
-        stock = yf.Ticker(ticker)
-        new_df = stock.history(period=period)
-        # timezone 제거
-        if new_df.index.tz is not None:
-            new_df.index = new_df.index.tz_localize(None)
-    else:
-        last_datetime = pd.to_datetime(last_date)
-        today = datetime.now()
-
-        # 오늘 데이터가 이미 있으면 DB 데이터만 반환
-        if last_datetime.date() >= today.date():
-            if not df.empty:
-                df['date'] = pd.to_datetime(df['date'])
-                df = df.set_index('date')
-                df = df[df.index >= start_date]
-                df.columns = ['Close']
-                return df
-
-        # 마지막 날짜 이후 데이터만 가져오기
-        stock = yf.Ticker(ticker)
-        days_to_fetch = (today - last_datetime).days + 5
-        new_df = stock.history(period=f"{days_to_fetch}d")
-
-        # timezone 제거
-        if not new_df.empty and new_df.index.tz is not None:
-            new_df.index = new_df.index.tz_localize(None)
-
-        if not new_df.empty:
-            new_df = new_df[new_df.index > last_datetime]
-
-    # 새 데이터 저장
-    if not new_df.empty:
-        for idx, row in new_df.iterrows():
-            try:
-                cursor = conn.cursor()
-                cursor.execute(
-                    'INSERT OR REPLACE INTO macro_data (indicator, date, value) VALUES (?, ?, ?)',
-                    (indicator, idx.strftime('%Y-%m-%d'), row['Close'])
-                )
-                conn.commit()
-            except:
-                pass
+    return datetime.now() - timedelta(days=days)
 
-    # 전체 데이터 다시 가져오기
-    df = pd.read_sql_query(query, conn, params=(indicator,))
-    conn.close()
-
-    if not df.empty:
-        df['date'] = pd.to_datetime(df['date'])
-        df = df.set_index('date')
-        df = df[df.index >= start_date]
-        df.columns = ['Close']
-
-    return df
+def get_cached_macro_data(indicator, ticker=None, period="1y"):
+    """캐시된 거시경제 데이터 가져오기 (macro_indicators 목록 기준, 오래된 지표는 묶음 갱신)"""
+    if not READ_ONLY:
+        refresh_macro_data()
+    frames = load_macro_data([indicator], start=get_macro_start_date(period))
+    return frames.get(indicator, pd.DataFrame(columns=['Close']))
 
 def get_cached_fed_rate(period="1y"):
-    """캐시된 기준금리 데이터 가져오기 (FRED API 사용 중단)"""
-    # Note: pandas_datareader의 distutils 의존성 문제로 인해 FRED 데이터 사용 중단
-    # 대신 yfinance의 ^IRX (13 Week Treasury Bill) 사용 가능하지만 현재는 비활성화
-
-    # 빈 DataFrame 반환
-    return pd.DataFrame()
+    """미국 단기금리 (^IRX 13주 국채 금리를 기준금리 대용으로 사용, DFF 컬럼)"""
+    # Note: pandas_datareader의 distutils 의존성 문제로 FRED(DFF) 대신 ^IRX 사용
+    df = get_cached_macro_data("IRX", period=period)
+    return df.rename(columns={'Close': 'DFF'})
 
 # DB 초기화
 init_db()
-
-# 즐겨찾기 관리 함수들
-FAVORITES_FILE = "favorites.json"
-
-def load_favorites():
-    """즐겨찾기 데이터 로드"""
-    if os.path.exists(FAVORITES_FILE):
-        try:
-            with open(FAVORITES_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except:
-            return {"favorites": {}}
-    return {"favorites": {}}
-
-def save_favorites(data):
-    """즐겨찾기 데이터 저장"""
-    with open(FAVORITES_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-def add_favorite_group(group_name):
-    """새 즐겨찾기 그룹 추가"""
-    data = load_favorites()
-    if group_name and group_name not in data["favorites"]:
-        data["favorites"][group_name] = []
-        save_favorites(data)
-        return True
-    return False
-
-def delete_favorite_group(group_name):
-    """즐겨찾기 그룹 삭제"""
-    data = load_favorites()
-    if group_name in data["favorites"]:
-        del data["favorites"][group_name]
-        save_favorites(data)
-        return True
-    return False
-
-def update_group_tickers(group_name, tickers):
-    """그룹의 티커 리스트 업데이트"""
-    data = load_favorites()
-    if group_name in data["favorites"]:
-        data["favorites"][group_name] = tickers
-        save_favorites(data)
-        return True
-    return False
+# 수정 주가로 이력을 다시 쓴 종목의 차트/스파크라인 캐시 비우기 (다른 프로세스가 쓴 경우 포함)
+sync_cache_invalidations()
 
 # 거시경제 지표 차트 생성 함수
-def create_macro_chart(ticker, name, period="1y"):
-    """거시경제 지표 차트 생성"""
+def format_macro_value(item, value):
+    """지표 단위에 맞춘 값 표시"""
+    if item['unit'] == '$':
+        return f"${value:,.2f}"
+    if item['unit'] == '%':
+        return f"{value:.2f}%"
+    return f"{value:,.2f}"
+
+def create_macro_chart(indicator, period="1y", df=None):
+    """거시경제 지표 차트 생성 (저장된 데이터 사용, 차트 캐시)"""
     try:
-        stock = yf.Ticker(ticker)
-        df = stock.history(period=period)
+        item = INDICATORS_BY_NAME[indicator]
+        if df is None:
+            df = get_cached_macro_data(indicator, period=period)
 
         if df.empty:
             return None, "데이터를 가져올 수 없습니다."
@@ -474,69 +349,66 @@ def create_macro_chart(ticker, name, period="1y"):
         change = current_price - prev_price
         change_pct = (change / prev_price) * 100 if prev_price != 0 else 0
 
-        # 차트 생성
-        fig = go.Figure()
-
-        fig.add_trace(go.Scatter(
-            x=df.index,
-            y=df['Close'],
-            mode='lines',
-            name=name,
-            line=dict(color='#1f77b4', width=2),
-            fill='tozeroy',
-            fillcolor='rgba(31, 119, 180, 0.1)',
-            hovertemplate='<b>%{x}</b><br>%{y:.2f}<extra></extra>'
-        ))
-
-        fig.update_layout(
-            title=dict(
-                text=f"<b>{name}</b>",
-                font=dict(size=16, color='#1a1a1a')
-            ),
-            yaxis=dict(
-                title=None,
-                tickfont=dict(size=10, color='#666'),
-                gridcolor='#E8E8E8',
-                gridwidth=0.5,
-                showgrid=True,
-                zeroline=False
-            ),
-            xaxis=dict(
-                title=None,
-                tickfont=dict(size=10, color='#666'),
-                gridcolor='#E8E8E8',
-                gridwidth=0.5,
-                showgrid=True
-            ),
-            hovermode='x unified',
-            height=400,
-            plot_bgcolor='#FAFAFA',
-            paper_bgcolor='#FFFFFF',
-            autosize=True,
-            xaxis_rangeslider_visible=False,
-            showlegend=False,
-            margin=dict(l=50, r=30, t=50, b=40)
-        )
-
+        key = ('macro_indicator', indicator, period, get_data_version('macro_data'))
+        fig = figure_cache.get_or_build(key, lambda: build_macro_indicator_chart(item, df))
         return fig, (current_price, change, change_pct)
     except Exception as e:
         return None, str(e)
 
-def get_fear_greed_index():
-    """CNN 공포탐욕지수 가져오기"""
-    try:
-        url = "https://production.dataviz.cnn.io/index/fearandgreed/graphdata/"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            return data
-        return None
-    except Exception as e:
-        print(f"CNN API Error: {e}")
-        return None
+def build_macro_indicator_chart(item, df):
+    """거시경제 지표 단일 차트"""
+    name = item['label']
+
+    # 차트 생성
+    import plotly.graph_objects as go
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(
+        x=df.index,
+        y=df['Close'],
+        mode='lines',
+        name=name,
+        line=dict(color='#1f77b4', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(31, 119, 180, 0.1)',
+        hovertemplate='<b>%{x}</b><br>%{y:.2f}<extra></extra>'
+    ))
+
+    fig.update_layout(
+        title=dict(
+            text=f"<b>{name}</b>",
+            font=dict(size=16, color='#1a1a1a')
+        ),
+        yaxis=dict(
+            title=None,
+            tickfont=dict(size=10, color='#666'),
+            gridcolor='#E8E8E8',
+            gridwidth=0.5,
+            showgrid=True,
+            zeroline=False
+        ),
+        xaxis=dict(
+            title=None,
+            tickfont=dict(size=10, color='#666'),
+            gridcolor='#E8E8E8',
+            gridwidth=0.5,
+            showgrid=True
+        ),
+        hovermode='x unified',
+        height=400,
+        plot_bgcolor='#FAFAFA',
+        paper_bgcolor='#FFFFFF',
+        autosize=True,
+        xaxis_rangeslider_visible=False,
+        showlegend=False,
+        margin=dict(l=50, r=30, t=50, b=40)
+    )
+
+    # 등록된 표시 범위가 있으면 고정
+    if item['y_range']:
+        fig.update_yaxes(range=list(item['y_range']))
+
+    return fig
 
 # 시그널 분석 함수
 
@@ -715,6 +587,16 @@ def analyze_signal(df):
 # 종목별 차트 생성 함수
 
 def create_chart(ticker, analysis_result):
+    """특정 종목의 차트 (캐시 사용 - 같은 종목/같은 봉 값이면 다시 만들지 않음)"""
+    df = analysis_result['df']
+    # 마지막 봉(장중 → 확정값)이나 수정 주가가 바뀌면 날짜 구간이 같아도 키가 달라지도록 값 체크섬 포함
+    checksum = hashlib.sha1(
+        df[['Open', 'High', 'Low', 'Close', 'Volume']].to_numpy(dtype='float64').tobytes()
+    ).hexdigest()[:16]
+    key = ('chart', ticker, df.index[0].strftime('%Y-%m-%d'), df.index[-1].strftime('%Y-%m-%d'), len(df), checksum)
+    return figure_cache.get_or_build(key, lambda: build_chart(ticker, analysis_result))
+
+def build_chart(ticker, analysis_result):
 
     """특정 종목의 차트 생성 - 지수이동평균선(EMA) 표시""" 
 
@@ -724,6 +606,8 @@ def create_chart(ticker, analysis_result):
 
     sell_signals = analysis_result['sell_signals'] 
 
+    import plotly.graph_objects as go
+
     fig = go.Figure() 
 
     # 배경 레이어: 종가 (연하게)
@@ -944,6 +828,459 @@ def create_chart(ticker, analysis_result):
 
     return fig 
 
+def build_macro_figure(sp500_df, vix_df, fng_df, fed_rate_df, has_fed_rate):
+    """거시경제 통합 차트 생성 (S&P 500, VIX, CNN 공포탐욕지수, 기준금리)"""
+    # timezone 정보 제거 (비교를 위해 모든 인덱스를 timezone-naive로 변환)
+    if sp500_df.index.tz is not None:
+        sp500_df.index = sp500_df.index.tz_localize(None)
+    if vix_df.index.tz is not None:
+        vix_df.index = vix_df.index.tz_localize(None)
+    if fng_df.index.tz is not None:
+        fng_df.index = fng_df.index.tz_localize(None)
+    if has_fed_rate and fed_rate_df.index.tz is not None:
+        fed_rate_df.index = fed_rate_df.index.tz_localize(None)
+
+    # 날짜 범위 맞추기
+    start_date = sp500_df.index.min()
+    end_date = sp500_df.index.max()
+
+    # 데이터 필터링
+    sp500_filtered = sp500_df[sp500_df.index >= start_date]
+    vix_filtered = vix_df[vix_df.index >= start_date]
+    fng_filtered = fng_df[(fng_df.index >= start_date) & (fng_df.index <= end_date)]
+    if has_fed_rate:
+        fed_rate_filtered = fed_rate_df[(fed_rate_df.index >= start_date) & (fed_rate_df.index <= end_date)]
+
+    # 통합 차트 (3 또는 4개 서브플롯)
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    if has_fed_rate:
+        subplot_titles_list = ('S&P 500', 'VIX (변동성 지수)', 'CNN 공포탐욕지수', '미국 단기금리 (^IRX)')
+        rows_count = 4
+    else:
+        subplot_titles_list = ('S&P 500', 'VIX (변동성 지수)', 'CNN 공포탐욕지수')
+        rows_count = 3
+
+    row_heights_list = [0.25, 0.25, 0.25, 0.25] if has_fed_rate else [0.33, 0.33, 0.34]
+
+    fig = make_subplots(
+        rows=rows_count, cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.05,
+        subplot_titles=subplot_titles_list,
+        row_heights=row_heights_list
+    )
+
+    # 1. S&P 500
+    fig.add_trace(
+        go.Scatter(
+            x=sp500_filtered.index,
+            y=sp500_filtered['Close'],
+            name='S&P 500',
+            line=dict(color='#2E86DE', width=3),
+            fill='tozeroy',
+            fillcolor='rgba(46, 134, 222, 0.1)',
+            hovertemplate='<b>S&P 500</b><br>%{x}<br>$%{y:.2f}<extra></extra>'
+        ),
+        row=1, col=1
+    )
+
+    # 2. VIX
+    fig.add_trace(
+        go.Scatter(
+            x=vix_filtered.index,
+            y=vix_filtered['Close'],
+            name='VIX',
+            line=dict(color='#FF6B35', width=3),
+            fill='tozeroy',
+            fillcolor='rgba(255, 107, 53, 0.1)',
+            hovertemplate='<b>VIX</b><br>%{x}<br>%{y:.2f}<extra></extra>'
+        ),
+        row=2, col=1
+    )
+
+    # 3. CNN 공포탐욕지수
+    fig.add_trace(
+        go.Scatter(
+            x=fng_filtered.index,
+            y=fng_filtered['Score'],
+            name='공포탐욕지수',
+            line=dict(color='#26C281', width=3),
+            fill='tozeroy',
+            fillcolor='rgba(38, 194, 129, 0.1)',
+            hovertemplate='<b>공포탐욕지수</b><br>%{x}<br>%{y:.0f}/100<extra></extra>'
+        ),
+        row=3, col=1
+    )
+
+    # 4. 미국 기준금리 (조건부)
+    if has_fed_rate:
+        fig.add_trace(
+            go.Scatter(
+                x=fed_rate_filtered.index,
+                y=fed_rate_filtered['DFF'],
+                name='기준금리',
+                line=dict(color='#8E44AD', width=3),
+                fill='tozeroy',
+                fillcolor='rgba(142, 68, 173, 0.1)',
+                hovertemplate='<b>기준금리</b><br>%{x}<br>%{y:.2f}%<extra></extra>'
+            ),
+            row=4, col=1
+        )
+
+    # Y축 설정 - 동적 범위 조정
+    # S&P 500
+    sp500_min = sp500_filtered['Close'].min()
+    sp500_max = sp500_filtered['Close'].max()
+    sp500_padding = (sp500_max - sp500_min) * 0.1  # 10% 여유
+    fig.update_yaxes(
+        title_text="가격 ($)",
+        row=1, col=1,
+        tickfont=dict(size=10),
+        range=[sp500_min - sp500_padding, sp500_max + sp500_padding]
+    )
+
+    # VIX
+    vix_min = vix_filtered['Close'].min()
+    vix_max = vix_filtered['Close'].max()
+    vix_padding = (vix_max - vix_min) * 0.1  # 10% 여유
+    fig.update_yaxes(
+        title_text="지수",
+        row=2, col=1,
+        tickfont=dict(size=10),
+        range=[vix_min - vix_padding, vix_max + vix_padding]
+    )
+
+    # CNN 공포탐욕지수 (0-100 고정)
+    fig.update_yaxes(
+        title_text="점수 (0-100)",
+        row=3, col=1,
+        range=[0, 100],
+        tickfont=dict(size=10)
+    )
+
+    # 미국 기준금리 (조건부)
+    if has_fed_rate:
+        fed_min = fed_rate_filtered['DFF'].min()
+        fed_max = fed_rate_filtered['DFF'].max()
+        fed_padding = (fed_max - fed_min) * 0.1  # 10% 여유
+        fig.update_yaxes(
+            title_text="금리 (%)",
+            row=4, col=1,
+            tickfont=dict(size=10),
+            range=[fed_min - fed_padding, fed_max + fed_padding]
+        )
+
+    # X축 설정
+    fig.update_xaxes(showgrid=True, gridcolor='#E8E8E8', gridwidth=0.5)
+
+    # 레이아웃 설정
+    fig.update_layout(
+        height=900,
+        plot_bgcolor='#FAFAFA',
+        paper_bgcolor='#FFFFFF',
+        showlegend=False,
+        hovermode='x unified',
+        margin=dict(l=60, r=30, t=80, b=50),
+        font=dict(size=11)
+    )
+
+    # 서브플롯 제목 스타일
+    for annotation in fig['layout']['annotations']:
+        annotation['font'] = dict(size=13, color='#2C3E50', family='Arial Black')
+
+    return fig
+
+# 화면 모델 캐시 (위젯 조작으로 재실행될 때 종목 분석/그룹화/정렬/카드 HTML을 다시 만들지 않음)
+# 데이터 버전이 그대로여도 이 시간이 지나면 새 일봉 확인을 위해 다시 계산
+SCREEN_MODEL_TTL_SECONDS = 15 * 60
+
+STATUS_ORDER = ['STRONG BUY', 'WARNING', 'BUY', 'SELL']
+
+def normalize_tickers(tickers_input):
+    """티커 입력 파싱 (대문자, 공백 제거, 중복 제거 - 입력 순서 유지)"""
+    return list(dict.fromkeys(t.strip().upper() for t in tickers_input.split(',') if t.strip()))
+
+def screen_model_key(tickers, period):
+    """화면 모델 캐시 키: 정규화된 티커 집합 해시 + 기간 + 데이터 버전"""
+    ticker_hash = hashlib.sha1(','.join(sorted(tickers)).encode('utf-8')).hexdigest()
+    return f"{ticker_hash}:{period}:{get_data_version()}"
+
+def render_ticker_card(ticker, result, sparkline=''):
+    """종목 카드 HTML (모바일 컴팩트 디자인, sparkline: 최근 종가 SVG)"""
+    # 배경색 결정
+    if result['status'] == 'STRONG BUY':
+        bg_color = "#cce5ff"
+    elif result['status'] == 'WARNING':
+        bg_color = "#fff3cd"
+    elif result['status'] == 'BUY':
+        bg_color = "#d4edda"
+    else: ## SELL
+        bg_color = "#f8d7da"
+
+    return f"""
+
+                <div style="
+                    padding: 8px 10px;
+                    margin: 3px 0;
+                    border-radius: 6px;
+                    background-color: {bg_color};
+                    border-left: 4px solid {result['status_color']};
+                    color: #000000;
+                    font-size: 13px;
+                ">
+                    <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 4px;">
+                        <div style="font-weight: bold; font-size: 14px;">
+                            {result['status_emoji']} <span style="font-size: 15px;">{ticker}</span>
+                        </div>
+                        <div style="font-weight: bold; font-size: 14px;">
+                            ${result['current_price']:.2f} <span style="font-size: 12px; color: {'green' if result['diff_pct'] > 0 else 'red'};">({result['diff_pct']:+.1f}%)</span>
+                        </div>
+                    </div>
+                    <div style="font-size: 11px; color: #1a5490; font-weight: 600; margin-bottom: 4px; line-height: 1.4;">
+                        {result.get('description', '정보 없음')}
+                    </div>
+                    <div style="display: flex; gap: 12px; align-items: center; font-size: 11px; color: #666;">
+                        <span>EMA5: ${result['ma5']:.1f}</span>
+                        <span>EMA20: ${result['ma20']:.1f}</span>
+                        <span style="font-weight: bold;">{result['status']}</span>
+                        <span style="margin-left: auto; line-height: 0;">{sparkline}</span>
+                    </div>
+                </div>
+
+                """
+
+def render_ticker_list(groups, cards):
+    """상태별로 묶은 전체 종목 목록을 하나의 HTML 블록으로 (요소 1개만 전송)"""
+    headers = {
+        'STRONG BUY': '🚀 STRONG BUY',
+        'WARNING': '⚠️ WARNING',
+        'BUY': '💚 BUY',
+        'SELL': '🔻 SELL',
+    }
+    parts = ['<div>']
+    for status in STATUS_ORDER:
+        if not groups[status]:
+            continue
+        parts.append(
+            f'<div style="font-weight: bold; font-size: 13px; margin: 10px 0 2px;">'
+            f'{headers[status]} ({len(groups[status])})</div>'
+        )
+        for ticker, _ in groups[status]:
+            # 줄 앞 공백 제거 (마크다운 코드 블록으로 해석되지 않도록, 전송 크기도 감소)
+            parts.append(''.join(line.strip() for line in cards[ticker].splitlines()))
+    parts.append('</div>')
+    return ''.join(parts)
+
+def render_ticker_details(ticker, result):
+    """선택한 종목 상세 (차트, 지표, 최근 데이터, AI 분석)"""
+    # 차트
+
+    fig = create_chart(ticker, result)
+
+    st.plotly_chart(fig, use_container_width=True)
+
+    # 추가 정보 (모바일 친화적으로 2열 배치)
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+
+        st.metric("최근 시그널",
+                result['last_signal_date'] if result['last_signal_date'] else '없음')
+
+        st.metric("EMA5-EMA20 차이", f"{result['diff_pct']:+.2f}%")
+
+    with col2:
+
+        if result['last_signal_type'] == 1:
+
+            st.metric("시그널 타입", "BUY (골든크로스)")
+
+        elif result['last_signal_type'] == -1:
+
+            st.metric("시그널 타입", "SELL (데드크로스)")
+
+        else:
+
+            st.metric("시그널 타입", "-")
+
+    # 최근 데이터
+
+    df = result['df']
+
+    recent_data = df[['Close', 'MA5', 'MA20']].tail(7).sort_index(ascending=False)
+
+    recent_data.columns = ['종가', 'EMA5', 'EMA20']
+
+    recent_data.index = recent_data.index.strftime('%m/%d')
+
+    st.markdown("##### 최근 데이터")
+
+    st.dataframe(
+
+        recent_data.style.format("{:.1f}"),
+
+        use_container_width=True,
+
+        height=180
+
+    )
+
+    # AI 분석 (시그널 발생 날짜 기준) - 자동 조회
+    st.markdown("---")
+    st.markdown("##### 🤖 AI 시그널 분석")
+
+    if result['last_signal_date']:
+        analysis_date = result['last_signal_date']
+        signal_type_map = {1: 'BUY', -1: 'SELL'}
+        signal_type = signal_type_map.get(result['last_signal_type'], None)
+
+        # 상태별 시그널 타입 추가
+        if result['status'] == 'STRONG BUY':
+            signal_type = 'STRONG BUY'
+        elif result['status'] == 'WARNING':
+            signal_type = 'WARNING'
+
+        st.info(f"📅 시그널 발생일: **{analysis_date}** ({signal_type})")
+
+        # AI 분석 자동 조회
+        try:
+            from perplexity_analyzer import get_cached_analysis
+
+            # 캐시 확인
+            cached_result = get_cached_analysis(ticker, analysis_date)
+
+            if cached_result:
+                # 캐시된 결과 표시
+                st.success("✅ AI 분석")
+                if cached_result.get('reused'):
+                    st.caption(f"♻️ {cached_result['reused_from']} 시그널 분석을 재사용했습니다.")
+                st.markdown("**📊 분석 결과:**")
+                st.markdown(cached_result['analysis'])
+
+                if cached_result.get('citations'):
+                    st.markdown("---")
+                    st.markdown("**📚 참고 자료:**")
+                    with st.container():
+                        for i, citation in enumerate(cached_result['citations'], 1):
+                            st.caption(f"{i}. {citation}")
+            else:
+                # 캐시 없음 - 다음 업데이트 대기
+                st.info("ℹ️ 분석이 준비되지 않았습니다. 다음 업데이트를 기다려주세요.")
+
+        except ValueError as e:
+            st.error(f"⚠️ API 키 오류: {str(e)}")
+            st.info("💡 .env 파일에 PERPLEXITY_API_KEY를 설정해주세요.")
+        except Exception as e:
+            st.error(f"❌ 오류 발생: {str(e)}")
+    else:
+        st.warning("⚠️ 시그널 발생 내역이 없습니다.")
+
+def build_screen_model(tickers, period, on_progress=None):
+    """
+    종목 분석 화면 모델 생성
+
+    Args:
+        on_progress: on_progress(idx, total, ticker) - 진행 상황 표시용
+
+    Returns:
+        {'groups': {상태: [(ticker, result), ...]}, 'all_stocks': [...],
+         'errors': [...], 'cards': {ticker: 카드 HTML}, 'list_html': 전체 목록 HTML}
+    """
+    results = {}
+
+    for idx, ticker in enumerate(tickers):
+        if on_progress:
+            on_progress(idx, len(tickers), ticker)
+
+        try:
+            # 데이터 가져오기 (캐시 사용)
+            df = get_cached_stock_data(ticker, period=period)
+
+            if df.empty:
+                results[ticker] = {'error': '데이터를 찾을 수 없습니다'}
+            else:
+                # 시그널 분석
+                analysis = analyze_signal(df)
+
+                # 종목 정보 추가 (캐시 사용)
+                stock_info = get_cached_stock_info(ticker)
+                analysis['name'] = stock_info['name']
+                analysis['description'] = stock_info['description']
+                analysis['ticker'] = ticker
+                results[ticker] = analysis
+
+        except Exception as e:
+            results[ticker] = {'error': str(e)}
+
+    # 결과를 상태별로 그룹화
+    groups = {status: [] for status in STATUS_ORDER}
+    errors = []
+    for ticker, result in results.items():
+        if 'error' in result:
+            errors.append((ticker, result))
+        elif result['status'] in groups:
+            groups[result['status']].append((ticker, result))
+        else: ## SELL
+            groups['SELL'].append((ticker, result))
+
+    # 각 카테고리 내에서 최근 시그널 날짜 순으로 정렬 (최신순)
+    for status in STATUS_ORDER:
+        groups[status].sort(key=lambda x: x[1].get('last_signal_date') or '1900-01-01', reverse=True)
+
+    all_stocks = [item for status in STATUS_ORDER for item in groups[status]]
+    # 스파크라인은 저장된 종가로 한 번에 생성 (종목별 차트 생성 없음)
+    sparklines = get_sparklines([ticker for ticker, _ in all_stocks])
+    cards = {
+        ticker: render_ticker_card(ticker, result, sparklines.get(ticker, ''))
+        for ticker, result in all_stocks
+    }
+
+    return {
+        'groups': groups,
+        'all_stocks': all_stocks,
+        'errors': errors,
+        'cards': cards,
+        'list_html': render_ticker_list(groups, cards)
+    }
+
+def get_screen_model(tickers, period, force=False):
+    """
+    세션에 캐시된 화면 모델 반환 (키가 같고 TTL 이내면 재사용)
+
+    Args:
+        force: True면 캐시 무시 ('전체 조회' 버튼)
+    """
+    key = screen_model_key(tickers, period)
+    cached = st.session_state.get('screen_model')
+    if (not force and cached and cached['key'] == key
+            and time.time() - cached['created'] < SCREEN_MODEL_TTL_SECONDS):
+        return cached['model']
+
+    # 진행 상황 표시
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+
+    def on_progress(idx, total, ticker):
+        status_text.text(f"분석 중: {ticker} ({idx + 1}/{total})")
+        progress_bar.progress((idx + 1) / total)
+
+    model = build_screen_model(tickers, period, on_progress)
+
+    # 진행 상황 제거
+    progress_bar.empty()
+    status_text.empty()
+
+    # 조회 중 새 일봉이 저장되면 데이터 버전이 바뀌므로 키를 다시 계산해 저장
+    st.session_state['screen_model'] = {
+        'key': screen_model_key(tickers, period),
+        'created': time.time(),
+        'model': model
+    }
+    return model
+
 # 타이틀
 
 st.title("📊 주식 지수이동평균선(EMA) 멀티 분석 대시보드") 
@@ -971,26 +1308,29 @@ with st.sidebar:
         key="group_selector"
     )
 
-    # 그룹 관리
-    # 새 그룹 추가
-    with st.expander("➕ 새 그룹 추가"):
-        new_group_name = st.text_input("그룹 이름", key="new_group_name")
-        if st.button("추가", key="add_group_btn", use_container_width=True):
-            if new_group_name:
-                if add_favorite_group(new_group_name):
-                    st.success(f"'{new_group_name}' 그룹이 추가되었습니다!")
-                    st.rerun()
-                else:
-                    st.error("이미 존재하는 그룹 이름입니다.")
+    # 그룹 관리 (읽기 전용 모드에서는 스냅샷의 그룹만 표시)
+    if READ_ONLY:
+        st.caption("🔒 읽기 전용 모드에서는 그룹을 편집할 수 없습니다.")
+    else:
+        # 새 그룹 추가
+        with st.expander("➕ 새 그룹 추가"):
+            new_group_name = st.text_input("그룹 이름", key="new_group_name")
+            if st.button("추가", key="add_group_btn", use_container_width=True):
+                if new_group_name:
+                    if add_favorite_group(new_group_name):
+                        st.success(f"'{new_group_name}' 그룹이 추가되었습니다!")
+                        st.rerun()
+                    else:
+                        st.error("이미 존재하는 그룹 이름입니다.")
 
-    # 그룹 삭제
-    if selected_group != "기본" and selected_group in favorites:
-        with st.expander("🗑️ 현재 그룹 삭제"):
-            st.warning(f"'{selected_group}' 그룹을 삭제하시겠습니까?")
-            if st.button("삭제 확인", key="delete_group_btn", type="primary", use_container_width=True):
-                if delete_favorite_group(selected_group):
-                    st.success("그룹이 삭제되었습니다!")
-                    st.rerun()
+        # 그룹 삭제
+        if selected_group != "기본" and selected_group in favorites:
+            with st.expander("🗑️ 현재 그룹 삭제"):
+                st.warning(f"'{selected_group}' 그룹을 삭제하시겠습니까?")
+                if st.button("삭제 확인", key="delete_group_btn", type="primary", use_container_width=True):
+                    if delete_favorite_group(selected_group):
+                        st.success("그룹이 삭제되었습니다!")
+                        st.rerun()
 
     st.markdown("---")
 
@@ -1017,7 +1357,7 @@ with st.sidebar:
     )
 
     # 현재 티커를 그룹에 저장
-    if selected_group != "기본" and selected_group in favorites:
+    if not READ_ONLY and selected_group != "기본" and selected_group in favorites:
         if st.button("💾 현재 티커를 그룹에 저장", type="secondary", use_container_width=True):
             tickers = [t.strip().upper() for t in tickers_input.split(',') if t.strip()]
             if update_group_tickers(selected_group, tickers):
@@ -1065,13 +1405,13 @@ with st.sidebar:
     """) 
 
 # 메인 영역 - 탭 구성
-tab1, tab2 = st.tabs(["📊 종목 분석", "📈 거시경제 지표"])
+tab1, tab2, tab3 = st.tabs(["📊 종목 분석", "📈 거시경제 지표", "🤖 AI 호출 지표"])
 
 # 탭1: 종목 분석
 with tab1:
     if fetch_button or tickers_input:
         # 티커 리스트 파싱
-        tickers = [t.strip().upper() for t in tickers_input.split(',') if t.strip()] 
+        tickers = normalize_tickers(tickers_input)
 
         if not tickers:
             st.warning("⚠️ 티커를 입력해주세요.")
@@ -1079,291 +1419,64 @@ with tab1:
             # 대시보드 헤더
             st.markdown(f"### 📊 총 {len(tickers)}개 종목 분석")
 
-            # 각 종목 분석
-            results = {}
+            # 종목 분석 (티커/기간/데이터 버전이 같으면 캐시된 모델 사용)
+            model = get_screen_model(tickers, period, force=fetch_button)
 
-            # 진행 상황 표시
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-
-            for idx, ticker in enumerate(tickers): 
-
-                status_text.text(f"분석 중: {ticker} ({idx + 1}/{len(tickers)})")
-
-                try:
-                    # 데이터 가져오기 (캐시 사용)
-                    df = get_cached_stock_data(ticker, period=period)
-
-                    if df.empty:
-                        results[ticker] = {'error': '데이터를 찾을 수 없습니다'}
-                    else:
-                        # 시그널 분석
-                        analysis = analyze_signal(df)
+            strong_buy_list = model['groups']['STRONG BUY']
+            warning_list = model['groups']['WARNING']
+            buy_list = model['groups']['BUY']
+            sell_list = model['groups']['SELL']
+            error_list = model['errors']
 
-                        # 종목 정보 추가 (캐시 사용)
-                        stock_info = get_cached_stock_info(ticker)
-                        analysis['name'] = stock_info['name']
-                        analysis['description'] = stock_info['description']
-                        analysis['ticker'] = ticker
-                        results[ticker] = analysis
+            # 요약 통계 (모바일 반응형: 2x2 그리드) 
 
-                except Exception as e:
-                    results[ticker] = {'error': str(e)}
+            col1, col2 = st.columns(2) 
 
-                # 진행률 업데이트
-                progress_bar.progress((idx + 1) / len(tickers))
+            with col1:
 
+                st.metric("🚀 STRONG BUY", len(strong_buy_list))
 
-        # 진행 상황 제거 
+                st.metric("⚠️ WARNING", len(warning_list))
 
-        progress_bar.empty() 
+            with col2:
 
-        status_text.empty() 
+                st.metric("💚 BUY", len(buy_list))
 
-        # 결과를 상태별로 그룹화 
+                st.metric("🔻 SELL", len(sell_list)) 
 
-        strong_buy_list = [] 
+            st.markdown("---") 
 
-        buy_list = [] 
+            # 전체 종목을 하나의 테이블로 표시 
 
-        warning_list = [] 
+            all_stocks = model['all_stocks']
 
-        sell_list = [] 
+            if all_stocks: 
 
-        error_list = [] 
+                st.markdown("### 📊 종목 현황") 
 
-        for ticker, result in results.items(): 
+                # 전체 목록은 하나의 HTML 블록으로 렌더링
+                st.markdown(model['list_html'], unsafe_allow_html=True)
 
-            if 'error' in result: 
-
-                error_list.append((ticker, result)) 
-
-            else: 
-
-                if result['status'] == 'STRONG BUY': 
-
-                    strong_buy_list.append((ticker, result)) 
-
-                elif result['status'] == 'BUY': 
-
-                    buy_list.append((ticker, result)) 
-
-                elif result['status'] == 'WARNING': 
-
-                    warning_list.append((ticker, result)) 
-
-                else: ## SELL 
-
-                    sell_list.append((ticker, result)) 
-
-        # 각 카테고리 내에서 최근 시그널 날짜 순으로 정렬 
-
-        def sort_by_signal_date(stock_list):
-            """최근 시그널 날짜 기준으로 정렬 (최신순)"""
-            return sorted(stock_list, key=lambda x: x[1].get('last_signal_date') or '1900-01-01', reverse=True) 
-
-        strong_buy_list = sort_by_signal_date(strong_buy_list) 
-
-        warning_list = sort_by_signal_date(warning_list) 
-
-        buy_list = sort_by_signal_date(buy_list) 
-
-        sell_list = sort_by_signal_date(sell_list) 
-
-        # 요약 통계 (모바일 반응형: 2x2 그리드) 
-
-        col1, col2 = st.columns(2) 
-
-        with col1:
-
-            st.metric("🚀 STRONG BUY", len(strong_buy_list))
-
-            st.metric("⚠️ WARNING", len(warning_list))
-
-        with col2:
-
-            st.metric("💚 BUY", len(buy_list))
-
-            st.metric("🔻 SELL", len(sell_list)) 
-
-        st.markdown("---") 
-
-        # 전체 종목을 하나의 테이블로 표시 
-
-        all_stocks = strong_buy_list + warning_list + buy_list + sell_list 
-
-        if all_stocks: 
-
-            st.markdown("### 📊 종목 현황") 
-
-            # 각 종목을 행으로 표시하되, expander로 차트 포함 
-
-            for ticker, result in all_stocks: 
-
-                # 배경색 결정 
-
-                if result['status'] == 'STRONG BUY': 
-
-                    bg_color = "#cce5ff" 
-
-                elif result['status'] == 'WARNING': 
-
-                    bg_color = "#fff3cd" 
-
-                elif result['status'] == 'BUY': 
-
-                    bg_color = "#d4edda" 
-
-                else: ## SELL 
-
-                    bg_color = "#f8d7da" 
-
-                # 모바일 컴팩트 디자인
-
-                st.markdown(f"""
-
-                <div style="
-                    padding: 8px 10px;
-                    margin: 3px 0;
-                    border-radius: 6px;
-                    background-color: {bg_color};
-                    border-left: 4px solid {result['status_color']};
-                    color: #000000;
-                    font-size: 13px;
-                ">
-                    <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 4px;">
-                        <div style="font-weight: bold; font-size: 14px;">
-                            {result['status_emoji']} <span style="font-size: 15px;">{ticker}</span>
-                        </div>
-                        <div style="font-weight: bold; font-size: 14px;">
-                            ${result['current_price']:.2f} <span style="font-size: 12px; color: {'green' if result['diff_pct'] > 0 else 'red'};">({result['diff_pct']:+.1f}%)</span>
-                        </div>
-                    </div>
-                    <div style="font-size: 11px; color: #1a5490; font-weight: 600; margin-bottom: 4px; line-height: 1.4;">
-                        {result.get('description', '정보 없음')}
-                    </div>
-                    <div style="display: flex; gap: 12px; font-size: 11px; color: #666;">
-                        <span>EMA5: ${result['ma5']:.1f}</span>
-                        <span>EMA20: ${result['ma20']:.1f}</span>
-                        <span style="font-weight: bold;">{result['status']}</span>
-                    </div>
-                </div>
-
-                """, unsafe_allow_html=True) 
-
-                # 차트를 expander 안에 넣기 
-
-                with st.expander(f"📈 {ticker} 차트", expanded=False): 
-
-                    # 차트 
-
-                    fig = create_chart(ticker, result) 
-
-                    st.plotly_chart(fig, use_container_width=True) 
-
-                    # 추가 정보 (모바일 친화적으로 2열 배치) 
-
-                    col1, col2 = st.columns(2) 
-
-                    with col1:
-
-                        st.metric("최근 시그널",
-                                result['last_signal_date'] if result['last_signal_date'] else '없음')
-
-                        st.metric("EMA5-EMA20 차이", f"{result['diff_pct']:+.2f}%") 
-
-                    with col2: 
-
-                        if result['last_signal_type'] == 1: 
-
-                            st.metric("시그널 타입", "BUY (골든크로스)") 
-
-                        elif result['last_signal_type'] == -1: 
-
-                            st.metric("시그널 타입", "SELL (데드크로스)") 
-
-                        else: 
-
-                            st.metric("시그널 타입", "-") 
-
-                    # 최근 데이터
-
-                    df = result['df']
-
-                    recent_data = df[['Close', 'MA5', 'MA20']].tail(7).sort_index(ascending=False)
-
-                    recent_data.columns = ['종가', 'EMA5', 'EMA20']
-
-                    recent_data.index = recent_data.index.strftime('%m/%d')
-
-                    st.markdown("##### 최근 데이터")
-
-                    st.dataframe(
-
-                        recent_data.style.format("{:.1f}"),
-
-                        use_container_width=True,
-
-                        height=180
-
-                    )
-
-                    # AI 분석 (시그널 발생 날짜 기준) - 자동 조회
-                    st.markdown("---")
-                    st.markdown("##### 🤖 AI 시그널 분석")
-
-                    if result['last_signal_date']:
-                        analysis_date = result['last_signal_date']
-                        signal_type_map = {1: 'BUY', -1: 'SELL'}
-                        signal_type = signal_type_map.get(result['last_signal_type'], None)
-
-                        # 상태별 시그널 타입 추가
-                        if result['status'] == 'STRONG BUY':
-                            signal_type = 'STRONG BUY'
-                        elif result['status'] == 'WARNING':
-                            signal_type = 'WARNING'
-
-                        st.info(f"📅 시그널 발생일: **{analysis_date}** ({signal_type})")
-
-                        # AI 분석 자동 조회
-                        try:
-                            from perplexity_analyzer import get_cached_analysis
-
-                            # 캐시 확인
-                            cached_result = get_cached_analysis(ticker, analysis_date)
-
-                            if cached_result:
-                                # 캐시된 결과 표시
-                                st.success("✅ AI 분석")
-                                st.markdown("**📊 분석 결과:**")
-                                st.markdown(cached_result['analysis'])
-
-                                if cached_result.get('citations'):
-                                    st.markdown("---")
-                                    st.markdown("**📚 참고 자료:**")
-                                    with st.container():
-                                        for i, citation in enumerate(cached_result['citations'], 1):
-                                            st.caption(f"{i}. {citation}")
-                            else:
-                                # 캐시 없음 - 다음 업데이트 대기
-                                st.info("ℹ️ 분석이 준비되지 않았습니다. 다음 업데이트를 기다려주세요.")
-
-                        except ValueError as e:
-                            st.error(f"⚠️ API 키 오류: {str(e)}")
-                            st.info("💡 .env 파일에 PERPLEXITY_API_KEY를 설정해주세요.")
-                        except Exception as e:
-                            st.error(f"❌ 오류 발생: {str(e)}")
-                    else:
-                        st.warning("⚠️ 시그널 발생 내역이 없습니다.") 
+                # 상세 정보는 선택한 종목만 (차트/AI 분석)
+                st.markdown("### 📈 종목 상세")
+                results_by_ticker = dict(all_stocks)
+                selected_ticker = st.selectbox(
+                    "상세 보기 종목",
+                    list(results_by_ticker.keys()),
+                    format_func=lambda t: f"{results_by_ticker[t]['status_emoji']} {t} ({results_by_ticker[t]['status']})",
+                    key="detail_ticker"
+                )
+                if selected_ticker:
+                    render_ticker_details(selected_ticker, results_by_ticker[selected_ticker])
 
-        # 에러 종목 
+            # 에러 종목 
 
-        if error_list: 
+            if error_list: 
 
-            st.markdown("### ❌ 오류 발생 종목") 
+                st.markdown("### ❌ 오류 발생 종목") 
 
-            for ticker, result in error_list:
-                st.error(f"{ticker}: {result['error']}")
+                for ticker, result in error_list:
+                    st.error(f"{ticker}: {result['error']}")
 
     else: 
 
@@ -1383,7 +1496,7 @@ with tab1:
 
             4. 각 종목의 현재 시그널 상태를 확인하세요 
 
-            5. 종목을 클릭하여 상세 차트를 확인하세요 
+            5. 종목 상세에서 종목을 선택해 차트와 AI 분석을 확인하세요 
 
             #### 티커 예시: 
 
@@ -1465,27 +1578,37 @@ with tab2:
             # 데이터 수집 (캐시 사용)
             errors = []
 
-            sp500_df = get_cached_macro_data("SP500", "^GSPC", period=period)
+            # 등록된 지표 중 오래된 것만 묶음 갱신 후 전체를 한 번의 쿼리로 읽기
+            # (읽기 전용 모드에서는 쓰는 쪽이 갱신한 스냅샷만 읽음)
+            if not READ_ONLY:
+                refresh_macro_data()
+            macro_frames = load_macro_data(start=get_macro_start_date(period))
+            empty_macro_df = pd.DataFrame(columns=['Close'])
+
+            sp500_df = macro_frames.get('SP500', empty_macro_df)
             if sp500_df.empty:
                 errors.append("S&P 500 데이터를 가져올 수 없습니다.")
 
-            vix_df = get_cached_macro_data("VIX", "^VIX", period=period)
+            vix_df = macro_frames.get('VIX', empty_macro_df)
             if vix_df.empty:
                 errors.append("VIX 데이터를 가져올 수 없습니다.")
 
-            fng_data = get_fear_greed_index()
-            if not fng_data:
+            # 공포탐욕지수는 DB에서 읽고, TTL이 지났을 때만 CNN에서 새 데이터 추가
+            if not READ_ONLY:
+                refresh_fear_greed()
+            fng_df = load_fear_greed()
+            if fng_df.empty:
                 errors.append("CNN 공포탐욕지수 데이터를 가져올 수 없습니다.")
 
-            fed_rate_df = get_cached_fed_rate(period=period)
-            # Note: 기준금리 데이터는 현재 비활성화됨 (pandas_datareader 의존성 문제)
-            has_fed_rate = fed_rate_df is not None and not fed_rate_df.empty
+            # 기준금리는 ^IRX (13주 국채 금리)로 대신 표시
+            fed_rate_df = macro_frames.get('IRX', empty_macro_df).rename(columns={'Close': 'DFF'})
+            has_fed_rate = not fed_rate_df.empty
 
             if errors:
                 for error in errors:
                     st.error(error)
 
-            if not sp500_df.empty and not vix_df.empty and fng_data:
+            if not sp500_df.empty and not vix_df.empty and not fng_df.empty:
                 # 현재 값 표시
                 col1, col2, col3, col4 = st.columns(4)
 
@@ -1505,8 +1628,8 @@ with tab2:
 
                 with col3:
                     # CNN Fear & Greed Index 현재값
-                    fng_current = fng_data['fear_and_greed']['score']
-                    fng_rating = fng_data['fear_and_greed']['rating']
+                    fng_current = fng_df['Score'].iloc[-1]
+                    fng_rating = fng_df['Rating'].iloc[-1] or '-'
 
                     if fng_current <= 25:
                         emoji = "😨"
@@ -1522,188 +1645,59 @@ with tab2:
                     st.metric(f"{emoji} CNN 공포탐욕", f"{fng_current:.0f}/100", f"{fng_rating}")
 
                 with col4:
-                    # 미국 기준금리 (현재 비활성화됨)
+                    # 미국 단기금리 (^IRX)
                     if has_fed_rate:
                         fed_rate_current = fed_rate_df['DFF'].iloc[-1]
                         fed_rate_prev = fed_rate_df['DFF'].iloc[-2] if len(fed_rate_df) > 1 else fed_rate_current
                         fed_rate_change = fed_rate_current - fed_rate_prev
-                        st.metric("💵 기준금리", f"{fed_rate_current:.2f}%", f"{fed_rate_change:+.2f}%p")
+                        st.metric("💵 단기금리 (^IRX)", f"{fed_rate_current:.2f}%", f"{fed_rate_change:+.2f}%p")
                     else:
-                        st.metric("💵 기준금리", "N/A", "데이터 없음")
+                        st.metric("💵 단기금리 (^IRX)", "N/A", "데이터 없음")
                 
                 st.markdown("---")
                 
                 # 통합 차트 생성
                 st.markdown("#### 📊 통합 차트 (기간: {})".format(period_label))
                 
-                # CNN Fear & Greed 히스토리 데이터 처리
-                fng_history = fng_data['fear_and_greed_historical']['data']
-                fng_df = pd.DataFrame(fng_history)
-                fng_df['x'] = pd.to_datetime(fng_df['x'], unit='ms')
-                fng_df = fng_df.rename(columns={'x': 'Date', 'y': 'Score'})
-                fng_df = fng_df.set_index('Date')
-                fng_df = fng_df.sort_index()
-
-                # timezone 정보 제거 (비교를 위해 모든 인덱스를 timezone-naive로 변환)
-                if sp500_df.index.tz is not None:
-                    sp500_df.index = sp500_df.index.tz_localize(None)
-                if vix_df.index.tz is not None:
-                    vix_df.index = vix_df.index.tz_localize(None)
-                if fng_df.index.tz is not None:
-                    fng_df.index = fng_df.index.tz_localize(None)
-                if has_fed_rate and fed_rate_df.index.tz is not None:
-                    fed_rate_df.index = fed_rate_df.index.tz_localize(None)
-
-                # 날짜 범위 맞추기
-                start_date = sp500_df.index.min()
-                end_date = sp500_df.index.max()
-
-                # 데이터 필터링
-                sp500_filtered = sp500_df[sp500_df.index >= start_date]
-                vix_filtered = vix_df[vix_df.index >= start_date]
-                fng_filtered = fng_df[(fng_df.index >= start_date) & (fng_df.index <= end_date)]
-                if has_fed_rate:
-                    fed_rate_filtered = fed_rate_df[(fed_rate_df.index >= start_date) & (fed_rate_df.index <= end_date)]
-
-                # 통합 차트 (3 또는 4개 서브플롯)
-                from plotly.subplots import make_subplots
-
-                if has_fed_rate:
-                    subplot_titles_list = ('S&P 500', 'VIX (변동성 지수)', 'CNN 공포탐욕지수', '미국 기준금리')
-                    rows_count = 4
-                else:
-                    subplot_titles_list = ('S&P 500', 'VIX (변동성 지수)', 'CNN 공포탐욕지수')
-                    rows_count = 3
-
-                row_heights_list = [0.25, 0.25, 0.25, 0.25] if has_fed_rate else [0.33, 0.33, 0.34]
-
-                fig = make_subplots(
-                    rows=rows_count, cols=1,
-                    shared_xaxes=True,
-                    vertical_spacing=0.05,
-                    subplot_titles=subplot_titles_list,
-                    row_heights=row_heights_list
-                )
-
-                # 1. S&P 500
-                fig.add_trace(
-                    go.Scatter(
-                        x=sp500_filtered.index,
-                        y=sp500_filtered['Close'],
-                        name='S&P 500',
-                        line=dict(color='#2E86DE', width=3),
-                        fill='tozeroy',
-                        fillcolor='rgba(46, 134, 222, 0.1)',
-                        hovertemplate='<b>S&P 500</b><br>%{x}<br>$%{y:.2f}<extra></extra>'
-                    ),
-                    row=1, col=1
-                )
-
-                # 2. VIX
-                fig.add_trace(
-                    go.Scatter(
-                        x=vix_filtered.index,
-                        y=vix_filtered['Close'],
-                        name='VIX',
-                        line=dict(color='#FF6B35', width=3),
-                        fill='tozeroy',
-                        fillcolor='rgba(255, 107, 53, 0.1)',
-                        hovertemplate='<b>VIX</b><br>%{x}<br>%{y:.2f}<extra></extra>'
-                    ),
-                    row=2, col=1
-                )
-
-                # 3. CNN 공포탐욕지수
-                fig.add_trace(
-                    go.Scatter(
-                        x=fng_filtered.index,
-                        y=fng_filtered['Score'],
-                        name='공포탐욕지수',
-                        line=dict(color='#26C281', width=3),
-                        fill='tozeroy',
-                        fillcolor='rgba(38, 194, 129, 0.1)',
-                        hovertemplate='<b>공포탐욕지수</b><br>%{x}<br>%{y:.0f}/100<extra></extra>'
-                    ),
-                    row=3, col=1
-                )
-
-                # 4. 미국 기준금리 (조건부)
-                if has_fed_rate:
-                    fig.add_trace(
-                        go.Scatter(
-                            x=fed_rate_filtered.index,
-                            y=fed_rate_filtered['DFF'],
-                            name='기준금리',
-                            line=dict(color='#8E44AD', width=3),
-                            fill='tozeroy',
-                            fillcolor='rgba(142, 68, 173, 0.1)',
-                            hovertemplate='<b>기준금리</b><br>%{x}<br>%{y:.2f}%<extra></extra>'
-                        ),
-                        row=4, col=1
-                    )
-
-                # Y축 설정 - 동적 범위 조정
-                # S&P 500
-                sp500_min = sp500_filtered['Close'].min()
-                sp500_max = sp500_filtered['Close'].max()
-                sp500_padding = (sp500_max - sp500_min) * 0.1  # 10% 여유
-                fig.update_yaxes(
-                    title_text="가격 ($)",
-                    row=1, col=1,
-                    tickfont=dict(size=10),
-                    range=[sp500_min - sp500_padding, sp500_max + sp500_padding]
-                )
-
-                # VIX
-                vix_min = vix_filtered['Close'].min()
-                vix_max = vix_filtered['Close'].max()
-                vix_padding = (vix_max - vix_min) * 0.1  # 10% 여유
-                fig.update_yaxes(
-                    title_text="지수",
-                    row=2, col=1,
-                    tickfont=dict(size=10),
-                    range=[vix_min - vix_padding, vix_max + vix_padding]
+                # 데이터 버전(거시경제/공포탐욕지수 테이블 쓰기 카운터)이 같으면 캐시 사용
+                macro_key = ('macro', period, get_data_version('macro_data'), get_data_version('fear_greed'), has_fed_rate)
+                fig = figure_cache.get_or_build(
+                    macro_key,
+                    lambda: build_macro_figure(sp500_df, vix_df, fng_df, fed_rate_df, has_fed_rate)
                 )
+                
+                st.plotly_chart(fig, use_container_width=True)
 
-                # CNN 공포탐욕지수 (0-100 고정)
-                fig.update_yaxes(
-                    title_text="점수 (0-100)",
-                    row=3, col=1,
-                    range=[0, 100],
-                    tickfont=dict(size=10)
+                # 추가 지표 (금리, 환율, 섹터 ETF - 위에서 읽은 데이터 사용)
+                st.markdown("---")
+                st.markdown("#### 🌐 추가 지표")
+
+                extra_items = [item for item in MACRO_INDICATORS if item['indicator'] not in ('SP500', 'VIX', 'IRX')]
+                extra_cols = st.columns(3)
+                for i, item in enumerate(extra_items):
+                    item_df = macro_frames.get(item['indicator'], empty_macro_df)
+                    with extra_cols[i % 3]:
+                        if item_df.empty:
+                            st.metric(item['label'], "N/A")
+                            continue
+                        item_current = item_df['Close'].iloc[-1]
+                        item_prev = item_df['Close'].iloc[-2] if len(item_df) > 1 else item_current
+                        item_change_pct = (item_current - item_prev) / item_prev * 100 if item_prev else 0
+                        st.metric(item['label'], format_macro_value(item, item_current), f"{item_change_pct:+.2f}%")
+
+                selected_indicator = st.selectbox(
+                    "차트로 보기",
+                    [item['indicator'] for item in extra_items],
+                    format_func=lambda name: INDICATORS_BY_NAME[name]['label'],
+                    key="macro_indicator_select"
                 )
-
-                # 미국 기준금리 (조건부)
-                if has_fed_rate:
-                    fed_min = fed_rate_filtered['DFF'].min()
-                    fed_max = fed_rate_filtered['DFF'].max()
-                    fed_padding = (fed_max - fed_min) * 0.1  # 10% 여유
-                    fig.update_yaxes(
-                        title_text="금리 (%)",
-                        row=4, col=1,
-                        tickfont=dict(size=10),
-                        range=[fed_min - fed_padding, fed_max + fed_padding]
-                    )
-
-                # X축 설정
-                fig.update_xaxes(showgrid=True, gridcolor='#E8E8E8', gridwidth=0.5)
-
-                # 레이아웃 설정
-                fig.update_layout(
-                    height=900,
-                    plot_bgcolor='#FAFAFA',
-                    paper_bgcolor='#FFFFFF',
-                    showlegend=False,
-                    hovermode='x unified',
-                    margin=dict(l=60, r=30, t=80, b=50),
-                    font=dict(size=11)
+                indicator_fig, indicator_info = create_macro_chart(
+                    selected_indicator, period, df=macro_frames.get(selected_indicator, empty_macro_df)
                 )
-
-                # 서브플롯 제목 스타일
-                for annotation in fig['layout']['annotations']:
-                    annotation['font'] = dict(size=13, color='#2C3E50', family='Arial Black')
-                
-                st.plotly_chart(fig, use_container_width=True)
+                if indicator_fig is not None:
+                    st.plotly_chart(indicator_fig, use_container_width=True)
+                else:
+                    st.warning(indicator_info)
                 
                 # 추가 정보
                 st.markdown("---")
@@ -1828,3 +1822,57 @@ with tab2:
 
         네 가지 지표를 하나의 차트에서 비교하여 전체적인 시장 분위기와 리스크 수준을 파악할 수 있습니다.
         """)
+
+# 탭3: AI 호출 지표
+with tab3:
+    st.markdown("### 🤖 Perplexity API 호출 지표")
+    st.markdown("지연시간, 캐시 적중률, 예상 비용을 확인하여 동시성 · 재사용 범위를 조정하세요.")
+
+    from api_metrics import summarize_metrics
+
+    metrics_days = st.selectbox("집계 기간", [7, 30, 90], index=1, format_func=lambda d: f"최근 {d}일", key="metrics_days")
+    metrics = summarize_metrics(metrics_days)
+
+    if not metrics['total']:
+        st.info("ℹ️ 기록된 API 호출이 없습니다.")
+    else:
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.metric("총 요청", f"{metrics['total']:,}", f"신규 {metrics['fresh']:,}")
+            st.metric("캐시 적중률", f"{metrics['hit_ratio'] * 100:.1f}%", f"재사용 {metrics['reused']:,}")
+            st.metric("예상 비용", f"${metrics['cost_usd']:.2f}")
+
+        with col2:
+            p50 = f"{metrics['p50_ms'] / 1000:.1f}s" if metrics['p50_ms'] is not None else "-"
+            p95 = f"{metrics['p95_ms'] / 1000:.1f}s" if metrics['p95_ms'] is not None else "-"
+            st.metric("지연시간 p50", p50)
+            st.metric("지연시간 p95", p95)
+            st.metric("오류 / 재시도", f"{metrics['errors']:,}", f"재시도 {metrics['retries']:,}회", delta_color="off")
+
+        daily_df = pd.DataFrame(metrics['daily']).set_index('date')
+
+        st.markdown("##### 일별 비용 ($)")
+        st.bar_chart(daily_df['cost_usd'])
+
+        st.markdown("##### 일별 지연시간 (ms)")
+        st.line_chart(daily_df[['p50_ms', 'p95_ms']])
+
+        if metrics['error_classes']:
+            st.markdown("##### 오류 유형")
+            st.dataframe(
+                pd.DataFrame(list(metrics['error_classes'].items()), columns=['유형', '횟수']),
+                use_container_width=True,
+                hide_index=True
+            )
+
+    # 차트 캐시 상태 (프로세스 단위)
+    st.markdown("---")
+    st.markdown("##### 📈 차트 캐시")
+    cache_stats = figure_cache.stats()
+    col1, col2 = st.columns(2)
+    with col1:
+        hit_ratio = f"{cache_stats['hit_ratio'] * 100:.0f}%" if cache_stats['hit_ratio'] is not None else "-"
+        st.metric("적중률", hit_ratio, f"적중 {cache_stats['hits'] + cache_stats['disk_hits']:,} / 실패 {cache_stats['misses']:,}", delta_color="off")
+    with col2:
+        st.metric("저장된 차트", f"{cache_stats['entries']:,}", f"{cache_stats['bytes'] / 1024 / 1024:.1f}MB · 제거 {cache_stats['evictions']:,}", delta_color="off")
@@ -3,10 +3,11 @@
 모든 종목의 시그널 발생일에 대해 AI 분석을 일괄 조회하고 캐싱
 """
 
-import yfinance as yf
+from market_data import get_ticker
 import pandas as pd
 from datetime import datetime, timedelta
 from perplexity_analyzer import StockAnalyzer
+from analysis_scheduler import AnalysisQueue
 import time
 import sys
 
@@ -16,7 +17,7 @@ DEFAULT_TICKERS = "CRDO,INOD,SMCI,OSCR,IREN,MSTR,BMNR,XYZ,SNPS,BE,JOBY,VRT,NUKZ,
 def get_cached_stock_data(ticker, period="6mo"):
     """주가 데이터 가져오기"""
     try:
-        stock = yf.Ticker(ticker)
+        stock = get_ticker(ticker)
         df = stock.history(period=period)
         if df.empty:
             return None
@@ -79,13 +80,17 @@ def analyze_signal(df):
         'last_signal_type': last_signal_type
     }
 
-def batch_analyze_all(tickers_input=None, delay=2):
+def batch_analyze_all(tickers_input=None, delay=2, time_budget=None):
     """
     모든 종목에 대해 일괄 AI 분석 수행
 
+    먼저 모든 종목의 시그널을 확인한 뒤, 최근 시그널 · STRONG BUY/WARNING ·
+    즐겨찾기 종목 순으로 AI 분석을 조회합니다.
+
     Args:
         tickers_input: 티커 문자열 (쉼표로 구분) 또는 None (기본값 사용)
         delay: API 호출 사이 대기 시간 (초)
+        time_budget: AI 분석 단계 시간 제한 (초, None이면 제한 없음)
     """
     print("="*80)
     print("📊 모든 종목 AI 분석 일괄 조회 및 캐싱")
@@ -100,6 +105,8 @@ def batch_analyze_all(tickers_input=None, delay=2):
     print(f"\n📋 총 {len(tickers)}개 종목 분석 시작")
     print(f"⏱️  API 호출 간격: {delay}초")
     print(f"🕐 예상 소요 시간: 약 {len(tickers) * delay / 60:.1f}분")
+    if time_budget:
+        print(f"⌛ AI 분석 시간 제한: {time_budget / 60:.1f}분")
 
     # 분석기 초기화
     try:
@@ -113,6 +120,7 @@ def batch_analyze_all(tickers_input=None, delay=2):
     total = len(tickers)
     success_count = 0
     cached_count = 0
+    reused_count = 0
     no_signal_count = 0
     error_count = 0
 
@@ -122,18 +130,21 @@ def batch_analyze_all(tickers_input=None, delay=2):
     print("시작 시간:", datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
     print("="*80 + "\n")
 
+    # 1단계: 시그널 확인 및 분석 작업 등록
+    queue = AnalysisQueue()
+
     for idx, ticker in enumerate(tickers, 1):
-        print(f"[{idx}/{total}] {ticker} 처리 중...")
+        print(f"[{idx}/{total}] {ticker} 시그널 확인 중...")
 
         try:
-            # 1. 주가 데이터 가져오기
+            # 주가 데이터 가져오기
             df = get_cached_stock_data(ticker)
             if df is None or df.empty:
                 print(f"  ⚠️  주가 데이터 없음")
                 error_count += 1
                 continue
 
-            # 2. 시그널 분석
+            # 시그널 분석
             analysis = analyze_signal(df)
 
             if not analysis['last_signal_date']:
@@ -141,7 +152,7 @@ def batch_analyze_all(tickers_input=None, delay=2):
                 no_signal_count += 1
                 continue
 
-            # 3. 시그널 타입 결정
+            # 시그널 타입 결정
             signal_type_map = {1: 'BUY', -1: 'SELL'}
             signal_type = signal_type_map.get(analysis['last_signal_type'], None)
 
@@ -152,35 +163,65 @@ def batch_analyze_all(tickers_input=None, delay=2):
 
             print(f"  📅 시그널: {analysis['last_signal_date']} ({signal_type})")
 
-            # 4. AI 분석 조회
-            result = analyzer.analyze_stock_price_movement(
-                ticker=ticker,
-                date=analysis['last_signal_date'],
-                signal_type=signal_type
-            )
-
-            if result['success']:
-                if result.get('cached'):
-                    print(f"  ✅ 캐시됨")
-                    cached_count += 1
-                else:
-                    print(f"  ✅ 신규 조회 완료")
-                    success_count += 1
-                    # API 호출 간격 대기
-                    if idx < total:
-                        time.sleep(delay)
-            else:
-                print(f"  ❌ 분석 실패: {result.get('error', 'Unknown')[:50]}")
-                error_count += 1
+            queue.push({
+                'ticker': ticker,
+                'date': analysis['last_signal_date'],
+                'signal_type': signal_type,
+                'signal_direction': int(analysis['last_signal_type']),
+                'status': analysis['status']
+            })
 
         except KeyboardInterrupt:
             print("\n\n⚠️  사용자에 의해 중단되었습니다.")
-            break
+            return
         except Exception as e:
             print(f"  ❌ 오류: {str(e)[:50]}")
             error_count += 1
 
-        print()
+    # 2단계: 우선순위 순서로 AI 분석 조회
+    print("\n" + "="*80)
+    print(f"🤖 AI 분석 조회 ({len(queue)}개, 우선순위 순)")
+    print("="*80 + "\n")
+
+    def run_analysis(task):
+        try:
+            result = analyzer.analyze_stock_price_movement(
+                ticker=task['ticker'],
+                date=task['date'],
+                signal_type=task['signal_type'],
+                signal_direction=task['signal_direction']
+            )
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+        # 신규 조회한 경우에만 API 호출 간격 대기
+        if result['success'] and not result.get('cached') and len(queue) > 0:
+            time.sleep(delay)
+        return result
+
+    def report(task, result):
+        nonlocal success_count, cached_count, reused_count, error_count
+        print(f"{task['ticker']} ({task['date']}, {task['signal_type']})")
+        if result['success']:
+            if result.get('reused'):
+                print(f"  ♻️  재사용 ({result['reused_from']} 분석)")
+                reused_count += 1
+            elif result.get('cached'):
+                print(f"  ✅ 캐시됨")
+                cached_count += 1
+            else:
+                print(f"  ✅ 신규 조회 완료")
+                success_count += 1
+        else:
+            print(f"  ❌ 분석 실패: {result.get('error', 'Unknown')[:50]}")
+            error_count += 1
+
+    try:
+        run_result = queue.run(run_analysis, time_budget=time_budget, on_result=report)
+        skipped = run_result['skipped']
+    except KeyboardInterrupt:
+        print("\n\n⚠️  사용자에 의해 중단되었습니다.")
+        skipped = []
 
     # 결과 요약
     elapsed_time = time.time() - start_time
@@ -193,9 +234,12 @@ def batch_analyze_all(tickers_input=None, delay=2):
     print(f"  - 총 종목 수: {total}")
     print(f"  - 신규 조회: {success_count}")
     print(f"  - 캐시 사용: {cached_count}")
+    print(f"  - 분석 재사용: {reused_count}")
     print(f"  - 시그널 없음: {no_signal_count}")
     print(f"  - 오류: {error_count}")
-    print(f"\n✅ 성공률: {((success_count + cached_count) / total * 100):.1f}%")
+    if skipped:
+        print(f"  - 시간 제한으로 건너뜀: {len(skipped)} ({', '.join(t['ticker'] for t in skipped)})")
+    print(f"\n✅ 성공률: {((success_count + cached_count + reused_count) / total * 100):.1f}%")
     print("="*80)
 
 def main():
@@ -205,10 +249,12 @@ def main():
     parser = argparse.ArgumentParser(description='모든 종목에 대해 AI 분석 일괄 조회')
     parser.add_argument('--tickers', type=str, help='티커 리스트 (쉼표로 구분)')
     parser.add_argument('--delay', type=int, default=2, help='API 호출 간격 (초, 기본값: 2)')
+    parser.add_argument('--time-budget', type=int, default=None,
+                        help='AI 분석 단계 시간 제한 (초, 우선순위가 높은 종목부터 처리)')
 
     args = parser.parse_args()
 
-    batch_analyze_all(tickers_input=args.tickers, delay=args.delay)
+    batch_analyze_all(tickers_input=args.tickers, delay=args.delay, time_budget=args.time_budget)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+DB 변경분(changeset) 내보내기/적용
+
+stock_data.db 전체를 매일 git에 커밋하는 대신, 트리거로 기록한 변경 키(change_log)를
+기준으로 마지막 내보내기 이후 추가/변경/삭제된 행만 압축 파일로 내보냅니다.
+파일은 추가만 되며(changesets/0000000001-0000000420.json.gz), 앱은 시작할 때
+아직 적용하지 않은 파일을 순서대로 로컬 DB에 적용합니다.
+
+    쓰는 쪽 (update_cache.sh):  python3 changesets.py export  → changesets/ 커밋
+    읽는 쪽 (app.py init_db):   apply_pending_changesets()
+
+트리거는 CHANGESET_EXPORT=1인 프로세스(update_cache.sh)에서만 설치하며, daily_update와
+stock_cache가 쓰기 전에 init_change_log()를 호출합니다. 읽는 쪽 DB는 내보낼 일이 없으므로
+적용할 때마다 (쓰는 쪽 DB를 복사해 온) 트리거를 지우고 change_log를 비웁니다.
+
+기록 위치(seq)는 changeset_state 테이블에 저장합니다.
+    exported: 마지막으로 내보낸 seq (내보내는 DB에만 있음)
+    applied: 이 DB에 반영된 마지막 seq (내보낼 때도 함께 갱신)
+
+DB 파일을 새로 커밋할 때(rebase)는 applied가 내보낸 위치와 같으므로, 그 이전
+changeset 파일은 prune으로 지워도 됩니다.
+
+환경변수:
+    CHANGESET_EXPORT: 1이면 이 DB의 변경분을 내보내는 쪽 (기본값: 0 - 읽는 쪽)
+
+사용 예:
+    python3 changesets.py export             # 변경분 내보내기
+    python3 changesets.py apply              # 대기 중인 변경분 적용
+    python3 changesets.py status
+    python3 changesets.py prune              # 이 DB에 이미 반영된 파일 삭제
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+from data_version import bump_data_version
+from db_snapshot import READ_ONLY
+from migrations import migrate
+
+DB_FILE = "stock_data.db"
+
+CHANGESET_DIR = os.getenv('CHANGESET_DIR', 'changesets')
+CHANGESET_EXPORT = os.getenv('CHANGESET_EXPORT', '0') == '1'
+
+# 변경을 기록하는 테이블 (data_versions 등 로컬 상태는 제외)
+CHANGESET_TABLES = [
+    'stock_data', 'macro_data', 'fear_greed', 'stock_info',
+    'signal_state', 'signal_events', 'perplexity_analysis', 'corporate_actions',
+]
+
+# 적용 후 데이터 버전을 올릴 테이블
+VERSIONED_TABLES = ['stock_data', 'macro_data', 'fear_greed']
+
+
+def _has_table(conn, name: str) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone()
+    return row is not None
+
+
+def _table_columns(conn, table: str) -> tuple:
+    """(전체 컬럼, 기본키 컬럼)"""
+    info = conn.execute(f'PRAGMA table_info({table})').fetchall()
+    columns = [row[1] for row in info]
+    key = [row[1] for row in sorted(info, key=lambda row: row[5]) if row[5]]
+    return columns, key
+
+
+def init_change_log():
+    """change_log/changeset_state 테이블 생성, 내보내는 쪽이면 테이블별 트리거도 생성 (있는 테이블만)"""
+    conn = sqlite3.connect(DB_FILE)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT,
+            key TEXT,
+            op TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS changeset_state (
+            name TEXT PRIMARY KEY,
+            seq INTEGER,
+            updated_at TEXT
+        )
+    ''')
+
+    for table in CHANGESET_TABLES:
+        if not CHANGESET_EXPORT or not _has_table(conn, table):
+            continue
+        _, key = _table_columns(conn, table)
+        new_key = ', '.join(f'NEW.{column}' for column in key)
+        old_key = ', '.join(f'OLD.{column}' for column in key)
+        # INSERT OR REPLACE는 INSERT 트리거만 실행되므로 upsert로 기록됨
+        for event, ref, op in (('INSERT', new_key, 'U'), ('UPDATE', new_key, 'U'), ('DELETE', old_key, 'D')):
+            conn.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS change_log_{table}_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    INSERT INTO change_log (table_name, key, op)
+                    VALUES ('{table}', json_array({ref}), '{op}');
+                END
+            ''')
+
+    conn.commit()
+    conn.close()
+
+
+def _drop_change_triggers(conn):
+    """읽는 쪽 DB에서 트리거 삭제 (쓰는 쪽 DB를 복사해 온 경우)"""
+    for table in CHANGESET_TABLES:
+        for event in ('insert', 'update', 'delete'):
+            conn.execute(f'DROP TRIGGER IF EXISTS change_log_{table}_{event}')
+
+
+def _get_state(conn, name: str):
+    row = conn.execute('SELECT seq FROM changeset_state WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_state(conn, name: str, seq: int):
+    conn.execute('''
+        INSERT INTO changeset_state (name, seq, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET seq = excluded.seq, updated_at = excluded.updated_at
+    ''', (name, seq, datetime.now().isoformat()))
+
+
+def _encode_value(value):
+    """JSON으로 저장할 수 없는 BLOB(압축된 AI 분석 등)은 base64로"""
+    if isinstance(value, bytes):
+        return {'$b64': base64.b64encode(value).decode('ascii')}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and '$b64' in value:
+        return base64.b64decode(value['$b64'])
+    return value
+
+
+def _changeset_files(changeset_dir: str) -> list:
+    """[(시작 seq, 끝 seq, 경로)] - seq 순"""
+    if not os.path.isdir(changeset_dir):
+        return []
+    files = []
+    for name in os.listdir(changeset_dir):
+        if name.endswith('.json.gz'):
+            start, end = name[:-len('.json.gz')].split('-')
+            files.append((int(start), int(end), os.path.join(changeset_dir, name)))
+    return sorted(files)
+
+
+def export_changeset(changeset_dir: str = None) -> dict:
+    """
+    마지막 내보내기 이후 변경분을 파일 하나로 내보내기
+
+    키별로 마지막 변경만 남기고, upsert는 현재 행 값을 담습니다.
+    내보낸 로그는 삭제하고 exported/applied 위치를 함께 갱신합니다.
+
+    Returns:
+        {'path': 파일 경로 (변경 없으면 None), 'upserts': 행 수, 'deletes': 행 수}
+    """
+    changeset_dir = changeset_dir or CHANGESET_DIR
+    init_change_log()
+
+    conn = sqlite3.connect(DB_FILE)
+    conn.execute('BEGIN IMMEDIATE')
+    exported = _get_state(conn, 'exported') or 0
+    end = conn.execute('SELECT MAX(seq) FROM change_log').fetchone()[0] or exported
+
+    # 키별 마지막 작업
+    latest = conn.execute('''
+        SELECT table_name, key, op FROM change_log
+        WHERE seq IN (
+            SELECT MAX(seq) FROM change_log WHERE seq > ? AND seq <= ? GROUP BY table_name, key
+        )
+    ''', (exported, end)).fetchall()
+
+    tables = {}
+    upserts = deletes = 0
+    for table in CHANGESET_TABLES:
+        keys = {'U': [], 'D': []}
+        for table_name, key, op in latest:
+            if table_name == table:
+                keys[op].append(json.loads(key))
+        if not keys['U'] and not keys['D']:
+            continue
+
+        columns, key_columns = _table_columns(conn, table)
+        where = ' AND '.join(f'{column} = ?' for column in key_columns)
+        rows = []
+        for key in keys['U']:
+            row = conn.execute(f'SELECT * FROM {table} WHERE {where}', key).fetchone()
+            if row is not None:
+                rows.append([_encode_value(value) for value in row])
+
+        tables[table] = {'columns': columns, 'key': key_columns, 'upserts': rows, 'deletes': keys['D']}
+        upserts += len(rows)
+        deletes += len(keys['D'])
+
+    path = None
+    if tables:
+        os.makedirs(changeset_dir, exist_ok=True)
+        path = os.path.join(changeset_dir, f"{exported + 1:010d}-{end:010d}.json.gz")
+        payload = {'from': exported + 1, 'to': end, 'created_at': datetime.now().isoformat(), 'tables': tables}
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    conn.execute('DELETE FROM change_log WHERE seq <= ?', (end,))
+    _set_state(conn, 'exported', end)
+    _set_state(conn, 'applied', end)
+    conn.commit()
+    conn.close()
+
+    return {'path': path, 'upserts': upserts, 'deletes': deletes}
+
+
+def _apply_payload(conn, payload: dict) -> set:
+    """changeset 하나 적용 (호출자의 트랜잭션 안에서 실행) - 변경된 stock_data 티커 반환"""
+    tickers = set()
+    for table, change in payload['tables'].items():
+        if not _has_table(conn, table):
+            print(f"  ⚠️  Changeset skipped missing table: {table}")
+            continue
+
+        # 이 DB에 없는 컬럼은 제외 (예전 스키마 DB)
+        local_columns, _ = _table_columns(conn, table)
+        indexes = [i for i, column in enumerate(change['columns']) if column in local_columns]
+        columns = [change['columns'][i] for i in indexes]
+
+        if change['deletes']:
+            where = ' AND '.join(f'{column} = ?' for column in change['key'])
+            conn.executemany(f'DELETE FROM {table} WHERE {where}', change['deletes'])
+        if change['upserts']:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [[_decode_value(row[i]) for i in indexes] for row in change['upserts']]
+            )
+
+        if table == 'stock_data':
+            tickers.update(row[0] for row in change['upserts'])
+            tickers.update(key[0] for key in change['deletes'])
+    return tickers
+
+
+def apply_pending_changesets(changeset_dir: str = None) -> dict:
+    """
+    아직 반영하지 않은 changeset 파일을 순서대로 적용 (한 트랜잭션)
+
+    내보내는 DB는 내보낼 때 applied도 갱신하므로 대기 파일이 생기지 않습니다.
+    읽는 쪽(CHANGESET_EXPORT 미설정)에서는 적용할 파일이 없어도 복사해 온 트리거를
+    지우고, 적용하면서(또는 앱이 직접 쓰면서) 쌓인 change_log를 모두 비웁니다.
+
+    Returns:
+        {'files': 적용한 파일 수, 'applied': 적용 후 위치}
+    """
+    changeset_dir = changeset_dir or CHANGESET_DIR
+    # 변경분에 담긴 테이블이 이 DB에도 있도록 스키마부터 최신으로
+    migrate()
+    init_change_log()
+    conn = sqlite3.connect(DB_FILE)
+    conn.execute('BEGIN IMMEDIATE')
+    if not CHANGESET_EXPORT:
+        _drop_change_triggers(conn)
+        conn.execute('DELETE FROM change_log')
+
+    files = _changeset_files(changeset_dir)
+    applied = _get_state(conn, 'applied') or 0
+    pending = [(start, end, path) for start, end, path in files if end > applied]
+    if not pending:
+        conn.commit()
+        conn.close()
+        return {'files': 0, 'applied': applied if files else None}
+
+    touched_tables = set()
+    tickers = set()
+    for start, end, path in pending:
+        if start > applied + 1:
+            print(f"  ⚠️  Changeset gap: {applied + 1}..{start - 1} missing before {os.path.basename(path)}")
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            payload = json.load(f)
+        tickers |= _apply_payload(conn, payload)
+        touched_tables.update(payload['tables'])
+        applied = end
+
+    for table in VERSIONED_TABLES:
+        if table in touched_tables:
+            bump_data_version(conn, table)
+    _set_state(conn, 'applied', applied)
+    conn.commit()
+    conn.close()
+
+    # 배열 저장소/패널은 stock_data에서 다시 만듦 (켜져 있을 때만)
+    if tickers:
+        import ohlcv_blobs
+        import panel_store
+        if ohlcv_blobs.BLOB_STORE_ENABLED:
+            ohlcv_blobs.build_blobs(sorted(tickers))
+        if panel_store.PANEL_DIR:
+            panel_store.build_panel()
+
+    return {'files': len(pending), 'applied': applied}
+
+
+def prune_changesets(changeset_dir: str = None) -> int:
+    """이 DB에 이미 반영된 changeset 파일 삭제 (DB 파일을 새로 커밋한 뒤 사용)"""
+    changeset_dir = changeset_dir or CHANGESET_DIR
+    conn = sqlite3.connect(DB_FILE)
+    applied = _get_state(conn, 'applied') or 0
+    conn.close()
+
+    removed = 0
+    for _, end, path in _changeset_files(changeset_dir):
+        if end <= applied:
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+# DB 초기화
+if not READ_ONLY:
+    init_change_log()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DB 변경분(changeset) 내보내기/적용")
+    parser.add_argument('command', choices=['export', 'apply', 'status', 'prune'])
+    parser.add_argument('--dir', default=CHANGESET_DIR, help='changeset 디렉토리')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        result = export_changeset(args.dir)
+        if result['path']:
+            size = os.path.getsize(result['path'])
+            print(f"✅ {os.path.basename(result['path'])}: upsert {result['upserts']}행, "
+                  f"delete {result['deletes']}행 ({size / 1024:.1f} KB)")
+        else:
+            print("ℹ️  내보낼 변경분이 없습니다.")
+
+    elif args.command == 'apply':
+        result = apply_pending_changesets(args.dir)
+        print(f"✅ {result['files']}개 파일 적용 (위치: {result['applied']})")
+
+    elif args.command == 'prune':
+        print(f"🗑️  {prune_changesets(args.dir)}개 파일 삭제")
+
+    else:
+        conn = sqlite3.connect(DB_FILE)
+        exported = _get_state(conn, 'exported')
+        applied = _get_state(conn, 'applied')
+        pending_log = conn.execute('SELECT COUNT(*) FROM change_log').fetchone()[0]
+        conn.close()
+        files = _changeset_files(args.dir)
+        print(f"📊 exported: {exported}, applied: {applied}, 기록된 변경: {pending_log}건")
+        print(f"📁 {args.dir}: {len(files)}개 파일, "
+              f"{sum(os.path.getsize(path) for _, _, path in files) / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@
 """
 
 import sqlite3
+from perplexity_analyzer import decode_analysis_text
 
 DB_FILE = "stock_data.db"
 
@@ -17,13 +18,17 @@ def check_analysis_quality():
     cursor = conn.cursor()
 
     cursor.execute('''
-        SELECT ticker, date, analysis, LENGTH(analysis) as length, created_at
+        SELECT ticker, date, analysis, created_at
         FROM perplexity_analysis
         ORDER BY created_at DESC
         LIMIT 10
     ''')
 
-    results = cursor.fetchall()
+    # 압축 저장된 분석은 복원 후 길이 계산
+    results = []
+    for ticker, date, analysis, created_at in cursor.fetchall():
+        analysis = decode_analysis_text(analysis)
+        results.append((ticker, date, analysis, len(analysis), created_at))
     conn.close()
 
     if not results:
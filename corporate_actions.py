@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+분할/배당에 따른 수정 주가 변경 감지 및 종목별 이력 다시 쓰기
+
+stock_data에는 받은 날 기준의 수정 주가가 저장되므로, 분할이나 배당 뒤에는
+저장된 과거 봉과 새로 받은 봉의 가격 기준이 달라져 EMA가 튀고 가짜 교차가 생깁니다.
+
+1. 감지: 증분 업데이트(stock_cache.update_stock_cache)가 종목별 최근 OVERLAP_BARS개 봉을
+   다시 받아, 마지막 저장일(장중 값일 수 있음)을 뺀 확정 봉의 종가 비율을 비교합니다.
+   비율의 중앙값이 ADJUSTMENT_TOLERANCE보다 벗어나면 수정 주가가 바뀐 것으로 봅니다.
+2. 다시 쓰기: 해당 종목만 첫 저장일부터 전체 이력을 다시 받아 한 트랜잭션으로 교체하고,
+   그 종목의 파생 상태(signal_state, signal_events, 배열 저장소)를 함께 지웁니다.
+3. 캐시: corporate_actions 테이블에 기록하며, 대시보드는 재실행마다 새 기록을 확인해
+   해당 종목의 차트/스파크라인 캐시만 비웁니다 (changeset으로 읽는 쪽에도 전달됨).
+
+환경변수:
+    CORP_ACTION_TOLERANCE: 수정 주가 변경으로 볼 종가 비율 차이 (기본값: 0.0005 = 0.05%)
+
+사용 예:
+    python3 corporate_actions.py                      # 최근 감지/다시 쓴 기록
+    python3 corporate_actions.py --check AAPL NVDA    # 감지만 (저장 안 함)
+    python3 corporate_actions.py --rewrite AAPL       # 감지 없이 전체 이력 다시 쓰기
+"""
+
+import argparse
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import ohlcv_blobs
+import panel_store
+from data_version import bump_data_version
+from db_snapshot import READ_ONLY, connect_read
+from market_data import download
+from migrations import migrate
+
+DB_FILE = "stock_data.db"
+
+OVERLAP_BARS = 5    # 증분 업데이트가 다시 받는 최근 봉 수 (마지막 봉은 비교에서 제외)
+ADJUSTMENT_TOLERANCE = float(os.getenv('CORP_ACTION_TOLERANCE', '0.0005'))
+
+# 이 프로세스가 캐시를 비운 마지막 기록 id (None = 아직 확인 안 함)
+_seen_action_id = None
+
+
+def init_corporate_actions_table():
+    """기록 테이블과 지울 파생 상태 테이블(signal_state 등) 보장 (migrations.py 3번)"""
+    migrate()
+
+
+def get_overlap_windows(tickers: list) -> dict:
+    """
+    종목별 다시 받을 구간 (한 번의 쿼리, 기본키 역순으로 최근 OVERLAP_BARS개만 읽음)
+
+    Returns:
+        {티커: (구간 시작일, 마지막 저장일)} - 데이터 없는 종목 제외
+    """
+    if not tickers:
+        return {}
+
+    conn = connect_read()
+    placeholders = ','.join('?' * len(tickers))
+    rows = conn.execute(f'''
+        SELECT ticker, MIN(date), MAX(date) FROM (
+            SELECT ticker, date, ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY date DESC) AS rn
+            FROM stock_data WHERE ticker IN ({placeholders})
+        )
+        WHERE rn <= ?
+        GROUP BY ticker
+    ''', list(tickers) + [OVERLAP_BARS]).fetchall()
+    conn.close()
+    return {ticker: (start, last) for ticker, start, last in rows}
+
+
+def _load_closes(windows: dict) -> pd.DataFrame:
+    """구간 안의 저장된 종가 (ticker, date, close)"""
+    conn = connect_read()
+    tickers = list(windows)
+    placeholders = ','.join('?' * len(tickers))
+    df = pd.read_sql_query(
+        f'SELECT ticker, date, close FROM stock_data WHERE ticker IN ({placeholders}) AND date >= ?',
+        conn, params=tickers + [min(start for start, _ in windows.values())]
+    )
+    conn.close()
+    return df
+
+
+def find_adjusted(frames: dict, windows: dict) -> dict:
+    """
+    다시 받은 봉과 저장된 봉을 비교해 수정 주가가 바뀐 종목 찾기
+
+    Args:
+        frames: 다시 받은 봉 {티커: DataFrame(Close, ...)}
+        windows: get_overlap_windows() 결과
+
+    Returns:
+        {티커: (비교 기준일, 종가 비율 중앙값)}
+    """
+    windows = {t: w for t, w in windows.items() if t in frames}
+    if not windows:
+        return {}
+
+    stored = _load_closes(windows)
+    adjusted = {}
+    for ticker, group in stored.groupby('ticker'):
+        start, last = windows[ticker]
+        # 마지막 저장일의 봉은 장중 값이었을 수 있으므로 확정된 봉만 비교
+        group = group[(group['date'] >= start) & (group['date'] < last)]
+        fetched = frames[ticker]['Close']
+        fetched = pd.Series(fetched.to_numpy(), index=fetched.index.strftime('%Y-%m-%d'))
+
+        common = group[group['date'].isin(fetched.index)]
+        if common.empty:
+            continue
+        ratios = fetched[common['date']].to_numpy() / common['close'].to_numpy()
+        ratio = float(np.median(ratios))
+        if np.isfinite(ratio) and abs(ratio - 1) > ADJUSTMENT_TOLERANCE:
+            adjusted[ticker] = (common['date'].iloc[-1], ratio)
+    return adjusted
+
+
+def _first_dates(tickers: list) -> dict:
+    conn = connect_read()
+    placeholders = ','.join('?' * len(tickers))
+    rows = conn.execute(
+        f'SELECT ticker, MIN(date) FROM stock_data WHERE ticker IN ({placeholders}) GROUP BY ticker',
+        list(tickers)
+    ).fetchall()
+    conn.close()
+    return dict(rows)
+
+
+def fetch_full_histories(tickers: list) -> dict:
+    """종목별 첫 저장일부터 전체 이력 다시 받기 (첫 저장일이 같은 종목끼리 한 요청)"""
+    groups = {}
+    for ticker, first in _first_dates(tickers).items():
+        groups.setdefault(first, []).append(ticker)
+
+    frames = {}
+    for start, group in groups.items():
+        try:
+            fetched = download(group, start=start)
+        except Exception as e:
+            print(f"  ⚠️  History download failed ({len(group)} tickers from {start}): {str(e)[:80]}")
+            continue
+        frames.update({t: df for t, df in fetched.items() if not df.empty})
+    return frames
+
+
+def rewrite_histories(frames: dict, adjusted: dict = None) -> int:
+    """
+    종목별 전체 이력 교체 (한 트랜잭션)
+
+    종목의 stock_data 행을 모두 지우고 받은 이력으로 다시 넣으며, 같은 트랜잭션에서
+    그 종목의 signal_state/signal_events와 배열 저장소 행을 지우고 다시 씁니다.
+    패널은 커밋 후 다시 만들고, 이 프로세스의 차트/스파크라인 캐시도 비웁니다.
+
+    Args:
+        frames: {티커: 전체 이력 DataFrame(Open, High, Low, Close, Volume)}
+        adjusted: find_adjusted() 결과 (기록용, 없으면 수동 다시 쓰기)
+
+    Returns:
+        저장한 행 수
+    """
+    frames = {t: df for t, df in frames.items() if not df.empty}
+    if not frames:
+        return 0
+    adjusted = adjusted or {}
+    now = datetime.now().isoformat()
+
+    conn = sqlite3.connect(DB_FILE)
+    rows_count = 0
+    for ticker, df in frames.items():
+        rows = [
+            (ticker, date, float(row.Open), float(row.High), float(row.Low), float(row.Close),
+             int(row.Volume) if pd.notna(row.Volume) else 0)
+            for date, row in zip(df.index.strftime('%Y-%m-%d'), df.itertuples(index=False))
+        ]
+        conn.execute('DELETE FROM stock_data WHERE ticker = ?', (ticker,))
+        conn.executemany('''
+            INSERT INTO stock_data (ticker, date, open, high, low, close, volume)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        rows_count += len(rows)
+
+        # 바뀐 가격 기준으로 다시 계산되도록 파생 상태 삭제
+        conn.execute('DELETE FROM signal_state WHERE ticker = ?', (ticker,))
+        conn.execute('DELETE FROM signal_events WHERE ticker = ?', (ticker,))
+        if ohlcv_blobs.BLOB_STORE_ENABLED:
+            ohlcv_blobs.delete_ticker(conn, ticker)
+            ohlcv_blobs.write_bars(conn, {ticker: df})
+
+        check_date, ratio = adjusted.get(ticker, (None, None))
+        conn.execute('''
+            INSERT INTO corporate_actions (ticker, check_date, ratio, bars, rewritten_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (ticker, check_date, ratio, len(rows), now))
+
+    bump_data_version(conn)
+    conn.commit()
+    conn.close()
+
+    # 지워진 날짜가 남지 않도록 패널은 stock_data에서 다시 만듦 (드문 작업)
+    if panel_store.PANEL_DIR:
+        try:
+            panel_store.build_panel()
+        except Exception as e:
+            print(f"  ⚠️  Panel rebuild failed: {str(e)[:80]}")
+
+    invalidate_derived_caches(list(frames))
+    return rows_count
+
+
+def invalidate_derived_caches(tickers: list):
+    """이 프로세스의 종목별 차트/스파크라인 캐시 비우기"""
+    # 두 모듈 모두 stock_cache를 통해 이 모듈을 import하므로 함수 안에서 import
+    from figure_cache import figure_cache
+    from sparklines import clear_sparkline_cache
+
+    for ticker in tickers:
+        figure_cache.invalidate(('chart', ticker))
+        clear_sparkline_cache(ticker)
+
+
+def sync_cache_invalidations() -> list:
+    """
+    다른 프로세스(배치, changeset)가 다시 쓴 종목의 캐시 비우기 (대시보드 재실행마다 호출)
+
+    첫 호출은 현재 위치만 기록합니다 (그 이전 기록은 이 프로세스 캐시에 없음).
+
+    Returns:
+        캐시를 비운 종목 리스트
+    """
+    global _seen_action_id
+
+    conn = connect_read()
+    try:
+        rows = conn.execute(
+            'SELECT id, ticker FROM corporate_actions WHERE id > ? ORDER BY id',
+            (_seen_action_id or 0,)
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # 테이블이 아직 없는 스냅샷
+        rows = []
+    conn.close()
+
+    if not rows:
+        if _seen_action_id is None:
+            _seen_action_id = 0
+        return []
+
+    first_call = _seen_action_id is None
+    _seen_action_id = rows[-1][0]
+    if first_call:
+        return []
+
+    tickers = sorted({ticker for _, ticker in rows})
+    invalidate_derived_caches(tickers)
+    return tickers
+
+
+def recent_actions(limit: int = 20) -> list:
+    """최근 다시 쓴 기록 [(ticker, check_date, ratio, bars, rewritten_at)]"""
+    conn = connect_read()
+    rows = conn.execute('''
+        SELECT ticker, check_date, ratio, bars, rewritten_at FROM corporate_actions
+        ORDER BY id DESC LIMIT ?
+    ''', (limit,)).fetchall()
+    conn.close()
+    return rows
+
+
+# DB 초기화
+if not READ_ONLY:
+    init_corporate_actions_table()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="분할/배당 수정 주가 변경 감지 및 이력 다시 쓰기")
+    parser.add_argument('--check', nargs='+', metavar='TICKER', help='최근 봉을 다시 받아 감지만 (저장 안 함)')
+    parser.add_argument('--rewrite', nargs='+', metavar='TICKER', help='감지 없이 전체 이력 다시 쓰기')
+    args = parser.parse_args()
+
+    if args.check:
+        windows = get_overlap_windows(args.check)
+        frames = {}
+        for start in sorted({start for start, _ in windows.values()}):
+            group = [t for t, (s, _) in windows.items() if s == start]
+            frames.update(download(group, start=start))
+        adjusted = find_adjusted(frames, windows)
+        for ticker in args.check:
+            if ticker in adjusted:
+                check_date, ratio = adjusted[ticker]
+                print(f"  ⚠️  {ticker}: 수정 주가 변경 ({check_date} 종가 비율 {ratio:.4f})")
+            elif ticker in windows:
+                print(f"  ✅ {ticker}: 변경 없음")
+            else:
+                print(f"  ℹ️  {ticker}: 저장된 데이터 없음")
+        return
+
+    if args.rewrite:
+        bars = rewrite_histories(fetch_full_histories(args.rewrite))
+        print(f"✅ {len(args.rewrite)}개 종목 이력 다시 쓰기: {bars}봉")
+        return
+
+    rows = recent_actions()
+    if not rows:
+        print("📋 다시 쓴 기록이 없습니다.")
+    for ticker, check_date, ratio, bars, rewritten_at in rows:
+        detail = f"{check_date} 비율 {ratio:.4f}" if ratio is not None else "수동"
+        print(f"  {rewritten_at[:19]} {ticker}: {bars}봉 ({detail})")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,57 +2,283 @@
 """
 Railway Cron Job Service
 Run this as a separate Railway service with cron schedule
+
+The update pipeline is imported once and runs in-process, so pandas, the
+market data client and the Perplexity analyzer stay loaded between runs.
+Each market has its own post-close schedule. Runs are given a soft time
+budget: when it is exceeded the remaining tickers are checkpointed and
+resumed a few minutes later instead of the run being killed. Failed runs
+are checkpointed and retried the same way a few times. On startup every
+market is updated once.
+
+Usage:
+    python3 cron_job.py              # start the scheduler
+    python3 cron_job.py --history    # show recent runs
 """
 
+import json
+import os
 import schedule
+import sqlite3
 import time
-import subprocess
-import sys
+import traceback
 from datetime import datetime
 
-def run_daily_update():
-    """Run the daily update script"""
-    print("="*80)
-    print(f"🕐 Starting scheduled update at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("="*80)
+import daily_update
+from analysis_scheduler import load_favorite_tickers
+from db_snapshot import PUBLISH_SNAPSHOT, publish_snapshot
+from fear_greed import refresh_fear_greed
+from macro_indicators import refresh_macro_data
 
-    try:
-        result = subprocess.run(
-            ['python3', 'daily_update.py'],
-            capture_output=True,
-            text=True,
-            timeout=600  # 10 minutes timeout
+DB_FILE = "stock_data.db"
+
+# Post-close schedules (container clock is UTC)
+#   US: NYSE/Nasdaq close 16:00 ET → 22:00 UTC leaves time for final bars
+#   KRX: KOSPI/KOSDAQ close 15:30 KST (06:30 UTC) → 07:30 UTC
+SCHEDULES = [
+    {'name': 'us_close', 'market': 'US', 'at': '22:00'},
+    {'name': 'krx_close', 'market': 'KRX', 'at': '07:30'},
+]
+
+# Soft time budget per run (seconds) and delay before resuming leftovers
+JOB_TIME_BUDGET = int(os.getenv('JOB_TIME_BUDGET', '540'))
+RESUME_DELAY_MINUTES = int(os.getenv('JOB_RESUME_DELAY_MINUTES', '10'))
+# Consecutive failed runs retried from the checkpoint before waiting for the next slot
+MAX_FAILED_RESUMES = int(os.getenv('JOB_MAX_FAILED_RESUMES', '3'))
+
+KRX_SUFFIXES = ('.KS', '.KQ')
+
+_analyzer = None
+
+
+def init_job_tables():
+    """Create run history and checkpoint tables"""
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS job_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job TEXT,
+            started_at TEXT,
+            finished_at TEXT,
+            duration_sec REAL,
+            status TEXT,
+            tickers INTEGER,
+            new_analyses INTEGER,
+            errors INTEGER,
+            skipped INTEGER,
+            resumed INTEGER DEFAULT 0,
+            message TEXT
         )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS job_checkpoints (
+            job TEXT PRIMARY KEY,
+            tickers TEXT,
+            created_at TEXT
+        )
+    ''')
+    conn.commit()
+    conn.close()
 
-        print(result.stdout)
-        if result.stderr:
-            print("STDERR:", result.stderr, file=sys.stderr)
 
-        if result.returncode == 0:
-            print("✅ Update completed successfully")
-        else:
-            print(f"❌ Update failed with return code {result.returncode}")
+def get_analyzer():
+    """One StockAnalyzer for the life of the process (pooled HTTP session)"""
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = daily_update.StockAnalyzer()
+    return _analyzer
+
+
+def market_of(ticker):
+    return 'KRX' if ticker.endswith(KRX_SUFFIXES) else 'US'
+
+
+def tickers_for_market(market):
+    """Default tickers plus every favorite group, filtered by market"""
+    universe = set(daily_update.default_tickers()) | set(load_favorite_tickers())
+    return sorted(t for t in universe if market_of(t) == market)
+
+
+def save_checkpoint(job_name, tickers):
+    conn = sqlite3.connect(DB_FILE)
+    conn.execute('''
+        INSERT OR REPLACE INTO job_checkpoints (job, tickers, created_at)
+        VALUES (?, ?, ?)
+    ''', (job_name, json.dumps(tickers), datetime.now().isoformat()))
+    conn.commit()
+    conn.close()
+
+
+def load_checkpoint(job_name):
+    conn = sqlite3.connect(DB_FILE)
+    row = conn.execute('SELECT tickers FROM job_checkpoints WHERE job = ?', (job_name,)).fetchone()
+    conn.close()
+    return json.loads(row[0]) if row else None
+
+
+def clear_checkpoint(job_name):
+    conn = sqlite3.connect(DB_FILE)
+    conn.execute('DELETE FROM job_checkpoints WHERE job = ?', (job_name,))
+    conn.commit()
+    conn.close()
+
+
+def record_run(job_name, started_at, status, summary=None, resumed=False, message=None):
+    """Store one run in job_runs"""
+    summary = summary or {}
+    finished_at = datetime.now()
+    conn = sqlite3.connect(DB_FILE)
+    conn.execute('''
+        INSERT INTO job_runs
+        (job, started_at, finished_at, duration_sec, status, tickers,
+         new_analyses, errors, skipped, resumed, message)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (job_name, started_at.isoformat(), finished_at.isoformat(),
+          (finished_at - started_at).total_seconds(), status,
+          summary.get('tickers', 0), summary.get('new', 0), summary.get('errors', 0),
+          summary.get('skipped', 0), int(resumed), message))
+    conn.commit()
+    conn.close()
+
+
+def get_run_history(limit=20):
+    """Most recent runs, newest first"""
+    conn = sqlite3.connect(DB_FILE)
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute('SELECT * FROM job_runs ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
 
-    except subprocess.TimeoutExpired:
-        print("❌ Update timed out after 10 minutes")
+
+def publish_dashboard_snapshot():
+    """
+    Refresh macro/fear & greed data and publish a read-only snapshot
+
+    A read-only dashboard never writes, so the writer refreshes the data
+    the macro tab shows before swapping in the next snapshot.
+    """
+    try:
+        refresh_macro_data(force=True)
+        refresh_fear_greed(force=True)
+        result = publish_snapshot()
+        print(f"📸 Snapshot published: {result['path']} "
+              f"({result['bytes'] / 1024:,.0f} KB, {result['elapsed']:.2f}s)")
     except Exception as e:
+        print(f"⚠️  Snapshot publish failed: {str(e)[:120]}")
+
+
+def schedule_resume(job, failures=0):
+    """Run the job's checkpointed tickers once, RESUME_DELAY_MINUTES from now"""
+    schedule.every(RESUME_DELAY_MINUTES).minutes.do(run_job, job, resume=True, failures=failures)
+
+
+def run_job(job, resume=False, failures=0):
+    """
+    Run one scheduled update in-process
+
+    A resume run only processes the tickers left in the job's checkpoint.
+    Returns schedule.CancelJob for resume runs so they fire once. A failed
+    run checkpoints its tickers and is resumed up to MAX_FAILED_RESUMES
+    times in a row; after that the tickers wait for the next scheduled slot.
+    """
+    started_at = datetime.now()
+    label = f"{job['name']}{' (resume)' if resume else ''}"
+    print("="*80)
+    print(f"🕐 Starting {label} at {started_at.strftime('%Y-%m-%d %H:%M:%S')}")
+    print("="*80)
+
+    if resume:
+        tickers = load_checkpoint(job['name'])
+        if not tickers:
+            print("ℹ️  Nothing to resume")
+            return schedule.CancelJob
+    else:
+        tickers = tickers_for_market(job['market'])
+
+    if not tickers:
+        print(f"ℹ️  No {job['market']} tickers to update")
+        record_run(job['name'], started_at, 'empty', resumed=resume)
+        return schedule.CancelJob if resume else None
+
+    try:
+        summary = daily_update.daily_update(
+            tickers=tickers,
+            time_budget=JOB_TIME_BUDGET,
+            analyzer=get_analyzer()
+        )
+    except Exception as e:
+        traceback.print_exc()
         print(f"❌ Error running update: {str(e)}")
+        # Keep the tickers so the next resume/scheduled run picks them up
+        save_checkpoint(job['name'], tickers)
+        record_run(job['name'], started_at, 'failed', resumed=resume, message=str(e)[:200])
+        if failures < MAX_FAILED_RESUMES:
+            schedule_resume(job, failures=failures + 1)
+            print(f"🔁 {len(tickers)} tickers checkpointed, retrying in {RESUME_DELAY_MINUTES} minutes "
+                  f"({failures + 1}/{MAX_FAILED_RESUMES})")
+        else:
+            print(f"⏭️  {MAX_FAILED_RESUMES} retries failed - {len(tickers)} tickers wait for the next scheduled run")
+        return schedule.CancelJob if resume else None
+
+    leftover = summary['skipped_tickers']
+    if leftover:
+        save_checkpoint(job['name'], leftover)
+        schedule_resume(job)
+        status = 'partial'
+        print(f"⏸️  Time budget reached - {len(leftover)} tickers checkpointed, "
+              f"resuming in {RESUME_DELAY_MINUTES} minutes")
+    else:
+        clear_checkpoint(job['name'])
+        status = 'success'
+        print("✅ Update completed successfully")
 
+    record_run(job['name'], started_at, status, summary, resumed=resume)
+    if PUBLISH_SNAPSHOT:
+        publish_dashboard_snapshot()
+    print(f"⏱️  {label}: {(datetime.now() - started_at).total_seconds():.1f}s")
     print("="*80)
 
+    return schedule.CancelJob if resume else None
+
+
+def print_run_history(limit=20):
+    """Recent runs with durations"""
+    runs = get_run_history(limit)
+    if not runs:
+        print("❌ No runs recorded yet.")
+        return
+
+    print(f"{'Started':<20}{'Job':<12}{'Status':<9}{'Duration':>10}{'Tickers':>9}{'New':>6}{'Err':>5}{'Skip':>6}")
+    print("-" * 77)
+    for run in runs:
+        job = run['job'] + ('*' if run['resumed'] else '')
+        print(f"{run['started_at'][:19]:<20}{job:<12}{run['status']:<9}"
+              f"{run['duration_sec']:>9.1f}s{run['tickers']:>9}{run['new_analyses']:>6}"
+              f"{run['errors']:>5}{run['skipped']:>6}")
+    print("(* = resumed from checkpoint)")
+
+
 def main():
     """Main function to run scheduled tasks"""
+    init_job_tables()
+
     print("🚀 Railway Cron Job Service Started")
     print(f"📅 Current time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("⏰ Schedule: Daily at 22:00 UTC (after US market close)")
+    for job in SCHEDULES:
+        print(f"⏰ Schedule: {job['name']} daily at {job['at']} UTC ({job['market']} post-close)")
+    print(f"⏳ Soft time budget: {JOB_TIME_BUDGET}s per run")
     print("="*80)
 
-    # Run immediately on startup (optional)
-    print("\n🔄 Running initial update...")
-    run_daily_update()
+    # Update every market on startup, like the single full run this replaced.
+    # A full run covers any checkpoint left before a restart (its tickers are
+    # a subset) and replaces or clears it.
+    for job in SCHEDULES:
+        print(f"\n🔄 Running initial {job['name']} update...")
+        run_job(job)
 
-    # Schedule daily at 22:00 UTC
-    schedule.every().day.at("22:00").do(run_daily_update)
+    for job in SCHEDULES:
+        schedule.every().day.at(job['at']).do(run_job, job)
 
     print("\n⏳ Waiting for scheduled time...")
 
@@ -61,5 +287,17 @@ def main():
         schedule.run_pending()
         time.sleep(60)  # Check every minute
 
+
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='In-process daily update scheduler')
+    parser.add_argument('--history', action='store_true', help='Show recent runs and exit')
+    parser.add_argument('--limit', type=int, default=20, help='Number of runs for --history (default: 20)')
+    args = parser.parse_args()
+
+    if args.history:
+        init_job_tables()
+        print_run_history(args.limit)
+    else:
+        main()
@@ -4,15 +4,35 @@ Daily update script to analyze new signals
 Run this via cron/scheduler after market close
 """
 
-import yfinance as yf
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 from perplexity_analyzer import StockAnalyzer, get_cached_analysis
+from analysis_scheduler import analysis_priority, load_favorite_tickers
+from stock_cache import update_stock_cache, load_stock_data
+from gap_backfill import backfill_gaps, build_trading_calendar
+import panel_store
+from pipeline import Pipeline, RateLimiter, Stage
+from migrations import migrate
+from changesets import init_change_log
 import time
 import sqlite3
+import threading
 
 DB_FILE = "stock_data.db"
 
+# Signal detection window (same 6 months the script used to download every run)
+HISTORY_PERIOD = "6mo"
+HISTORY_DAYS = 180
+
+# Pipeline tuning
+FETCH_CHUNK_SIZE = 25     # tickers per grouped download
+FETCH_WORKERS = 2
+DETECT_WORKERS = 2
+DIFF_WORKERS = 2
+ANALYZE_WORKERS = 4
+QUEUE_SIZE = 50           # capacity of each stage's input queue
+API_MIN_INTERVAL = 2.0    # seconds between fresh Perplexity calls (rate limiting)
+
 # Same DEFAULT_TICKERS from app.py
 DEFAULT_TICKERS = "CRDO,INOD,SMCI,OSCR,IREN,MSTR,BMNR,XYZ,SNPS,BE,JOBY,VRT,NUKZ,SNOW,BLDP,TLS,AAPL,MSFT,GOOGL,TSLA,AMZN,NVDA,META,CRWD,INOD,BBAI,ANET,AEHR,CEVA,IBM,NICE,ADBE,STGW,AUDC,SPR,TNXP,ENPH,SMCI,KOPN,BLDP,TLS,SSYS,LQDT,ABSI,SLDP,INVZ,VVX,DEFT,BLNK,ARDX,SGML,SEZL,QUBT,RGTI,QBTS,CHGG,SOFI,SHOP,COIN,HOOD,TSM,AMD,MU,PLTR,AVGO,RKLB,ASTS,APP,QS,NEE,FLNC,EOSE,CCJ,SMR,CEG,VST,OKLO,ORCL,APLD,AIRO,CIFR,NBIS,IONQ,CRCL,BITI"
 
@@ -29,47 +49,95 @@ def init_signal_state_table():
             last_checked TEXT
         )
     ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS signal_events (
+            ticker TEXT,
+            signal_date TEXT,
+            signal_type TEXT,
+            previous_date TEXT,
+            detected_at TEXT,
+            PRIMARY KEY (ticker, signal_date)
+        )
+    ''')
     conn.commit()
     conn.close()
 
+    # Indexes and schema changes are versioned in migrations.py
+    migrate()
+    # Changeset triggers must exist before this run writes anything
+    init_change_log()
 
-def get_previous_signal_state(ticker):
-    """Get last known signal date for ticker"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute(
-        'SELECT last_signal_date, last_signal_type FROM signal_state WHERE ticker = ?',
-        (ticker,)
-    )
-    result = cursor.fetchone()
-    conn.close()
-    return result if result else (None, None)
 
+def load_signal_states(tickers=None):
+    """Load previous signal state for all (or the given) tickers in one query"""
+    query = 'SELECT ticker, last_signal_date, last_signal_type FROM signal_state'
+    params = []
+    if tickers is not None:
+        tickers = list(tickers)
+        if not tickers:
+            return {}
+        query += f" WHERE ticker IN ({','.join('?' * len(tickers))})"
+        params = tickers
 
-def update_signal_state(ticker, signal_date, signal_type):
-    """Update signal state after analysis"""
     conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT OR REPLACE INTO signal_state (ticker, last_signal_date, last_signal_type, last_checked)
-        VALUES (?, ?, ?, ?)
-    ''', (ticker, signal_date, signal_type, datetime.now().isoformat()))
-    conn.commit()
+    rows = conn.execute(query, params).fetchall()
     conn.close()
 
+    return {
+        ticker: (signal_date, signal_type)
+        for ticker, signal_date, signal_type in rows
+    }
+
 
-def get_cached_stock_data(ticker, period="6mo"):
-    """Fetch stock data"""
-    try:
-        stock = yf.Ticker(ticker)
-        df = stock.history(period=period)
-        if df.empty:
-            return None
-        if df.index.tz is not None:
-            df.index = df.index.tz_localize(None)
-        return df
-    except:
-        return None
+def diff_signal_states(previous, current):
+    """
+    Compare current signals with previous state in memory
+
+    Args:
+        previous: {ticker: (last_signal_date, last_signal_type)} from load_signal_states
+        current: {ticker: analyze_signal result}
+
+    Returns:
+        (changed, unchanged) lists of dicts with ticker, date, raw_signal_type
+        and previous_date
+    """
+    changed = []
+    unchanged = []
+    for ticker, signal in current.items():
+        prev_date, _ = previous.get(ticker, (None, None))
+        row = {
+            'ticker': ticker,
+            'date': signal['last_signal_date'],
+            'raw_signal_type': str(signal['last_signal_type']),
+            'previous_date': prev_date
+        }
+        if prev_date == signal['last_signal_date']:
+            unchanged.append(row)
+        else:
+            changed.append(row)
+    return changed, unchanged
+
+
+def write_signal_states(rows, events=()):
+    """
+    Write signal_state rows and signal_events in a single transaction
+
+    Args:
+        rows: iterable of (ticker, signal_date, signal_type)
+        events: iterable of diff_signal_states change dicts to log
+    """
+    checked = datetime.now().isoformat()
+    conn = sqlite3.connect(DB_FILE)
+    with conn:
+        conn.executemany('''
+            INSERT OR REPLACE INTO signal_state (ticker, last_signal_date, last_signal_type, last_checked)
+            VALUES (?, ?, ?, ?)
+        ''', [(ticker, signal_date, signal_type, checked) for ticker, signal_date, signal_type in rows])
+        conn.executemany('''
+            INSERT OR REPLACE INTO signal_events (ticker, signal_date, signal_type, previous_date, detected_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(e['ticker'], e['date'], e['raw_signal_type'], e['previous_date'], checked) for e in events])
+    conn.close()
 
 
 def analyze_signal(df):
@@ -112,88 +180,235 @@ def analyze_signal(df):
     }
 
 
-def daily_update():
-    """Main update function"""
+def default_tickers():
+    """DEFAULT_TICKERS as a de-duplicated list"""
+    tickers = [t.strip().upper() for t in DEFAULT_TICKERS.split(',') if t.strip()]
+    return list(set(tickers))  # Remove duplicates
+
+
+def daily_update(tickers=None, time_budget=None, analyzer=None):
+    """
+    Main update function
+
+    Runs as a staged pipeline with bounded queues between stages:
+    fetch (batched price download) → detect (EMA signals per chunk) → diff
+    (each chunk in memory against signal_state loaded in one query) → analyze (Perplexity, priority
+    order, changed tickers only) → write (signal_state rows and signal_events
+    for analyzed changes, committed in one transaction at the end). Each
+    stage has its own worker count, so the slowest stage sets throughput. time_budget (seconds) is soft: once
+    exceeded no new downloads or analyses are started, work in flight
+    finishes and is saved, and the untouched tickers are returned in
+    'skipped_tickers' so the caller can resume them.
+
+    Args:
+        tickers: tickers to update (default: DEFAULT_TICKERS)
+        time_budget: soft time limit in seconds
+        analyzer: StockAnalyzer to reuse (one HTTP session per analyze worker)
+
+    Returns:
+        dict with counts, 'skipped_tickers', 'changed' tickers and 'elapsed' seconds
+    """
     print("="*80)
     print(f"📊 Daily Update - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*80)
 
     init_signal_state_table()
 
-    tickers = [t.strip().upper() for t in DEFAULT_TICKERS.split(',') if t.strip()]
-    tickers = list(set(tickers))  # Remove duplicates
-
-    analyzer = StockAnalyzer()
-    new_count = 0
-    cached_count = 0
-    error_count = 0
-
-    for idx, ticker in enumerate(tickers, 1):
-        print(f"\n[{idx}/{len(tickers)}] {ticker}")
-
-        try:
-            # Get current signal
-            df = get_cached_stock_data(ticker)
-            if df is None:
-                print(f"  ⚠️  No data")
-                error_count += 1
-                continue
-
+    if tickers is None:
+        tickers = default_tickers()
+    tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+
+    analyzer = analyzer or StockAnalyzer()
+    favorite_tickers = load_favorite_tickers()
+    rate_limiter = RateLimiter(API_MIN_INTERVAL)
+    history_start = datetime.now() - timedelta(days=HISTORY_DAYS)
+    deadline = time.time() + time_budget if time_budget else None
+    previous_states = load_signal_states(tickers)
+    # Trading calendar for gap detection, computed once from stored bars
+    calendars = build_trading_calendar()
+    signal_events = []
+    skipped_tickers = []
+
+    counts = {'fetched_bars': 0, 'new': 0, 'reused': 0, 'cached': 0,
+              'no_signal': 0, 'errors': 0, 'skipped': 0}
+    counts_lock = threading.Lock()
+    print_lock = threading.Lock()
+
+    def count(key, n=1):
+        with counts_lock:
+            counts[key] += n
+
+    def log(message):
+        with print_lock:
+            print(message)
+
+    def fetch(chunk, emit):
+        if deadline and time.time() > deadline:
+            log(f"  ⏭️  {len(chunk)} tickers: Fetch skipped (time budget)")
+            with counts_lock:
+                counts['skipped'] += len(chunk)
+                skipped_tickers.extend(chunk)
+            return
+
+        # Only bars after each ticker's MAX(date) are downloaded
+        result = update_stock_cache(chunk, period=HISTORY_PERIOD)
+        count('fetched_bars', result['bars'])
+        # Rewritten history invalidates the stored signal state for those tickers
+        for ticker in result['adjusted']:
+            previous_states.pop(ticker, None)
+        # Holes left by failed runs and missing early history, batched per span
+        gaps = backfill_gaps(chunk, period=HISTORY_PERIOD, calendars=calendars)
+        if gaps['bars']:
+            log(f"  🩹 {len(chunk)} tickers: Backfilled {gaps['bars']} bars "
+                f"({gaps['spans']} gaps, {gaps['requests']} requests)")
+        count('fetched_bars', gaps['bars'])
+        frames = load_stock_data(chunk, start=history_start)
+        for ticker in chunk:
+            if ticker not in frames:
+                log(f"  ⚠️  {ticker}: No data")
+                count('errors')
+        if frames:
+            emit(frames)
+
+    def detect(frames, emit):
+        # One item per fetch chunk, so the diff stage compares the chunk in bulk
+        signals = {}
+        for ticker, df in frames.items():
             current_signal = analyze_signal(df)
-            current_date = current_signal['last_signal_date']
-
-            if not current_date:
-                print(f"  ℹ️  No signal")
+            if not current_signal['last_signal_date']:
+                log(f"  ℹ️  {ticker}: No signal")
+                count('no_signal')
                 continue
+            signals[ticker] = current_signal
+        if signals:
+            emit(signals)
+
+    def diff(signals, emit):
+        changed, unchanged = diff_signal_states(previous_states, signals)
+
+        for row in unchanged:
+            ticker = row['ticker']
+            log(f"  💾 {ticker}: Already cached ({row['date']})")
+            count('cached')
+            emit(('state', (ticker, row['date'], row['raw_signal_type'])))
+
+        for row in changed:
+            ticker = row['ticker']
+            current_signal = signals[ticker]
+            # Map signal type
+            signal_type_map = {1: 'BUY', -1: 'SELL'}
+            signal_type = signal_type_map.get(current_signal['last_signal_type'], None)
+            if current_signal['status'] == 'STRONG BUY':
+                signal_type = 'STRONG BUY'
+            elif current_signal['status'] == 'WARNING':
+                signal_type = 'WARNING'
+
+            log(f"  🆕 {ticker}: New signal {row['date']} ({signal_type})")
+            # The change is logged in signal_events by the write stage, only once analysis succeeds
+            emit(('task', {
+                'ticker': ticker,
+                'date': row['date'],
+                'signal_type': signal_type,
+                'status': current_signal['status'],
+                'raw_signal_type': row['raw_signal_type'],
+                'signal_direction': int(current_signal['last_signal_type']),
+                'event': row
+            }))
+
+    def analyze(item, emit):
+        kind, payload = item
+        if kind == 'state':
+            emit((payload, None))
+            return
+
+        task = payload
+        if deadline and time.time() > deadline:
+            log(f"  ⏭️  {task['ticker']}: Skipped (time budget)")
+            with counts_lock:
+                counts['skipped'] += 1
+                skipped_tickers.append(task['ticker'])
+            return
+
+        # Only fresh API calls are rate limited
+        if not get_cached_analysis(task['ticker'], task['date']):
+            rate_limiter.wait()
+
+        result = analyzer.analyze_stock_price_movement(
+            ticker=task['ticker'],
+            date=task['date'],
+            signal_type=task['signal_type'],
+            signal_direction=task['signal_direction']
+        )
 
-            # Get previous signal state
-            prev_date, prev_type = get_previous_signal_state(ticker)
-
-            # Check if signal changed
-            if prev_date != current_date:
-                print(f"  🆕 New signal: {current_date}")
-
-                # Map signal type
-                signal_type_map = {1: 'BUY', -1: 'SELL'}
-                signal_type = signal_type_map.get(current_signal['last_signal_type'], None)
-                if current_signal['status'] == 'STRONG BUY':
-                    signal_type = 'STRONG BUY'
-                elif current_signal['status'] == 'WARNING':
-                    signal_type = 'WARNING'
-
-                # Analyze
-                result = analyzer.analyze_stock_price_movement(
-                    ticker=ticker,
-                    date=current_date,
-                    signal_type=signal_type
-                )
-
-                if result['success']:
-                    print(f"  ✅ Analyzed and cached")
-                    new_count += 1
-                    update_signal_state(ticker, current_date, str(current_signal['last_signal_type']))
-                else:
-                    print(f"  ❌ Analysis failed")
-                    error_count += 1
-
-                time.sleep(2)  # Rate limiting
+        if result['success']:
+            if result.get('reused'):
+                log(f"  ♻️  {task['ticker']}: Reused analysis from {result['reused_from']}")
+                count('reused')
             else:
-                print(f"  💾 Already cached ({current_date})")
-                cached_count += 1
-                update_signal_state(ticker, current_date, str(current_signal['last_signal_type']))
-
-        except Exception as e:
-            print(f"  ❌ Error: {str(e)[:50]}")
-            error_count += 1
+                log(f"  ✅ {task['ticker']}: Analyzed and cached")
+                count('new')
+            emit(((task['ticker'], task['date'], task['raw_signal_type']), task['event']))
+        else:
+            log(f"  ❌ {task['ticker']}: Analysis failed")
+            count('errors')
+
+    def analysis_order(item):
+        # State-only updates pass straight through; tasks go by priority
+        kind, payload = item
+        if kind == 'state':
+            return float('-inf')
+        return analysis_priority(payload, favorite_tickers)
+
+    pending_states = []
+
+    def write(item, emit):
+        row, event = item
+        pending_states.append(row)
+        if event is not None:
+            signal_events.append(event)
+
+    pipeline = Pipeline([
+        Stage('fetch', fetch, workers=FETCH_WORKERS, maxsize=QUEUE_SIZE),
+        Stage('detect', detect, workers=DETECT_WORKERS, maxsize=QUEUE_SIZE),
+        Stage('diff', diff, workers=DIFF_WORKERS, maxsize=QUEUE_SIZE),
+        Stage('analyze', analyze, workers=ANALYZE_WORKERS, maxsize=QUEUE_SIZE, priority=analysis_order),
+        Stage('write', write, workers=1, maxsize=QUEUE_SIZE),
+    ])
+
+    chunks = [tickers[i:i + FETCH_CHUNK_SIZE] for i in range(0, len(tickers), FETCH_CHUNK_SIZE)]
+    # Bars saved by every fetch chunk go into the panel once, when the run ends
+    with panel_store.batched_updates():
+        pipeline.run(chunks)
+
+    # All state changes and detected signal events in one transaction
+    write_signal_states(pending_states, signal_events)
 
     print("\n" + "="*80)
     print("📊 Update Complete")
     print("="*80)
-    print(f"  🆕 New analyses: {new_count}")
-    print(f"  💾 Cached: {cached_count}")
-    print(f"  ❌ Errors: {error_count}")
+    print(f"  📥 Fetched bars: {counts['fetched_bars']}")
+    print(f"  🆕 New analyses: {counts['new']}")
+    print(f"  ♻️  Reused analyses: {counts['reused']}")
+    print(f"  💾 Cached: {counts['cached']}")
+    print(f"  ℹ️  No signal: {counts['no_signal']}")
+    print(f"  ❌ Errors: {counts['errors']}")
+    if counts['skipped']:
+        print(f"  ⏭️  Skipped (time budget): {counts['skipped']}")
+    if signal_events:
+        changed = sorted(e['ticker'] for e in signal_events)
+        print(f"  🔀 Changed tickers ({len(changed)}): {', '.join(changed)}")
+    print("\n⏱️  Stage timing")
+    pipeline.print_timing()
     print("="*80)
 
+    return dict(
+        counts,
+        tickers=len(tickers),
+        skipped_tickers=sorted(skipped_tickers),
+        changed=sorted(e['ticker'] for e in signal_events),
+        elapsed=pipeline.elapsed
+    )
+
 
 if __name__ == "__main__":
     daily_update()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+데이터 버전 토큰
+
+화면/차트 캐시가 "데이터가 바뀌었는지"를 싸게 확인할 수 있도록
+데이터셋별 쓰기 카운터를 data_versions 테이블에 저장합니다.
+stock_data에 쓰는 함수는 같은 트랜잭션에서 bump_data_version()을 호출합니다.
+"""
+
+import sqlite3
+from datetime import datetime
+
+from db_snapshot import READ_ONLY, connect_read
+
+DB_FILE = "stock_data.db"
+
+
+def init_data_version_table():
+    """데이터 버전 테이블 초기화"""
+    conn = sqlite3.connect(DB_FILE)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER,
+            updated_at TEXT
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def bump_data_version(conn, name: str = 'stock_data'):
+    """
+    쓰기 카운터 증가 (호출자의 트랜잭션 안에서 실행, 커밋은 호출자가 함)
+
+    Args:
+        conn: 데이터를 쓴 sqlite3 연결
+        name: 데이터셋 이름
+    """
+    conn.execute('''
+        INSERT INTO data_versions (name, version, updated_at) VALUES (?, 1, ?)
+        ON CONFLICT(name) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at
+    ''', (name, datetime.now().isoformat()))
+
+
+def get_data_version(name: str = 'stock_data') -> str:
+    """
+    데이터 버전 토큰 (stock_data는 MAX(date)와 쓰기 카운터 조합)
+
+    두 쿼리 모두 인덱스만 읽으므로 매 재실행마다 호출해도 1ms 안팎입니다.
+    """
+    conn = connect_read()
+    row = conn.execute('SELECT version FROM data_versions WHERE name = ?', (name,)).fetchone()
+    version = row[0] if row else 0
+
+    if name == 'stock_data':
+        max_date = conn.execute('SELECT MAX(date) FROM stock_data').fetchone()[0]
+        conn.close()
+        return f"{max_date}:{version}"
+
+    conn.close()
+    return str(version)
+
+
+# DB 초기화
+if not READ_ONLY:
+    init_data_version_table()
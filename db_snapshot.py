@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+대시보드용 읽기 전용 DB 스냅샷
+
+쓰는 프로세스(cron/배치)가 stock_data.db를 SQLite backup API로 임시 파일에 복사한 뒤
+os.replace로 스냅샷 파일과 바꿉니다. DASHBOARD_READ_ONLY=1이면 대시보드는 스냅샷을
+mode=ro&immutable=1로 열어 잠금 확인 없이 읽고, 화면에서 DB에 쓰지 않습니다
+(주가/지표 갱신은 쓰는 쪽이 하고 다음 스냅샷에 반영됨).
+
+스냅샷 파일은 제자리에서 수정되지 않고 교체만 되므로 immutable로 열어도 안전하며,
+이미 열린 연결은 이전 파일을 끝까지 읽고 새 연결부터 새 스냅샷을 엽니다.
+여러 워커 프로세스가 같은 파일을 읽으므로 운영체제 페이지 캐시도 공유됩니다.
+
+환경변수:
+    DASHBOARD_READ_ONLY: 1이면 대시보드가 스냅샷만 읽음 (기본값: 0).
+        이 값이 켜진 프로세스는 import 시 테이블 생성/마이그레이션/트리거 설치도 하지 않으므로
+        cron/배치처럼 DB에 쓰는 프로세스에는 설정하지 않습니다.
+    DB_SNAPSHOT_FILE: 스냅샷 경로 (기본값: stock_data.snapshot.db)
+    DB_PUBLISH_SNAPSHOT: 1이면 cron 작업이 실행 후 스냅샷 발행 (기본값: 0)
+
+사용 예:
+    python3 db_snapshot.py publish    # 지금 DB로 스냅샷 발행
+    python3 db_snapshot.py            # 스냅샷 정보
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime
+from urllib.parse import quote
+
+DB_FILE = "stock_data.db"
+
+DB_SNAPSHOT_FILE = os.getenv('DB_SNAPSHOT_FILE', 'stock_data.snapshot.db')
+READ_ONLY = os.getenv('DASHBOARD_READ_ONLY', '0') == '1'
+PUBLISH_SNAPSHOT = os.getenv('DB_PUBLISH_SNAPSHOT', '0') == '1'
+
+
+def _uri(path: str, immutable: bool) -> str:
+    uri = f"file:{quote(os.path.abspath(path))}?mode=ro"
+    return uri + ('&immutable=1' if immutable else '')
+
+
+def connect_read():
+    """
+    읽기용 연결
+
+    읽기 전용 모드면 스냅샷을 immutable로 열고, 스냅샷이 아직 없으면 원본 DB를
+    mode=ro로 엽니다(쓰는 쪽이 수정 중일 수 있으므로 immutable 아님).
+    그 외에는 기존과 같이 원본 DB를 엽니다.
+    """
+    if READ_ONLY:
+        if os.path.exists(DB_SNAPSHOT_FILE):
+            return sqlite3.connect(_uri(DB_SNAPSHOT_FILE, immutable=True), uri=True)
+        return sqlite3.connect(_uri(DB_FILE, immutable=False), uri=True)
+    return sqlite3.connect(DB_FILE)
+
+
+def publish_snapshot(snapshot_file: str = None) -> dict:
+    """
+    현재 DB를 스냅샷으로 발행 (backup API로 복사 → 검사 → os.replace)
+
+    backup API는 복사 중 다른 쓰기가 있어도 일관된 시점의 사본을 만듭니다.
+
+    Returns:
+        {'path': 경로, 'bytes': 크기, 'elapsed': 초}
+    """
+    snapshot_file = snapshot_file or DB_SNAPSHOT_FILE
+    started = time.time()
+
+    # 같은 디렉토리의 임시 파일에 만들어야 os.replace가 원자적
+    tmp_path = f"{snapshot_file}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    source = sqlite3.connect(DB_FILE)
+    target = sqlite3.connect(tmp_path)
+    try:
+        source.backup(target)
+        target.execute('PRAGMA journal_mode = DELETE')
+        result = target.execute('PRAGMA quick_check').fetchone()[0]
+        if result != 'ok':
+            raise sqlite3.DatabaseError(f"snapshot check failed: {result}")
+    finally:
+        target.close()
+        source.close()
+
+    os.replace(tmp_path, snapshot_file)
+    return {
+        'path': snapshot_file,
+        'bytes': os.path.getsize(snapshot_file),
+        'elapsed': time.time() - started
+    }
+
+
+def snapshot_info(snapshot_file: str = None) -> dict:
+    """스냅샷 파일 정보 (없으면 None)"""
+    snapshot_file = snapshot_file or DB_SNAPSHOT_FILE
+    if not os.path.exists(snapshot_file):
+        return None
+
+    conn = sqlite3.connect(_uri(snapshot_file, immutable=True), uri=True)
+    max_date = conn.execute('SELECT MAX(date) FROM stock_data').fetchone()[0]
+    conn.close()
+    return {
+        'path': snapshot_file,
+        'bytes': os.path.getsize(snapshot_file),
+        'published_at': datetime.fromtimestamp(os.path.getmtime(snapshot_file)).isoformat(timespec='seconds'),
+        'max_date': max_date
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="대시보드용 읽기 전용 DB 스냅샷")
+    parser.add_argument('command', nargs='?', choices=['publish', 'info'], default='info')
+    parser.add_argument('--path', default=DB_SNAPSHOT_FILE, help='스냅샷 경로')
+    args = parser.parse_args()
+
+    if args.command == 'publish':
+        result = publish_snapshot(args.path)
+        print(f"✅ 스냅샷 발행: {result['path']} ({result['bytes'] / 1024:,.0f} KB, {result['elapsed']:.2f}초)")
+        return
+
+    info = snapshot_info(args.path)
+    if info is None:
+        print(f"⚠️  스냅샷이 없습니다: {args.path}")
+    else:
+        print(f"📸 {info['path']}: {info['bytes'] / 1024:,.0f} KB, "
+              f"발행 {info['published_at']}, 마지막 봉 {info['max_date']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+오프라인 테스트용 가짜 Perplexity API 서버 및 가짜 시장 데이터
+
+네트워크 없이 배치 동시성, 재시도, 캐싱을 부하 테스트할 수 있도록
+지연시간 분포와 429/5xx 오류를 주입할 수 있습니다.
+
+사용 예:
+    # 가짜 Perplexity 서버 실행 (지연 평균 800ms, 429 5%, 5xx 2%)
+    python3 fake_services.py --port 8765 --latency lognormal:800:0.5 --error-429 0.05 --error-5xx 0.02
+
+    # 다른 터미널에서 가짜 서버와 가짜 시장 데이터로 배치 실행
+    PERPLEXITY_API_URL=http://127.0.0.1:8765/chat/completions PERPLEXITY_API_KEY=offline \\
+    MARKET_DATA_PROVIDER=fake python3 batch_analyze_all.py --delay 0
+
+가짜 시장 데이터 설정 (환경변수):
+    FAKE_MARKET_LATENCY: 지연시간 분포 (기본값: fixed:0)
+    FAKE_MARKET_ERROR_RATE: 조회 실패 확률 (기본값: 0)
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 가짜 시세 시작일 (같은 날짜는 조회 기간과 관계없이 항상 같은 값)
+SYNTHETIC_START_DATE = "2015-01-01"
+
+
+class LatencyModel:
+    """
+    지연시간 분포
+
+    spec 형식:
+        fixed:MS                 항상 MS 밀리초
+        uniform:MIN:MAX          MIN~MAX 균등분포
+        lognormal:MEDIAN:SIGMA   중앙값 MEDIAN, 로그 표준편차 SIGMA
+    """
+
+    def __init__(self, spec: str = "fixed:0", seed=None):
+        parts = spec.split(':')
+        self.kind = parts[0]
+        self.params = [float(p) for p in parts[1:]]
+        self.random = random.Random(seed)
+
+        if self.kind not in ('fixed', 'uniform', 'lognormal'):
+            raise ValueError(f"알 수 없는 지연시간 분포: {spec}")
+
+    def sample_ms(self) -> float:
+        if self.kind == 'fixed':
+            return self.params[0] if self.params else 0.0
+        if self.kind == 'uniform':
+            return self.random.uniform(self.params[0], self.params[1])
+        median, sigma = self.params
+        return median * self.random.lognormvariate(0, sigma)
+
+    def sleep(self):
+        delay = self.sample_ms()
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+
+def _parse_period_days(period: str):
+    """yfinance period 문자열을 일수로 변환 (max면 None)"""
+    if period in (None, 'max'):
+        return None
+    units = {'d': 1, 'wk': 7, 'mo': 30, 'y': 365}
+    for unit, days in units.items():
+        if period.endswith(unit) and period[:-len(unit)].isdigit():
+            return int(period[:-len(unit)]) * days
+    raise ValueError(f"지원하지 않는 기간: {period}")
+
+
+def synthetic_history(symbol: str, start=None, end=None):
+    """
+    종목별로 결정적인 가짜 일봉 OHLCV 생성
+
+    티커 이름으로 시드를 정하고 SYNTHETIC_START_DATE부터 랜덤워크를 만들기 때문에
+    같은 종목 · 같은 날짜는 항상 같은 값을 가집니다.
+    """
+    import numpy as np
+    import pandas as pd
+
+    end = pd.Timestamp(end or datetime.now().date() + timedelta(days=1))
+    dates = pd.bdate_range(SYNTHETIC_START_DATE, end - timedelta(days=1))
+
+    # 필드별로 별도 난수열을 사용해 기간이 늘어나도 기존 날짜 값이 바뀌지 않도록 함
+    seed = zlib.crc32(symbol.encode('utf-8'))
+    params = np.random.default_rng([seed, 0])
+    base_price = params.uniform(10, 500)
+    drift = params.normal(0.0003, 0.0005)
+    volatility = params.uniform(0.01, 0.04)
+
+    def series(field):
+        return np.random.default_rng([seed, field])
+
+    n = len(dates)
+    close = base_price * np.exp(np.cumsum(series(1).normal(drift, volatility, n)))
+    open_ = close * (1 + series(2).normal(0, volatility / 3, n))
+    high = np.maximum(open_, close) * (1 + np.abs(series(3).normal(0, volatility / 2, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(series(4).normal(0, volatility / 2, n)))
+    volume = series(5).integers(100_000, 10_000_000, n)
+
+    df = pd.DataFrame({
+        'Open': open_,
+        'High': high,
+        'Low': low,
+        'Close': close,
+        'Volume': volume,
+        'Dividends': 0.0,
+        'Stock Splits': 0.0,
+    }, index=dates.tz_localize('America/New_York'))
+    df.index.name = 'Date'
+
+    if start is not None:
+        df = df[df.index >= pd.Timestamp(start).tz_localize('America/New_York')]
+    return df
+
+
+class FakeTicker:
+    """yf.Ticker 대체 객체 (history, info 지원)"""
+
+    def __init__(self, symbol: str, latency: LatencyModel = None, error_rate: float = None):
+        self.ticker = symbol
+        self.latency = latency or LatencyModel(os.getenv('FAKE_MARKET_LATENCY', 'fixed:0'))
+        self.error_rate = error_rate if error_rate is not None else float(os.getenv('FAKE_MARKET_ERROR_RATE', '0'))
+
+    def _maybe_fail(self):
+        self.latency.sleep()
+        if random.random() < self.error_rate:
+            raise ConnectionError(f"{self.ticker}: 주입된 시장 데이터 오류")
+
+    def history(self, period=None, start=None, end=None, **kwargs):
+        self._maybe_fail()
+
+        if start is None and period is not None:
+            days = _parse_period_days(period)
+            if days is not None:
+                start = datetime.now().date() - timedelta(days=days)
+        return synthetic_history(self.ticker, start=start, end=end)
+
+    @property
+    def info(self):
+        self._maybe_fail()
+        return {
+            'longName': f"{self.ticker} Synthetic Corp.",
+            'sector': 'Technology',
+            'longBusinessSummary': f"Synthetic company for offline testing ({self.ticker}).",
+        }
+
+
+def fake_download(symbols: list, start=None, period: str = None, end=None) -> dict:
+    """market_data.download 대체 (여러 종목을 한 번의 지연으로 반환)"""
+    batch = FakeTicker(','.join(symbols))
+    batch._maybe_fail()
+
+    frames = {}
+    for symbol in symbols:
+        df = FakeTicker(symbol, latency=LatencyModel(), error_rate=0).history(period=period, start=start, end=end)
+        df.index = df.index.tz_localize(None)
+        frames[symbol] = df[['Open', 'High', 'Low', 'Close', 'Volume']]
+    return frames
+
+
+class FakePerplexityHandler(BaseHTTPRequestHandler):
+    """Perplexity chat-completions 엔드포인트 흉내"""
+
+    # 서버 설정 (run_fake_perplexity_server에서 지정)
+    latency = LatencyModel()
+    error_429_rate = 0.0
+    error_5xx_rate = 0.0
+    request_count = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+
+        with self.lock:
+            type(self).request_count += 1
+
+        self.latency.sleep()
+
+        roll = random.random()
+        if roll < self.error_429_rate:
+            self._send_json(429, {'error': {'message': 'rate limited (injected)'}}, {'Retry-After': '1'})
+            return
+        if roll < self.error_429_rate + self.error_5xx_rate:
+            self._send_json(random.choice([500, 502, 503]), {'error': {'message': 'server error (injected)'}})
+            return
+
+        try:
+            payload = json.loads(body)
+            prompt = payload['messages'][-1]['content']
+        except (ValueError, KeyError, IndexError):
+            self._send_json(400, {'error': {'message': 'invalid request'}})
+            return
+
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        content = (
+            f"[오프라인 응답 {digest[:8]}] 해당 기간 주요 뉴스는 가상의 실적 발표와 신규 계약입니다. "
+            f"매출은 전년 대비 {int(digest[8:10], 16) % 40 + 5}% 증가했습니다. "
+            "이 응답은 부하 테스트용 가짜 서버에서 생성되었습니다."
+        )
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+
+        self._send_json(200, {
+            'id': digest[:16],
+            'model': payload.get('model', 'sonar'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'citations': [f"https://example.com/news/{digest[:12]}"],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        })
+
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_fake_perplexity_server(
+    port: int = 8765,
+    latency: str = "fixed:0",
+    error_429_rate: float = 0.0,
+    error_5xx_rate: float = 0.0,
+    background: bool = False
+):
+    """
+    가짜 Perplexity 서버 실행
+
+    Args:
+        background: True면 데몬 스레드에서 실행하고 서버 객체 반환 (server.shutdown()으로 종료)
+    """
+    handler = type('ConfiguredFakePerplexityHandler', (FakePerplexityHandler,), {
+        'latency': LatencyModel(latency),
+        'error_429_rate': error_429_rate,
+        'error_5xx_rate': error_5xx_rate,
+        'request_count': 0,
+        'lock': threading.Lock(),
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    print(f"🧪 가짜 Perplexity 서버: http://127.0.0.1:{port}/chat/completions")
+    print(f"   지연시간: {latency}, 429: {error_429_rate:.0%}, 5xx: {error_5xx_rate:.0%}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n종료 (요청 {handler.request_count}건 처리)")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='오프라인 테스트용 가짜 Perplexity API 서버')
+    parser.add_argument('--port', type=int, default=8765, help='포트 (기본값: 8765)')
+    parser.add_argument('--latency', type=str, default='fixed:0',
+                        help='지연시간 분포 (fixed:MS, uniform:MIN:MAX, lognormal:MEDIAN:SIGMA)')
+    parser.add_argument('--error-429', type=float, default=0.0, help='429 응답 확률 (0~1)')
+    parser.add_argument('--error-5xx', type=float, default=0.0, help='5xx 응답 확률 (0~1)')
+    args = parser.parse_args()
+
+    run_fake_perplexity_server(args.port, args.latency, args.error_429, args.error_5xx)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+즐겨찾기 그룹 저장소 (SQLite)
+
+favorites.json 대신 favorite_groups / favorite_tickers 테이블에 저장합니다.
+테이블을 처음 만들 때 favorites.json이 있으면 한 번만 가져옵니다.
+
+읽기는 프로세스 메모리에 캐시된 뷰를 반환하고, 쓰기는 한 트랜잭션으로 처리하면서
+data_versions의 'favorites' 카운터를 올립니다. 읽을 때 카운터(기본키 조회 한 번)만
+비교하므로 다른 프로세스(대시보드 ↔ cron)가 편집한 내용도 바로 반영됩니다.
+여러 세션이 동시에 편집해도 파일을 통째로 덮어쓰지 않으므로 서로의 변경을 지우지 않습니다.
+
+읽기 전용 모드(DASHBOARD_READ_ONLY=1)에서는 스냅샷에서 읽고 편집은 하지 않습니다
+(편집 함수는 DB를 열지 않고 False 반환). 그룹 편집은 쓰는 쪽 DB에서 하고 다음 스냅샷부터 보입니다.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from data_version import bump_data_version
+from db_snapshot import READ_ONLY, connect_read
+
+DB_FILE = "stock_data.db"
+FAVORITES_FILE = "favorites.json"
+
+# (favorites 데이터 버전, {그룹명: [티커, ...]})
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def init_favorites_db(json_path: str = FAVORITES_FILE):
+    """즐겨찾기 테이블 초기화 (처음 생성 시 favorites.json 가져오기)"""
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'favorite_groups'")
+    first_run = cursor.fetchone() is None
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS favorite_groups (
+            name TEXT PRIMARY KEY,
+            position INTEGER,
+            updated_at TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS favorite_tickers (
+            group_name TEXT,
+            ticker TEXT,
+            position INTEGER,
+            PRIMARY KEY (group_name, ticker)
+        )
+    ''')
+
+    if first_run:
+        groups = _read_json_favorites(json_path)
+        now = datetime.now().isoformat()
+        for position, (name, tickers) in enumerate(groups.items()):
+            cursor.execute(
+                'INSERT INTO favorite_groups (name, position, updated_at) VALUES (?, ?, ?)',
+                (name, position, now)
+            )
+            cursor.executemany(
+                'INSERT OR IGNORE INTO favorite_tickers (group_name, ticker, position) VALUES (?, ?, ?)',
+                [(name, ticker, i) for i, ticker in enumerate(tickers)]
+            )
+        if groups:
+            print(f"⭐ {json_path}에서 즐겨찾기 그룹 {len(groups)}개를 가져왔습니다.")
+
+    conn.commit()
+    conn.close()
+
+
+def _read_json_favorites(path: str) -> dict:
+    """기존 favorites.json 읽기 (없거나 손상되면 빈 dict)"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('favorites', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def invalidate_cache():
+    """캐시된 즐겨찾기 뷰 무효화"""
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+def load_favorites() -> dict:
+    """
+    즐겨찾기 데이터 로드 (캐시)
+
+    Returns:
+        {"favorites": {그룹명: [티커, ...]}} - favorites.json과 같은 형식
+    """
+    global _cache
+    with _cache_lock:
+        conn = connect_read()
+        try:
+            row = conn.execute("SELECT version FROM data_versions WHERE name = 'favorites'").fetchone()
+            version = row[0] if row else 0
+
+            if _cache is None or _cache[0] != version:
+                groups = {name: [] for (name,) in conn.execute(
+                    'SELECT name FROM favorite_groups ORDER BY position, name'
+                )}
+                for group_name, ticker in conn.execute(
+                    'SELECT group_name, ticker FROM favorite_tickers ORDER BY group_name, position'
+                ):
+                    if group_name in groups:
+                        groups[group_name].append(ticker)
+                _cache = (version, groups)
+        except sqlite3.OperationalError:
+            # 테이블이 아직 없는 스냅샷 (쓰는 쪽이 init_favorites_db 전에 발행)
+            _cache = (None, {})
+        finally:
+            conn.close()
+
+        # 호출자가 수정해도 캐시가 바뀌지 않도록 복사본 반환
+        return {"favorites": {name: list(tickers) for name, tickers in _cache[1].items()}}
+
+
+def load_favorite_tickers() -> set:
+    """모든 즐겨찾기 그룹의 티커 합집합 (배치 작업의 우선 분석 대상)"""
+    tickers = set()
+    for group_tickers in load_favorites()["favorites"].values():
+        tickers.update(t.strip().upper() for t in group_tickers if t.strip())
+    return tickers
+
+
+def _write(func) -> bool:
+    """쓰기 트랜잭션 실행 (버전 증가 포함) 후 캐시 무효화 - 읽기 전용 모드면 False"""
+    if READ_ONLY:
+        return False
+
+    conn = sqlite3.connect(DB_FILE)
+    try:
+        # 읽기-수정-쓰기 사이에 다른 세션이 끼어들지 않도록 바로 쓰기 잠금
+        conn.execute('BEGIN IMMEDIATE')
+        changed = func(conn.cursor())
+        if changed:
+            bump_data_version(conn, 'favorites')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    invalidate_cache()
+    return changed
+
+
+def add_favorite_group(group_name: str) -> bool:
+    """새 즐겨찾기 그룹 추가 (이미 있으면 False)"""
+    if not group_name:
+        return False
+
+    def add(cursor):
+        cursor.execute('SELECT COALESCE(MAX(position), -1) + 1 FROM favorite_groups')
+        position = cursor.fetchone()[0]
+        cursor.execute(
+            'INSERT OR IGNORE INTO favorite_groups (name, position, updated_at) VALUES (?, ?, ?)',
+            (group_name, position, datetime.now().isoformat())
+        )
+        return cursor.rowcount > 0
+
+    return _write(add)
+
+
+def delete_favorite_group(group_name: str) -> bool:
+    """즐겨찾기 그룹과 소속 티커 삭제"""
+    def delete(cursor):
+        cursor.execute('DELETE FROM favorite_groups WHERE name = ?', (group_name,))
+        deleted = cursor.rowcount > 0
+        cursor.execute('DELETE FROM favorite_tickers WHERE group_name = ?', (group_name,))
+        return deleted
+
+    return _write(delete)
+
+
+def update_group_tickers(group_name: str, tickers: list) -> bool:
+    """그룹의 티커 리스트 교체 (그룹이 없으면 False)"""
+    def update(cursor):
+        cursor.execute(
+            'UPDATE favorite_groups SET updated_at = ? WHERE name = ?',
+            (datetime.now().isoformat(), group_name)
+        )
+        if cursor.rowcount == 0:
+            return False
+        cursor.execute('DELETE FROM favorite_tickers WHERE group_name = ?', (group_name,))
+        cursor.executemany(
+            'INSERT OR IGNORE INTO favorite_tickers (group_name, ticker, position) VALUES (?, ?, ?)',
+            [(group_name, ticker, i) for i, ticker in enumerate(tickers)]
+        )
+        return True
+
+    return _write(update)
+
+
+# DB 초기화
+if not READ_ONLY:
+    init_favorites_db()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+CNN 공포탐욕지수 저장소
+
+fear_greed 테이블에 일별 점수를 저장하고, 마지막 저장일 이후 데이터만 CNN에서
+받아 추가합니다. 거시경제 탭은 DB에서 읽으며, CNN 조회는 TTL이 지났을 때만
+짧은 타임아웃으로 시도하므로 CNN이 느리거나 실패해도 저장된 데이터로 표시됩니다.
+
+사용 예:
+    python3 fear_greed.py          # 새 데이터 가져오기 (TTL 무시)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from data_version import bump_data_version
+from db_snapshot import READ_ONLY, connect_read
+
+DB_FILE = "stock_data.db"
+
+FEAR_GREED_URL = "https://production.dataviz.cnn.io/index/fearandgreed/graphdata/"
+FEAR_GREED_TTL_SECONDS = int(os.getenv('FEAR_GREED_TTL_SECONDS', '1800'))
+FEAR_GREED_TIMEOUT = float(os.getenv('FEAR_GREED_TIMEOUT', '5'))
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+_last_refresh = 0.0
+_refresh_lock = threading.Lock()
+
+
+def init_fear_greed_table():
+    """CNN 공포탐욕지수 테이블 초기화 (app.py의 init_db와 동일한 스키마)"""
+    conn = sqlite3.connect(DB_FILE)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fear_greed (
+            date TEXT PRIMARY KEY,
+            score REAL,
+            rating TEXT
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def get_last_fear_greed_date():
+    """마지막 저장일 (없으면 None)"""
+    conn = sqlite3.connect(DB_FILE)
+    result = conn.execute('SELECT MAX(date) FROM fear_greed').fetchone()[0]
+    conn.close()
+    return result
+
+
+def fetch_fear_greed(since: str = None) -> dict:
+    """
+    CNN graphdata 조회
+
+    Args:
+        since: YYYY-MM-DD (지정하면 그 날짜 이후 데이터만 요청)
+    """
+    import requests
+
+    url = FEAR_GREED_URL + (since or '')
+    response = requests.get(url, headers=HEADERS, timeout=FEAR_GREED_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+def parse_fear_greed_points(data: dict) -> list:
+    """graphdata 응답 → [(날짜, 점수, 등급)] (같은 날짜는 마지막 값, 현재 점수 포함)"""
+    points = {}
+    for point in data.get('fear_and_greed_historical', {}).get('data', []):
+        date = datetime.fromtimestamp(point['x'] / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+        points[date] = (date, float(point['y']), point.get('rating'))
+
+    current = data.get('fear_and_greed') or {}
+    if current.get('score') is not None and current.get('timestamp'):
+        date = str(current['timestamp'])[:10]
+        points[date] = (date, float(current['score']), current.get('rating'))
+
+    return sorted(points.values())
+
+
+def save_fear_greed_points(points: list) -> int:
+    """점수 저장 (한 트랜잭션)"""
+    if not points:
+        return 0
+
+    conn = sqlite3.connect(DB_FILE)
+    conn.executemany(
+        'INSERT OR REPLACE INTO fear_greed (date, score, rating) VALUES (?, ?, ?)',
+        points
+    )
+    bump_data_version(conn, 'fear_greed')
+    conn.commit()
+    conn.close()
+    return len(points)
+
+
+def refresh_fear_greed(force: bool = False) -> int:
+    """
+    마지막 저장일 이후 데이터 가져와 저장
+
+    TTL(FEAR_GREED_TTL_SECONDS) 안에 이미 확인했으면 건너뜁니다.
+    마지막 저장일도 다시 받아 장중 값을 마감 값으로 교체합니다.
+
+    Returns:
+        저장한 행 수 (건너뛰거나 실패하면 0)
+    """
+    global _last_refresh
+
+    with _refresh_lock:
+        if not force and time.time() - _last_refresh < FEAR_GREED_TTL_SECONDS:
+            return 0
+        # 실패해도 TTL 동안은 다시 시도하지 않음 (느린 CNN 응답을 매 재실행마다 기다리지 않도록)
+        _last_refresh = time.time()
+
+    try:
+        data = fetch_fear_greed(since=get_last_fear_greed_date())
+        return save_fear_greed_points(parse_fear_greed_points(data))
+    except Exception as e:
+        print(f"CNN API Error: {e}")
+        return 0
+
+
+def load_fear_greed(start=None) -> pd.DataFrame:
+    """
+    저장된 공포탐욕지수 읽기
+
+    Returns:
+        DataFrame(Score, Rating, DatetimeIndex) - 날짜순
+    """
+    if isinstance(start, datetime):
+        start = start.strftime('%Y-%m-%d')
+
+    conn = connect_read()
+    df = pd.read_sql_query(
+        'SELECT date, score, rating FROM fear_greed WHERE date >= ? ORDER BY date',
+        conn,
+        params=(start or '',)
+    )
+    conn.close()
+
+    df['date'] = pd.to_datetime(df['date'])
+    return df.rename(columns={'score': 'Score', 'rating': 'Rating'}).set_index('date')
+
+
+# DB 초기화
+if not READ_ONLY:
+    init_fear_greed_table()
+
+
+if __name__ == "__main__":
+    saved = refresh_fear_greed(force=True)
+    print(f"✅ 공포탐욕지수 {saved}개 저장 (마지막 날짜: {get_last_fear_greed_date()})")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Plotly 차트 캐시
+
+데이터 버전과 기간으로 만든 키로 완성된 Figure를 저장해, 재실행 시 데이터가
+그대로면 슬라이싱/서브플롯 구성/스타일 적용 없이 바로 반환합니다.
+메모리는 직렬화 크기 기준 LRU로 제한하고, FIGURE_CACHE_DIR를 지정하면
+JSON으로도 저장해 프로세스 재시작 후에도 재사용합니다.
+
+환경변수:
+    FIGURE_CACHE_MAX_MB: 메모리 캐시 최대 크기 (기본값: 64)
+    FIGURE_CACHE_DIR: 디스크 캐시 디렉토리 (기본값: 없음 - 메모리만 사용)
+    FIGURE_CACHE_DISK_MAX_MB: 디스크 캐시 최대 크기 (기본값: 256)
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+FIGURE_CACHE_MAX_MB = float(os.getenv('FIGURE_CACHE_MAX_MB', '64'))
+FIGURE_CACHE_DIR = os.getenv('FIGURE_CACHE_DIR')
+FIGURE_CACHE_DISK_MAX_MB = float(os.getenv('FIGURE_CACHE_DISK_MAX_MB', '256'))
+
+
+class FigureCache:
+    """크기 제한 LRU Figure 캐시 (선택적 디스크 저장)"""
+
+    def __init__(self, max_bytes: int, disk_dir: str = None, disk_max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()   # key -> (figure, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def _prefix_name(prefix) -> str:
+        """키 앞부분을 파일명에 쓸 수 있는 문자열로 (예: ('chart', 'AAPL') -> chart_AAPL_)"""
+        return ''.join(
+            ''.join(c if c.isalnum() or c in '.-' else '-' for c in str(part)) + '_'
+            for part in prefix
+        )
+
+    def _key_name(self, key) -> str:
+        # 앞 두 요소(종류, 티커 등)를 파일명에 남겨 디스크에서도 접두사로 삭제할 수 있게 함
+        prefix = key[:2] if isinstance(key, tuple) else (key,)
+        return self._prefix_name(prefix) + hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+    def _disk_path(self, key) -> str:
+        return os.path.join(self.disk_dir, f"{self._key_name(key)}.json")
+
+    def get(self, key):
+        """캐시된 Figure (없으면 None)"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            import plotly.io as pio
+            try:
+                with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                    serialized = f.read()
+                figure = pio.from_json(serialized, skip_invalid=True)
+            except (OSError, ValueError):
+                figure = None
+            if figure is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._put_memory(key, figure, len(serialized))
+                return figure
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, figure):
+        """Figure 저장 (크기는 JSON 직렬화 길이로 계산)"""
+        serialized = figure.to_json()
+        self._put_memory(key, figure, len(serialized))
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp_path = f"{path}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(serialized)
+                os.replace(tmp_path, path)
+                self._prune_disk()
+            except OSError as e:
+                print(f"Figure cache write error: {e}")
+
+    def _put_memory(self, key, figure, size):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (figure, size)
+            self._bytes += size
+
+            # 오래 사용하지 않은 항목부터 제거 (방금 넣은 항목은 유지)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def _prune_disk(self):
+        """디스크 캐시가 최대 크기를 넘으면 오래된 파일부터 삭제"""
+        files = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith('.json'):
+                path = os.path.join(self.disk_dir, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def get_or_build(self, key, builder):
+        """캐시에 있으면 반환, 없으면 builder()로 만들어 저장"""
+        figure = self.get(key)
+        if figure is None:
+            figure = builder()
+            if figure is not None:
+                self.put(key, figure)
+        return figure
+
+    def invalidate(self, prefix=None):
+        """
+        캐시 항목 삭제 (메모리 + 디스크)
+
+        Args:
+            prefix: 키 앞부분 튜플 (예: ('chart', 'AAPL')), None이면 전체
+        """
+        prefix = tuple(prefix) if prefix is not None else ()
+        with self._lock:
+            for key in [k for k in self._entries
+                        if isinstance(k, tuple) and k[:len(prefix)] == prefix]:
+                self._bytes -= self._entries.pop(key)[1]
+
+        if self.disk_dir:
+            # 파일명에는 앞 두 요소만 남아 있으므로 그 범위까지만 비교
+            name_prefix = self._prefix_name(prefix[:2])
+            for name in os.listdir(self.disk_dir):
+                if name.endswith('.json') and name.startswith(name_prefix):
+                    os.remove(os.path.join(self.disk_dir, name))
+
+    def stats(self) -> dict:
+        """적중/실패 카운터와 현재 크기"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hit_ratio': (self.hits + self.disk_hits) / lookups if lookups else None
+            }
+
+
+# 프로세스 전체에서 공유하는 캐시
+figure_cache = FigureCache(
+    max_bytes=int(FIGURE_CACHE_MAX_MB * 1024 * 1024),
+    disk_dir=FIGURE_CACHE_DIR,
+    disk_max_bytes=int(FIGURE_CACHE_DISK_MAX_MB * 1024 * 1024)
+)
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+stock_data 누락 구간 찾기 및 묶음 보충
+
+증분 업데이트는 종목별 MAX(date) 이후만 받기 때문에, 중간에 실패한 실행이 남긴 구멍이나
+짧은 기간으로 추가된 종목의 부족한 과거 데이터는 채워지지 않습니다.
+
+1. 거래일 달력: 같은 시장(미국 / 한국 .KS·.KQ) 종목 중 그 날짜를 저장 기간에 포함하는
+   종목의 절반 이상이 봉을 가진 날짜 (저장된 데이터에서 경험적으로 계산)
+2. 종목별 누락: 요청 기간 시작 ~ 마지막 저장일 사이 달력 날짜 중 없는 날짜.
+   첫 저장일 이전(과거 부족분)은 달력이 없으므로 한 구간으로 봅니다.
+3. 구간 묶기: 연속된 누락 거래일을 한 구간으로, 사이의 저장된 봉이 GAP_MERGE_BARS개
+   이하인 구간은 합쳐 요청 수를 줄입니다. 같은 구간을 가진 종목끼리 한 번에 요청합니다.
+4. 받아온 데이터가 없는 구간(상장 전, 거래 정지 등)은 gap_checks에 기록해
+   GAP_RECHECK_DAYS 동안 다시 요청하지 않습니다.
+
+사용 예:
+    python3 gap_backfill.py --period 2y            # 누락 구간 보고
+    python3 gap_backfill.py --period 2y --fill     # 보충
+"""
+
+import argparse
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from db_snapshot import READ_ONLY
+from market_data import download
+from stock_cache import save_bars
+
+DB_FILE = "stock_data.db"
+
+CALENDAR_MIN_SHARE = 0.5      # 거래일로 볼 최소 보유 종목 비율
+GAP_MERGE_BARS = 5            # 이 개수 이하의 저장된 봉을 사이에 둔 구간은 합쳐서 요청
+HEAD_GAP_MIN_BDAYS = 3        # 과거 부족분이 이 영업일 수 미만이면 무시 (주말/휴일 경계)
+REQUEST_MERGE_DAYS = 7        # 시작일이 같고 종료일 차이가 이 일수 이내인 구간은 한 요청으로
+GAP_RECHECK_DAYS = int(os.getenv('GAP_RECHECK_DAYS', '30'))
+
+PERIOD_DAYS = {"1mo": 30, "3mo": 90, "6mo": 180, "1y": 365, "2y": 730}
+
+KRX_SUFFIXES = ('.KS', '.KQ')
+
+
+def init_gap_table():
+    """데이터가 없었던 요청 구간 기록 테이블 초기화"""
+    conn = sqlite3.connect(DB_FILE)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS gap_checks (
+            ticker TEXT,
+            start TEXT,
+            end TEXT,
+            checked_at TEXT,
+            PRIMARY KEY (ticker, start, end)
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def market_of(ticker: str) -> str:
+    return 'KRX' if ticker.endswith(KRX_SUFFIXES) else 'US'
+
+
+def load_stored_dates(tickers: list = None) -> pd.DataFrame:
+    """저장된 (ticker, date) 목록 (기본키만 읽음, tickers 미지정 시 전체)"""
+    conn = sqlite3.connect(DB_FILE)
+    query = 'SELECT ticker, date FROM stock_data'
+    params = []
+    if tickers:
+        query += f" WHERE ticker IN ({','.join('?' * len(tickers))})"
+        params = list(tickers)
+    df = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+    return df
+
+
+def build_trading_calendar(stored: pd.DataFrame = None) -> dict:
+    """
+    시장별 경험적 거래일 달력
+
+    Returns:
+        {'US': 정렬된 날짜 문자열 Index, 'KRX': ...}
+    """
+    if stored is None:
+        stored = load_stored_dates()
+    if stored.empty:
+        return {}
+
+    stored = stored.assign(market=stored['ticker'].map(market_of))
+    calendars = {}
+    for market, group in stored.groupby('market'):
+        present = group.groupby('date')['ticker'].nunique()
+        bounds = group.groupby('ticker')['date'].agg(['min', 'max'])
+        dates = present.index
+
+        # 날짜별로 그 날짜를 저장 기간(첫~마지막 저장일)에 포함하는 종목 수
+        starts = bounds['min'].value_counts().reindex(dates, fill_value=0).cumsum()
+        ends = bounds['max'].value_counts().reindex(dates, fill_value=0).cumsum().shift(fill_value=0)
+        covering = starts - ends
+
+        calendars[market] = dates[present >= CALENDAR_MIN_SHARE * covering]
+    return calendars
+
+
+def _recent_checks() -> dict:
+    """최근에 데이터가 없었던 구간 {티커: [(시작, 끝), ...]}"""
+    cutoff = (datetime.now() - timedelta(days=GAP_RECHECK_DAYS)).isoformat()
+    conn = sqlite3.connect(DB_FILE)
+    rows = conn.execute(
+        'SELECT ticker, start, end FROM gap_checks WHERE checked_at >= ?', (cutoff,)
+    ).fetchall()
+    conn.close()
+
+    checks = {}
+    for ticker, start, end in rows:
+        checks.setdefault(ticker, []).append((start, end))
+    return checks
+
+
+def find_gaps(tickers: list, period: str = "2y", calendars: dict = None) -> dict:
+    """
+    종목별 누락 구간
+
+    Args:
+        period: 있어야 할 기간 (오늘 기준)
+        calendars: build_trading_calendar() 결과 (여러 번 호출할 때 재사용)
+
+    Returns:
+        {티커: [(시작일, 종료일), ...]} - 양 끝 포함, 누락 없는 종목 제외
+    """
+    stored = load_stored_dates(tickers)
+    if calendars is None:
+        calendars = build_trading_calendar()
+
+    range_start = (datetime.now() - timedelta(days=PERIOD_DAYS.get(period, 365))).strftime('%Y-%m-%d')
+    skip = _recent_checks()
+
+    gaps = {}
+    for ticker, group in stored.groupby('ticker'):
+        dates = pd.Index(group['date']).sort_values()
+        first, last = dates[0], dates[-1]
+        calendar = calendars.get(market_of(ticker), pd.Index([]))
+
+        # 달력 위 누락 위치를 연속 구간으로 묶음 (사이 저장된 봉이 GAP_MERGE_BARS개 이하면 합침)
+        window = calendar[(calendar >= max(range_start, first)) & (calendar <= last)]
+        missing = np.flatnonzero(~window.isin(dates))
+        spans = []
+        if len(missing):
+            breaks = np.flatnonzero(np.diff(missing) > GAP_MERGE_BARS + 1) + 1
+            spans = [(window[part[0]], window[part[-1]]) for part in np.split(missing, breaks)]
+
+        # 첫 저장일 이전 부족분
+        if first > range_start:
+            head_end = (pd.Timestamp(first) - timedelta(days=1)).strftime('%Y-%m-%d')
+            if len(pd.bdate_range(range_start, head_end)) >= HEAD_GAP_MIN_BDAYS:
+                spans.insert(0, (range_start, head_end))
+
+        # 기간 시작일은 매일 바뀌므로, 확인했던 구간 안에 들어가는 구간이면 건너뜀
+        spans = [
+            (start, end) for start, end in spans
+            if not any(s <= start and end <= e for s, e in skip.get(ticker, []))
+        ]
+        if spans:
+            gaps[ticker] = spans
+
+    return gaps
+
+
+def plan_requests(gaps: dict) -> dict:
+    """
+    구간별 요청 목록 (같은 구간을 가진 종목끼리 한 요청)
+
+    시작일이 같고 종료일이 REQUEST_MERGE_DAYS 이내로 비슷한 구간(예: 첫 저장일이 며칠씩
+    다른 종목들의 과거 부족분)은 가장 늦은 종료일로 합쳐 한 번에 요청합니다.
+
+    Returns:
+        {(시작일, 종료일): [티커, ...]}
+    """
+    by_start = {}
+    for ticker, spans in gaps.items():
+        for start, end in spans:
+            by_start.setdefault(start, []).append((end, ticker))
+
+    requests = {}
+    for start, items in by_start.items():
+        cluster = []
+        for end, ticker in sorted(items):
+            if cluster and pd.Timestamp(end) - pd.Timestamp(cluster[0][0]) > timedelta(days=REQUEST_MERGE_DAYS):
+                requests[(start, cluster[-1][0])] = [t for _, t in cluster]
+                cluster = []
+            cluster.append((end, ticker))
+        requests[(start, cluster[-1][0])] = [t for _, t in cluster]
+    return requests
+
+
+def backfill_gaps(tickers: list, period: str = "2y", calendars: dict = None) -> dict:
+    """
+    누락 구간을 찾아 묶음 요청으로 보충 (저장은 한 트랜잭션)
+
+    Returns:
+        {'spans': 누락 구간 수, 'requests': 요청 수, 'bars': 저장한 봉 수, 'empty': 데이터 없던 구간 수}
+    """
+    gaps = find_gaps(tickers, period=period, calendars=calendars)
+    requests = plan_requests(gaps)
+
+    frames = {}
+    empty = []
+    requests_count = 0
+    for (start, end), group in requests.items():
+        # yfinance의 end는 미포함
+        end_exclusive = (pd.Timestamp(end) + timedelta(days=1)).strftime('%Y-%m-%d')
+        try:
+            fetched = download(group, start=start, end=end_exclusive)
+            requests_count += 1
+        except Exception as e:
+            print(f"  ⚠️  Gap download failed ({len(group)} tickers {start}~{end}): {str(e)[:80]}")
+            continue
+
+        for ticker in group:
+            df = fetched.get(ticker)
+            if df is not None:
+                df = df[(df.index >= start) & (df.index <= pd.Timestamp(end))]
+            if df is None or df.empty:
+                empty.append((ticker, start, end))
+                continue
+            frames[ticker] = pd.concat([frames[ticker], df]) if ticker in frames else df
+
+    bars = save_bars(frames)
+
+    if empty:
+        conn = sqlite3.connect(DB_FILE)
+        conn.executemany(
+            'INSERT OR REPLACE INTO gap_checks (ticker, start, end, checked_at) VALUES (?, ?, ?, ?)',
+            [(ticker, start, end, datetime.now().isoformat()) for ticker, start, end in empty]
+        )
+        conn.commit()
+        conn.close()
+
+    return {
+        'spans': sum(len(spans) for spans in gaps.values()),
+        'requests': requests_count,
+        'bars': bars,
+        'empty': len(empty)
+    }
+
+
+# DB 초기화
+if not READ_ONLY:
+    init_gap_table()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="stock_data 누락 구간 찾기 및 보충")
+    parser.add_argument('--period', default='2y', choices=list(PERIOD_DAYS), help='있어야 할 기간')
+    parser.add_argument('--tickers', nargs='+', help='대상 종목 (기본값: 저장된 전체 종목)')
+    parser.add_argument('--fill', action='store_true', help='누락 구간 다운로드 후 저장')
+    args = parser.parse_args()
+
+    tickers = args.tickers or sorted(load_stored_dates()['ticker'].unique())
+
+    if args.fill:
+        result = backfill_gaps(tickers, period=args.period)
+        print(f"✅ 누락 구간 {result['spans']}개 → 요청 {result['requests']}회, "
+              f"{result['bars']}봉 저장 (데이터 없음 {result['empty']}개)")
+        return
+
+    gaps = find_gaps(tickers, period=args.period)
+    requests = plan_requests(gaps)
+    print(f"📊 {len(tickers)}개 종목 중 {len(gaps)}개에 누락 구간 "
+          f"{sum(len(spans) for spans in gaps.values())}개 → 요청 {len(requests)}회로 보충 가능")
+    for (start, end), group in sorted(requests.items()):
+        names = ', '.join(group[:5]) + (f" 외 {len(group) - 5}개" if len(group) > 5 else '')
+        print(f"  {start} ~ {end}: {names}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+거시경제 지표 목록 및 macro_data 캐시
+
+지표는 MACRO_INDICATORS에 (저장 이름, 심볼, 표시 이름, 변환, 표시 범위)로 등록합니다.
+오래된 지표는 마지막 저장일이 같은 것끼리 묶어 한 번에 다운로드하고 한 트랜잭션으로
+저장하며, 화면에서는 모든 지표를 한 번의 쿼리로 읽습니다. 지표를 추가해도 요청 수는
+늘어나지 않습니다.
+
+사용 예:
+    python3 macro_indicators.py    # 전체 지표 새로고침 (TTL 무시)
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from data_version import bump_data_version
+from db_snapshot import READ_ONLY, connect_read
+from market_data import download
+
+DB_FILE = "stock_data.db"
+
+# 처음 저장할 때 가져오는 기간 (화면 조회 기간 중 가장 긴 2년)
+MACRO_HISTORY_PERIOD = "2y"
+
+# 같은 프로세스에서 다시 확인하기까지의 시간 (장중 재실행마다 다운로드하지 않도록)
+MACRO_REFRESH_TTL_SECONDS = 15 * 60
+
+# indicator: macro_data.indicator 값, transform: 읽을 때 Close에 적용, y_range: 고정 표시 범위 (None이면 자동)
+MACRO_INDICATORS = [
+    {'indicator': 'SP500', 'symbol': '^GSPC', 'label': 'S&P 500', 'group': '지수', 'unit': '$', 'transform': None, 'y_range': None},
+    {'indicator': 'VIX', 'symbol': '^VIX', 'label': 'VIX (변동성 지수)', 'group': '지수', 'unit': '', 'transform': None, 'y_range': None},
+    {'indicator': 'IRX', 'symbol': '^IRX', 'label': '미국 13주 국채 금리', 'group': '금리', 'unit': '%', 'transform': None, 'y_range': None},
+    {'indicator': 'TNX', 'symbol': '^TNX', 'label': '미국 10년 국채 금리', 'group': '금리', 'unit': '%', 'transform': None, 'y_range': None},
+    {'indicator': 'DXY', 'symbol': 'DX-Y.NYB', 'label': '달러 인덱스', 'group': '환율', 'unit': '', 'transform': None, 'y_range': None},
+    {'indicator': 'XLK', 'symbol': 'XLK', 'label': '기술 (XLK)', 'group': '섹터', 'unit': '$', 'transform': None, 'y_range': None},
+    {'indicator': 'XLF', 'symbol': 'XLF', 'label': '금융 (XLF)', 'group': '섹터', 'unit': '$', 'transform': None, 'y_range': None},
+    {'indicator': 'XLE', 'symbol': 'XLE', 'label': '에너지 (XLE)', 'group': '섹터', 'unit': '$', 'transform': None, 'y_range': None},
+    {'indicator': 'XLV', 'symbol': 'XLV', 'label': '헬스케어 (XLV)', 'group': '섹터', 'unit': '$', 'transform': None, 'y_range': None},
+    {'indicator': 'XLI', 'symbol': 'XLI', 'label': '산업재 (XLI)', 'group': '섹터', 'unit': '$', 'transform': None, 'y_range': None},
+    {'indicator': 'XLY', 'symbol': 'XLY', 'label': '경기소비재 (XLY)', 'group': '섹터', 'unit': '$', 'transform': None, 'y_range': None},
+    {'indicator': 'XLP', 'symbol': 'XLP', 'label': '필수소비재 (XLP)', 'group': '섹터', 'unit': '$', 'transform': None, 'y_range': None},
+    {'indicator': 'XLU', 'symbol': 'XLU', 'label': '유틸리티 (XLU)', 'group': '섹터', 'unit': '$', 'transform': None, 'y_range': None},
+]
+
+INDICATORS_BY_NAME = {item['indicator']: item for item in MACRO_INDICATORS}
+
+_last_refresh = 0.0
+_refresh_lock = threading.Lock()
+
+
+def init_macro_table():
+    """거시경제 지표 테이블 초기화 (app.py의 init_db와 동일한 스키마)"""
+    conn = sqlite3.connect(DB_FILE)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS macro_data (
+            indicator TEXT,
+            date TEXT,
+            value REAL,
+            PRIMARY KEY (indicator, date)
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def get_last_macro_dates() -> dict:
+    """지표별 마지막 저장일 (한 번의 쿼리)"""
+    conn = sqlite3.connect(DB_FILE)
+    rows = conn.execute('SELECT indicator, MAX(date) FROM macro_data GROUP BY indicator').fetchall()
+    conn.close()
+    return dict(rows)
+
+
+def refresh_macro_data(indicators: list = None, force: bool = False) -> dict:
+    """
+    오래된 지표만 묶음 다운로드 후 한 트랜잭션으로 저장
+
+    마지막 저장일이 같은 지표끼리 한 번에 요청하므로 보통 1회 요청으로 끝납니다.
+    마지막 저장일의 값도 다시 받아 장중 값을 종가로 교체합니다.
+
+    Args:
+        indicators: 지표 이름 리스트 (기본값: 전체)
+        force: True면 TTL 무시
+
+    Returns:
+        {'requests': 요청 수, 'rows': 저장한 행 수}
+    """
+    global _last_refresh
+
+    with _refresh_lock:
+        if not force and time.time() - _last_refresh < MACRO_REFRESH_TTL_SECONDS:
+            return {'requests': 0, 'rows': 0}
+        _last_refresh = time.time()
+
+    items = [INDICATORS_BY_NAME[name] for name in (indicators or INDICATORS_BY_NAME)]
+    last_dates = get_last_macro_dates()
+    today = datetime.now().strftime('%Y-%m-%d')
+
+    # 시작일별로 묶기 (None = 전체 기간)
+    groups = {}
+    for item in items:
+        start = last_dates.get(item['indicator'])
+        if start is not None and start >= today:
+            continue
+        groups.setdefault(start, []).append(item)
+
+    rows = []
+    requests_count = 0
+    for start, group in groups.items():
+        symbols = [item['symbol'] for item in group]
+        try:
+            if start is None:
+                frames = download(symbols, period=MACRO_HISTORY_PERIOD)
+            else:
+                frames = download(symbols, start=start)
+            requests_count += 1
+        except Exception as e:
+            print(f"  ⚠️  Macro download failed ({', '.join(symbols)}): {str(e)[:80]}")
+            continue
+
+        for item in group:
+            df = frames.get(item['symbol'])
+            if df is None:
+                continue
+            rows.extend(
+                (item['indicator'], date, float(close))
+                for date, close in zip(df.index.strftime('%Y-%m-%d'), df['Close'])
+            )
+
+    if rows:
+        conn = sqlite3.connect(DB_FILE)
+        conn.executemany(
+            'INSERT OR REPLACE INTO macro_data (indicator, date, value) VALUES (?, ?, ?)',
+            rows
+        )
+        bump_data_version(conn, 'macro_data')
+        conn.commit()
+        conn.close()
+
+    return {'requests': requests_count, 'rows': len(rows)}
+
+
+def load_macro_data(indicators: list = None, start=None) -> dict:
+    """
+    저장된 지표 읽기 (한 번의 쿼리, 등록된 변환 적용)
+
+    Args:
+        start: 이 날짜 이후만 (datetime 또는 YYYY-MM-DD)
+
+    Returns:
+        {지표 이름: DataFrame(Close, DatetimeIndex)} - 데이터 없는 지표 제외
+    """
+    names = list(indicators or INDICATORS_BY_NAME)
+    if isinstance(start, datetime):
+        start = start.strftime('%Y-%m-%d')
+
+    conn = connect_read()
+    placeholders = ','.join('?' * len(names))
+    df = pd.read_sql_query(f'''
+        SELECT indicator, date, value FROM macro_data
+        WHERE indicator IN ({placeholders}) AND date >= ?
+        ORDER BY indicator, date
+    ''', conn, params=names + [start or ''])
+    conn.close()
+
+    frames = {}
+    df['date'] = pd.to_datetime(df['date'])
+    for name, group in df.groupby('indicator', sort=False):
+        series = group.set_index('date')['value']
+        transform = INDICATORS_BY_NAME.get(name, {}).get('transform')
+        if transform:
+            series = transform(series)
+        frames[name] = series.to_frame('Close')
+    return frames
+
+
+# DB 초기화
+if not READ_ONLY:
+    init_macro_table()
+
+
+if __name__ == "__main__":
+    result = refresh_macro_data(force=True)
+    print(f"✅ 거시경제 지표 {result['rows']}행 저장 (요청 {result['requests']}회)")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+시장 데이터 제공자 선택
+
+yf.Ticker(...) 대신 get_ticker(...)를 사용하면 MARKET_DATA_PROVIDER 환경변수로
+실제 Yahoo Finance(yahoo, 기본값)와 오프라인 가짜 데이터(fake)를 전환할 수 있습니다.
+"""
+
+import os
+
+MARKET_DATA_PROVIDER = os.getenv('MARKET_DATA_PROVIDER', 'yahoo')
+
+
+def get_ticker(symbol: str):
+    """history()/info를 제공하는 티커 객체 반환"""
+    if MARKET_DATA_PROVIDER == 'fake':
+        from fake_services import FakeTicker
+        return FakeTicker(symbol)
+
+    import yfinance as yf
+    return yf.Ticker(symbol)
+
+
+def download(symbols: list, start=None, period: str = None, end=None) -> dict:
+    """
+    여러 종목 일봉을 한 번의 요청으로 가져오기
+
+    Args:
+        symbols: 티커 리스트
+        start: 시작일 (포함, 지정하면 period 무시)
+        period: 기간 (예: 6mo, 1y)
+        end: 종료일 (미포함, start와 함께 사용)
+
+    Returns:
+        {티커: DataFrame(Open, High, Low, Close, Volume, timezone 제거)} - 데이터 없는 종목 제외
+    """
+    if not symbols:
+        return {}
+
+    if MARKET_DATA_PROVIDER == 'fake':
+        from fake_services import fake_download
+        return fake_download(symbols, start=start, period=period, end=end)
+
+    import pandas as pd
+    import yfinance as yf
+
+    data = yf.download(
+        symbols,
+        start=start,
+        end=end,
+        period=None if start is not None else period,
+        group_by='ticker',
+        auto_adjust=True,
+        threads=True,
+        progress=False
+    )
+
+    frames = {}
+    for symbol in symbols:
+        if isinstance(data.columns, pd.MultiIndex):
+            if symbol not in data.columns.get_level_values(0):
+                continue
+            df = data[symbol]
+        else:
+            df = data
+
+        df = df.dropna(subset=['Close'])
+        if df.empty:
+            continue
+        if df.index.tz is not None:
+            df.index = df.index.tz_localize(None)
+        frames[symbol] = df[['Open', 'High', 'Low', 'Close', 'Volume']]
+
+    return frames
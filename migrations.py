@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+DB 스키마 마이그레이션 (PRAGMA user_version 기준)
+
+테이블은 각 모듈의 CREATE TABLE IF NOT EXISTS로만 만들어져 왔기 때문에 인덱스 추가나
+테이블 구조 변경을 할 수 없었습니다. MIGRATIONS에 (버전, 설명, 함수)를 순서대로 추가하면
+migrate()가 DB의 user_version 이후 항목만 각각 한 트랜잭션으로 적용합니다.
+app.py(init_db), perplexity_analyzer.py, daily_update.py의 초기화 함수가 호출하며,
+이미 최신이면 PRAGMA 한 번만 읽고 끝납니다.
+
+사용 예:
+    python3 migrations.py            # 대기 중인 마이그레이션 적용 + 상태
+    python3 migrations.py --check    # 주요 쿼리 실행 계획 확인
+    python3 migrations.py --analyze  # 통계 갱신 (ANALYZE)
+"""
+
+import argparse
+import sqlite3
+
+DB_FILE = "stock_data.db"
+
+
+class MigrationError(Exception):
+    """마이그레이션 검증 실패 (해당 마이그레이션은 롤백됨)"""
+
+
+# 자주 실행되는 쿼리: (이름, SQL, 파라미터, 허용되는 실행 계획 표시)
+# 'COVERING INDEX'/'PRIMARY KEY'(WITHOUT ROWID)는 테이블 행을 읽지 않는 인덱스 전용 조회
+HOT_QUERIES = [
+    ('종목별 마지막 날짜 (get_last_date)',
+     'SELECT MAX(date) FROM stock_data WHERE ticker = ?', ('AAPL',),
+     ('COVERING INDEX', 'PRIMARY KEY')),
+    ('여러 종목 마지막 날짜 (get_last_dates)',
+     'SELECT ticker, MAX(date) FROM stock_data WHERE ticker IN (?, ?) GROUP BY ticker', ('AAPL', 'MSFT'),
+     ('COVERING INDEX', 'PRIMARY KEY')),
+    ('전체 마지막 날짜 (get_data_version)',
+     'SELECT MAX(date) FROM stock_data', (),
+     ('COVERING INDEX',)),
+    ('날짜별 전 종목 종가',
+     'SELECT ticker, close FROM stock_data WHERE date = ?', ('2025-01-02',),
+     ('COVERING INDEX',)),
+    ('최근 분석 10개 (check_analysis_length)',
+     'SELECT ticker, date, analysis, created_at FROM perplexity_analysis ORDER BY created_at DESC LIMIT 10', (),
+     ('USING INDEX idx_perplexity_analysis_created_at',)),
+]
+
+
+def explain_hot_queries(conn) -> list:
+    """
+    주요 쿼리 실행 계획
+
+    Returns:
+        [(이름, 실행 계획 문자열, 통과 여부)] - 허용 표시가 있고 전체 스캔/임시 정렬이 없으면 통과
+    """
+    results = []
+    for name, sql, params, expected in HOT_QUERIES:
+        plan = ' / '.join(row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params))
+        ok = any(marker in plan for marker in expected) and 'TEMP B-TREE' not in plan
+        results.append((name, plan, ok))
+    return results
+
+
+def _assert_index_only(conn):
+    failed = [(name, plan) for name, plan, ok in explain_hot_queries(conn) if not ok]
+    if failed:
+        raise MigrationError('; '.join(f"{name}: {plan}" for name, plan in failed))
+
+
+def _columns(conn, table: str) -> list:
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+
+def migration_1_baseline(conn):
+    """기존 테이블 스키마 고정 + 주요 쿼리용 인덱스"""
+    # app.py init_db
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stock_data (
+            ticker TEXT, date TEXT, open REAL, high REAL, low REAL, close REAL, volume INTEGER,
+            PRIMARY KEY (ticker, date)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS macro_data (
+            indicator TEXT, date TEXT, value REAL,
+            PRIMARY KEY (indicator, date)
+        )
+    ''')
+    conn.execute('CREATE TABLE IF NOT EXISTS fear_greed (date TEXT PRIMARY KEY, score REAL, rating TEXT)')
+    conn.execute('CREATE TABLE IF NOT EXISTS fed_rate (date TEXT PRIMARY KEY, rate REAL)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stock_info (
+            ticker TEXT PRIMARY KEY, long_name TEXT, description TEXT, updated_at TEXT
+        )
+    ''')
+
+    # perplexity_analyzer.py
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS perplexity_analysis (
+            ticker TEXT, date TEXT, analysis TEXT, citations TEXT, created_at TEXT,
+            signal_type TEXT, reused_from TEXT,
+            PRIMARY KEY (ticker, date)
+        )
+    ''')
+    columns = _columns(conn, 'perplexity_analysis')
+    for column in ('signal_type', 'reused_from'):
+        if column not in columns:
+            conn.execute(f'ALTER TABLE perplexity_analysis ADD COLUMN {column} TEXT')
+
+    # daily_update.py
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS signal_state (
+            ticker TEXT PRIMARY KEY, last_signal_date TEXT, last_signal_type TEXT, last_checked TEXT
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS signal_events (
+            ticker TEXT, signal_date TEXT, signal_type TEXT, previous_date TEXT, detected_at TEXT,
+            PRIMARY KEY (ticker, signal_date)
+        )
+    ''')
+
+    # 날짜별 전 종목 조회/전체 MAX(date): 인덱스만으로 응답 (테이블을 읽지 않음)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_stock_data_date ON stock_data (date, ticker, close)')
+    # 최근 분석 목록 (정렬 없이 인덱스 역순 스캔 후 10행만 읽음)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_perplexity_analysis_created_at ON perplexity_analysis (created_at)')
+    # 보존 정책의 날짜 기준 삭제 (date < ?)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_perplexity_analysis_date ON perplexity_analysis (date)')
+    # 최근 시그널 변경 이력
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_signal_events_signal_date ON signal_events (signal_date)')
+
+    _assert_index_only(conn)
+
+
+def migration_2_stock_data_without_rowid(conn):
+    """
+    stock_data를 WITHOUT ROWID로 재구성
+
+    행이 (ticker, date) 기본키 B-트리에 직접 저장되어, 같은 키를 담던 별도 기본키
+    인덱스가 없어지고(약 30% 감소) 종목별 조회가 인덱스 한 번으로 끝납니다.
+    날짜는 모든 모듈이 문자열 비교/변환에 쓰므로 ISO TEXT(YYYY-MM-DD)를 유지합니다.
+    """
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'stock_data'").fetchone()
+    if 'WITHOUT ROWID' in row[0].upper():
+        return
+
+    # 테이블을 지우면 함께 지워지는 인덱스/트리거(changesets 등)는 다시 만듦
+    dependents = [sql for (sql,) in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = 'stock_data' AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+    )]
+
+    conn.execute('''
+        CREATE TABLE stock_data_new (
+            ticker TEXT NOT NULL,
+            date TEXT NOT NULL,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume INTEGER,
+            PRIMARY KEY (ticker, date)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        INSERT INTO stock_data_new (ticker, date, open, high, low, close, volume)
+        SELECT ticker, date, open, high, low, close, volume FROM stock_data
+        WHERE ticker IS NOT NULL AND date IS NOT NULL
+    ''')
+    conn.execute('DROP TABLE stock_data')
+    conn.execute('ALTER TABLE stock_data_new RENAME TO stock_data')
+    for sql in dependents:
+        conn.execute(sql)
+
+    _assert_index_only(conn)
+
+
+def migration_3_corporate_actions(conn):
+    """
+    수정 주가 다시 쓰기 기록 (corporate_actions.py)
+
+    changeset 트리거(init_change_log)가 설치되기 전에 있어야 첫 기록부터 읽는 쪽에 전달되므로
+    모듈 import 시점이 아니라 마이그레이션으로 만듭니다.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS corporate_actions (
+            id INTEGER PRIMARY KEY,
+            ticker TEXT,
+            check_date TEXT,
+            ratio REAL,
+            bars INTEGER,
+            rewritten_at TEXT
+        )
+    ''')
+
+
+def migration_4_analysis_signal_direction(conn):
+    """
+    분석 캐시에 마지막 교차 방향 저장 (1 골든크로스, -1 데드크로스)
+
+    재사용 판단을 상태 라벨(STRONG BUY/WARNING은 교차 방향과 반대 쪽에서 나옴)이 아니라
+    교차 방향으로 하기 위한 컬럼입니다. 기존 행은 NULL로 두어 재사용 원본이 되지 않습니다.
+    """
+    if 'signal_direction' not in _columns(conn, 'perplexity_analysis'):
+        conn.execute('ALTER TABLE perplexity_analysis ADD COLUMN signal_direction INTEGER')
+
+
+def migration_5_stock_data_writes(conn):
+    """
+    종목별 stock_data 쓰기 카운터 (트리거로 유지)
+
+    배열 저장소(ohlcv_blobs)가 배열을 만든 뒤 stock_data가 바뀌었는지 stock_data를 읽지 않고
+    한 행으로 확인하기 위한 테이블입니다. 트리거가 쓰는 경로(배열 저장소를 끈 프로세스,
+    changeset/Parquet 가져오기 등)와 관계없이 행이 바뀔 때마다 1씩 올립니다.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stock_data_writes (
+            ticker TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        INSERT OR IGNORE INTO stock_data_writes (ticker, version)
+        SELECT ticker, 1 FROM stock_data GROUP BY ticker
+    ''')
+    bump = '''
+        INSERT INTO stock_data_writes (ticker, version) VALUES ({row}.ticker, 1)
+        ON CONFLICT(ticker) DO UPDATE SET version = version + 1;
+    '''
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS stock_data_writes_insert AFTER INSERT ON stock_data
+        BEGIN {bump.format(row='NEW')} END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS stock_data_writes_update AFTER UPDATE ON stock_data
+        BEGIN {bump.format(row='NEW')} {bump.format(row='OLD')} END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS stock_data_writes_delete AFTER DELETE ON stock_data
+        BEGIN {bump.format(row='OLD')} END
+    ''')
+
+
+MIGRATIONS = [
+    (1, '기본 스키마 + 주요 쿼리 인덱스', migration_1_baseline),
+    (2, 'stock_data WITHOUT ROWID', migration_2_stock_data_without_rowid),
+    (3, 'corporate_actions 기록 테이블', migration_3_corporate_actions),
+    (4, 'perplexity_analysis 교차 방향 컬럼', migration_4_analysis_signal_direction),
+    (5, '종목별 stock_data 쓰기 카운터', migration_5_stock_data_writes),
+]
+
+
+def get_schema_version(conn) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(db_file: str = None) -> list:
+    """
+    대기 중인 마이그레이션 적용 (각각 한 트랜잭션, 적용 후 ANALYZE)
+
+    여러 프로세스가 동시에 호출해도 쓰기 잠금을 잡은 뒤 버전을 다시 확인하므로
+    같은 마이그레이션이 두 번 실행되지 않습니다.
+
+    Returns:
+        적용한 버전 리스트
+    """
+    conn = sqlite3.connect(db_file or DB_FILE, isolation_level=None)
+    latest = MIGRATIONS[-1][0]
+    if get_schema_version(conn) >= latest:
+        conn.close()
+        return []
+
+    applied = []
+    for version, description, func in MIGRATIONS:
+        conn.execute('BEGIN IMMEDIATE')
+        if get_schema_version(conn) >= version:
+            conn.execute('ROLLBACK')
+            continue
+        try:
+            func(conn)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            conn.close()
+            raise
+        print(f"🗄️  DB migration {version}: {description}")
+        applied.append(version)
+
+    if applied:
+        conn.execute('ANALYZE')
+    conn.close()
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DB 스키마 마이그레이션")
+    parser.add_argument('--check', action='store_true', help='주요 쿼리 실행 계획 확인')
+    parser.add_argument('--analyze', action='store_true', help='통계 갱신 (ANALYZE)')
+    args = parser.parse_args()
+
+    applied = migrate()
+    conn = sqlite3.connect(DB_FILE)
+    print(f"✅ 스키마 버전 {get_schema_version(conn)} (이번에 적용: {applied or '없음'})")
+
+    if args.analyze:
+        conn.execute('ANALYZE')
+        conn.commit()
+        print("📊 ANALYZE 완료")
+
+    if args.check:
+        for name, plan, ok in explain_hot_queries(conn):
+            print(f"  {'✅' if ok else '❌'} {name}: {plan}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+종목별 OHLCV 배열 저장소 (선택 기능)
+
+stock_data는 (티커, 날짜)마다 한 행을 TEXT 날짜와 함께 저장하고 읽을 때마다
+문자열 날짜를 변환합니다. 이 모듈은 종목마다 한 행에 연속된 배열을 BLOB으로
+저장합니다.
+
+    dates: int32 (1970-01-01 기준 일수)
+    open/high/low/close: float64 (STOCK_BLOB_PRICE_DTYPE=float32로 줄일 수 있음)
+    volume: int64
+
+새 봉은 SQL의 substr/|| 로 기존 배열 뒤에 붙이므로 기존 배열을 읽지 않고,
+종목 하나를 읽을 때는 한 행만 읽어 np.frombuffer로 복사 없이 배열을 만듭니다.
+
+STOCK_BLOB_STORE=1이면 stock_cache.save_bars가 같은 트랜잭션에서 이 테이블도
+갱신하고, load_stock_data가 이 테이블에서 읽습니다. stock_data는 그대로 유지되며
+(app.py 조회/분석, 누락 구간/수정 주가 확인, changeset이 모두 stock_data를 읽음)
+언제든 --build로 다시 만들 수 있습니다.
+
+DB 크기는 줄지 않습니다. 이 테이블은 stock_data 옆에 추가되는 읽기용 사본이므로
+켜면 DB가 stock_blobs 크기만큼 커집니다 (--report로 확인). 얻는 것은 배치 작업의
+종목별 읽기가 한 행으로 끝나는 것입니다.
+
+배열마다 만들 때의 stock_data 쓰기 카운터(stock_data_writes, migrations.py 5번 트리거)를
+source_version으로 기록합니다. 어느 경로로든 그 종목의 stock_data 행이 바뀌면 카운터가
+달라지므로, 읽을 때 카운터 한 행만 비교해 오래된 배열을 건너뜁니다.
+
+사용 예:
+    python3 ohlcv_blobs.py --build     # stock_data에서 전체 종목 배열 만들기
+    python3 ohlcv_blobs.py --report    # stock_data와 저장 크기 비교
+"""
+
+import argparse
+import os
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from db_snapshot import READ_ONLY, connect_read
+from migrations import migrate
+
+DB_FILE = "stock_data.db"
+
+BLOB_STORE_ENABLED = os.getenv('STOCK_BLOB_STORE', '0') == '1'
+PRICE_DTYPE = os.getenv('STOCK_BLOB_PRICE_DTYPE', 'float64')
+
+DATE_DTYPE = np.dtype('<i4')
+VOLUME_DTYPE = np.dtype('<i8')
+PRICE_FIELDS = ['open', 'high', 'low', 'close']
+COLUMN_NAMES = {'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'}
+
+
+def init_blob_table():
+    """배열 저장 테이블 초기화 (작은 컬럼을 앞에 두어 BLOB을 읽지 않고 확인 가능)"""
+    conn = sqlite3.connect(DB_FILE)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stock_blobs (
+            ticker TEXT PRIMARY KEY,
+            n INTEGER,
+            first_day INTEGER,
+            last_day INTEGER,
+            price_dtype TEXT,
+            dates BLOB,
+            open BLOB,
+            high BLOB,
+            low BLOB,
+            close BLOB,
+            volume BLOB,
+            source_version INTEGER
+        )
+    ''')
+
+    # 기존 DB에 새 컬럼 추가 (값이 없는 배열은 다음 저장 때 stock_data에서 다시 만듦)
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(stock_blobs)')]
+    if 'source_version' not in columns:
+        conn.execute('ALTER TABLE stock_blobs ADD COLUMN source_version INTEGER')
+    conn.commit()
+    conn.close()
+
+    # stock_data_writes 카운터와 트리거
+    migrate()
+
+
+def to_epoch_days(index) -> np.ndarray:
+    """날짜 인덱스 → int32 일수 배열"""
+    return pd.DatetimeIndex(index).values.astype('datetime64[D]').astype(DATE_DTYPE)
+
+
+def from_epoch_days(days: np.ndarray) -> pd.DatetimeIndex:
+    """int32 일수 배열 → DatetimeIndex"""
+    return pd.DatetimeIndex(days.astype('datetime64[D]').astype('datetime64[ns]'), name='date')
+
+
+def encode_frame(df: pd.DataFrame, price_dtype: str) -> dict:
+    """DataFrame(Open, High, Low, Close, Volume) → 필드별 배열 (날짜순, 같은 날짜는 마지막 값)"""
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+    dtype = np.dtype(price_dtype).newbyteorder('<')
+    arrays = {'dates': to_epoch_days(df.index)}
+    for field in PRICE_FIELDS:
+        arrays[field] = df[COLUMN_NAMES[field]].to_numpy(dtype=dtype)
+    arrays['volume'] = df['Volume'].fillna(0).to_numpy(dtype=VOLUME_DTYPE)
+    return arrays
+
+
+def decode_row(row) -> dict:
+    """(price_dtype, dates, open, high, low, close, volume) 행 → 필드별 배열 (복사 없음, 읽기 전용)"""
+    price_dtype = np.dtype(row[0]).newbyteorder('<')
+    arrays = {'dates': np.frombuffer(row[1], dtype=DATE_DTYPE)}
+    for field, blob in zip(PRICE_FIELDS, row[2:6]):
+        arrays[field] = np.frombuffer(blob, dtype=price_dtype)
+    arrays['volume'] = np.frombuffer(row[6], dtype=VOLUME_DTYPE)
+    return arrays
+
+
+def arrays_to_frame(arrays: dict, start_day: int = None) -> pd.DataFrame:
+    """필드별 배열 → DataFrame(Open, High, Low, Close, Volume, DatetimeIndex)"""
+    begin = 0 if start_day is None else int(np.searchsorted(arrays['dates'], start_day))
+    data = {COLUMN_NAMES[field]: arrays[field][begin:] for field in PRICE_FIELDS + ['volume']}
+    return pd.DataFrame(data, index=from_epoch_days(arrays['dates'][begin:]), copy=False)
+
+
+def _replace_row(conn, ticker: str, arrays: dict, price_dtype: str):
+    dates = arrays['dates']
+    conn.execute('''
+        INSERT OR REPLACE INTO stock_blobs
+            (ticker, n, first_day, last_day, price_dtype, dates, open, high, low, close, volume)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (ticker, len(dates), int(dates[0]), int(dates[-1]), price_dtype,
+          dates.tobytes(), *(arrays[field].tobytes() for field in PRICE_FIELDS),
+          arrays['volume'].tobytes()))
+
+
+def _append_tail(conn, ticker: str, keep: int, arrays: dict, price_dtype: str):
+    """앞의 keep개 봉을 남기고 새 봉을 붙임 (기존 배열은 SQL 안에서만 다룸)"""
+    itemsize = np.dtype(price_dtype).itemsize
+    sizes = [DATE_DTYPE.itemsize] + [itemsize] * len(PRICE_FIELDS) + [VOLUME_DTYPE.itemsize]
+    fields = ['dates'] + PRICE_FIELDS + ['volume']
+
+    assignments = ', '.join(f'{field} = CAST(substr({field}, 1, ?) || ? AS BLOB)' for field in fields)
+    params = []
+    for field, size in zip(fields, sizes):
+        params += [keep * size, arrays[field].tobytes()]
+
+    conn.execute(f'''
+        UPDATE stock_blobs SET {assignments},
+            n = ?, last_day = ?,
+            first_day = CASE WHEN ? = 0 THEN ? ELSE first_day END
+        WHERE ticker = ?
+    ''', params + [keep + len(arrays['dates']), int(arrays['dates'][-1]),
+                   keep, int(arrays['dates'][0]), ticker])
+
+
+def _stamp(conn, ticker: str):
+    """배열이 반영한 stock_data 쓰기 카운터 기록"""
+    conn.execute('''
+        UPDATE stock_blobs
+        SET source_version = (SELECT version FROM stock_data_writes WHERE ticker = ?)
+        WHERE ticker = ?
+    ''', (ticker, ticker))
+
+
+def stale_tickers(conn, tickers: list) -> set:
+    """
+    배열을 만든 뒤 stock_data가 바뀐 종목 (배열 저장소를 끈 채 쓴 봉, 가져오기 등)
+
+    stock_data에 쓰기 전에 호출해야 합니다. 쓰고 나면 이번 쓰기로도 카운터가 올라갑니다.
+    """
+    if not tickers:
+        return set()
+    placeholders = ','.join('?' * len(tickers))
+    rows = conn.execute(f'''
+        SELECT b.ticker FROM stock_blobs b
+        LEFT JOIN stock_data_writes w ON w.ticker = b.ticker
+        WHERE b.ticker IN ({placeholders})
+          AND (b.source_version IS NULL OR w.version IS NULL OR w.version != b.source_version)
+    ''', list(tickers)).fetchall()
+    return {ticker for (ticker,) in rows}
+
+
+def _read_stock_rows(conn, ticker: str) -> pd.DataFrame:
+    """stock_data의 한 종목 전체 (호출자의 연결로 읽음)"""
+    df = pd.read_sql_query(
+        'SELECT date, open, high, low, close, volume FROM stock_data WHERE ticker = ? ORDER BY date',
+        conn, params=(ticker,)
+    )
+    df['date'] = pd.to_datetime(df['date'])
+    return df.rename(columns=COLUMN_NAMES).set_index('date')
+
+
+def write_bars(conn, frames: dict, stale: set = frozenset()):
+    """
+    새 봉 반영 (호출자의 트랜잭션 안에서 실행, 커밋은 호출자가 함)
+
+    마지막 저장일 이후 봉이거나 최근 봉을 다시 받은 경우(보통의 일일 업데이트)는
+    배열 끝만 교체/추가합니다. 중간 날짜가 바뀌는 경우에만 한 종목을 다시 씁니다.
+    배열이 아직 없거나 오래된 종목은 stock_data 전체로 만들므로, 호출자는 같은
+    트랜잭션에서 stock_data에 먼저 써야 합니다.
+
+    Args:
+        conn: stock_data에 쓰는 sqlite3 연결
+        frames: {티커: DataFrame(Open, High, Low, Close, Volume)}
+        stale: stock_data에 쓰기 전에 구한 stale_tickers() 결과
+    """
+    for ticker, df in frames.items():
+        if df.empty:
+            continue
+        _write_ticker(conn, ticker, df, ticker in stale)
+        _stamp(conn, ticker)
+
+
+def _write_ticker(conn, ticker: str, df: pd.DataFrame, stale: bool):
+    row = conn.execute(
+        'SELECT n, last_day, price_dtype FROM stock_blobs WHERE ticker = ?', (ticker,)
+    ).fetchone()
+    price_dtype = row[2] if row else PRICE_DTYPE
+
+    if row is None or stale:
+        # 새 봉만으로 만들거나 오래된 배열에 붙이면 stock_data와 달라지므로 stock_data에서 만듦
+        _replace_row(conn, ticker, encode_frame(_read_stock_rows(conn, ticker), price_dtype), price_dtype)
+        return
+
+    new = encode_frame(df, price_dtype)
+    first_new = int(new['dates'][0])
+    n, last_day = row[0], row[1]
+    if first_new > last_day:
+        _append_tail(conn, ticker, n, new, price_dtype)
+        return
+
+    # 날짜 배열만 읽어 새 봉이 기존 배열의 끝부분을 모두 덮는지 확인
+    dates = np.frombuffer(
+        conn.execute('SELECT dates FROM stock_blobs WHERE ticker = ?', (ticker,)).fetchone()[0],
+        dtype=DATE_DTYPE
+    )
+    keep = int(np.searchsorted(dates, first_new))
+    if np.isin(dates[keep:], new['dates']).all():
+        _append_tail(conn, ticker, keep, new, price_dtype)
+        return
+
+    # 중간 날짜 변경 (누락 구간 채우기 등): 합쳐서 다시 쓰기
+    full = conn.execute('''
+        SELECT price_dtype, dates, open, high, low, close, volume
+        FROM stock_blobs WHERE ticker = ?
+    ''', (ticker,)).fetchone()
+    merged = pd.concat([arrays_to_frame(decode_row(full)), df[list(COLUMN_NAMES.values())]])
+    _replace_row(conn, ticker, encode_frame(merged, price_dtype), price_dtype)
+
+
+def delete_ticker(conn, ticker: str):
+    """종목 배열 삭제 (호출자의 트랜잭션 안에서 실행)"""
+    conn.execute('DELETE FROM stock_blobs WHERE ticker = ?', (ticker,))
+
+
+def load_ticker(ticker: str, start=None) -> pd.DataFrame:
+    """
+    한 종목 읽기 (한 행, 복사 없이 디코딩)
+
+    Returns:
+        DataFrame(Open, High, Low, Close, Volume, DatetimeIndex) - 없으면 None
+    """
+    return load_tickers([ticker], start=start).get(ticker)
+
+
+def load_tickers(tickers: list, start=None) -> dict:
+    """
+    여러 종목 읽기 (한 번의 쿼리, 종목당 한 행)
+
+    Args:
+        start: 이 날짜 이후만 (datetime 또는 YYYY-MM-DD)
+
+    Returns:
+        {티커: DataFrame(Open, High, Low, Close, Volume, DatetimeIndex)}
+        - 배열이 없거나 만든 뒤 stock_data가 바뀐 종목 제외 (호출자가 stock_data에서 읽음)
+    """
+    if not tickers:
+        return {}
+
+    start_day = None
+    if start is not None:
+        start_day = int(to_epoch_days([pd.Timestamp(start)])[0])
+
+    # 종목당 배열 한 행 + 쓰기 카운터 한 행 (stock_data는 읽지 않음)
+    conn = connect_read()
+    placeholders = ','.join('?' * len(tickers))
+    rows = conn.execute(f'''
+        SELECT b.ticker, price_dtype, dates, open, high, low, close, volume
+        FROM stock_blobs b
+        JOIN stock_data_writes w ON w.ticker = b.ticker AND w.version = b.source_version
+        WHERE b.ticker IN ({placeholders})
+    ''', list(tickers)).fetchall()
+    conn.close()
+
+    frames = {}
+    for row in rows:
+        df = arrays_to_frame(decode_row(row[1:]), start_day)
+        if not df.empty:
+            frames[row[0]] = df
+    return frames
+
+
+def build_blobs(tickers: list = None) -> int:
+    """
+    stock_data에서 배열 다시 만들기 (한 트랜잭션)
+
+    Args:
+        tickers: 대상 종목 (기본값: stock_data의 전체 종목)
+
+    Returns:
+        만든 종목 수
+    """
+    # 읽기부터 쓰기 잠금 안에서 해야 기록하는 카운터가 읽은 데이터와 맞음
+    conn = sqlite3.connect(DB_FILE, isolation_level=None)
+    conn.execute('BEGIN IMMEDIATE')
+    query = 'SELECT ticker, date, open, high, low, close, volume FROM stock_data'
+    params = []
+    if tickers:
+        query += f" WHERE ticker IN ({','.join('?' * len(tickers))})"
+        params = list(tickers)
+    df = pd.read_sql_query(query + ' ORDER BY ticker, date', conn, params=params)
+
+    df['date'] = pd.to_datetime(df['date'])
+    df = df.rename(columns=COLUMN_NAMES)
+
+    if tickers:
+        conn.executemany('DELETE FROM stock_blobs WHERE ticker = ?', [(t,) for t in tickers])
+    else:
+        conn.execute('DELETE FROM stock_blobs')
+    count = 0
+    for ticker, group in df.groupby('ticker', sort=False):
+        _replace_row(conn, ticker, encode_frame(group.set_index('date'), PRICE_DTYPE), PRICE_DTYPE)
+        _stamp(conn, ticker)
+        count += 1
+    conn.execute('COMMIT')
+    conn.close()
+    return count
+
+
+def size_report() -> dict:
+    """
+    stock_data(+ 기본키 인덱스)와 stock_blobs의 저장 크기 비교 (dbstat 기준, 바이트)
+
+    Returns:
+        {'rows': 행 수, 'row_bytes': ..., 'blob_tickers': 종목 수, 'blob_bars': 봉 수, 'blob_bytes': ...}
+    """
+    conn = sqlite3.connect(DB_FILE)
+    sizes = dict(conn.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name').fetchall())
+    rows = conn.execute('SELECT COUNT(*) FROM stock_data').fetchone()[0]
+    tickers, bars = conn.execute('SELECT COUNT(*), COALESCE(SUM(n), 0) FROM stock_blobs').fetchone()
+    conn.close()
+
+    return {
+        'rows': rows,
+        'row_bytes': sizes.get('stock_data', 0) + sizes.get('sqlite_autoindex_stock_data_1', 0),
+        'blob_tickers': tickers,
+        'blob_bars': bars,
+        'blob_bytes': sizes.get('stock_blobs', 0) + sizes.get('sqlite_autoindex_stock_blobs_1', 0)
+    }
+
+
+# DB 초기화
+if not READ_ONLY:
+    init_blob_table()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="종목별 OHLCV 배열 저장소")
+    parser.add_argument('--build', action='store_true', help='stock_data에서 배열 다시 만들기')
+    parser.add_argument('--tickers', nargs='+', help='대상 종목 (기본값: 전체)')
+    parser.add_argument('--report', action='store_true', help='저장 크기 비교')
+    args = parser.parse_args()
+
+    if args.build:
+        started = datetime.now()
+        count = build_blobs(args.tickers)
+        elapsed = (datetime.now() - started).total_seconds()
+        print(f"✅ {count}개 종목 배열 저장 ({elapsed:.1f}초, 가격 {PRICE_DTYPE})")
+
+    if args.report or not args.build:
+        report = size_report()
+        print(f"📊 stock_data: {report['rows']:,}행, {report['row_bytes'] / 1024:,.0f} KB")
+        print(f"📦 stock_blobs: {report['blob_tickers']}개 종목 / {report['blob_bars']:,}봉, "
+              f"{report['blob_bytes'] / 1024:,.0f} KB")
+        if report['row_bytes'] and report['blob_bytes']:
+            print(f"   크기 비율: {report['blob_bytes'] / report['row_bytes']:.0%}")
+            print(f"   stock_data는 그대로 유지되므로 DB는 {report['blob_bytes'] / 1024:,.0f} KB 커짐")
+
+
+if __name__ == "__main__":
+    main()
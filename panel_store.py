@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+전체 종목 일봉 패널 (메모리 맵 .npy)
+
+스크리닝/백테스트/시장 폭 통계처럼 전체 종목의 종가가 한 번에 필요한 작업용입니다.
+필드마다 [날짜, 티커] 2차원 float64 배열을 .npy 파일 하나로 저장하고(없는 값은 NaN),
+np.load(mmap_mode='r')로 열어 복사 없이 사용합니다. 같은 파일을 여는 프로세스들은
+운영체제 페이지 캐시를 공유합니다.
+
+    STOCK_PANEL_DIR/
+        CURRENT              # 현재 세대 디렉토리 이름과 유효한 날짜 행 수
+        gen-000012/
+            index.json       # 티커 목록, 필드, 생성 시각
+            dates.npy        # int32 (1970-01-01 기준 일수)
+            open.npy high.npy low.npy close.npy volume.npy
+
+세대마다 날짜 행을 PANEL_SPARE_ROWS개 더 잡아 NaN으로 채워둡니다. 보통의 일일 갱신처럼
+기존 종목에 마지막 날짜 이후 봉만 생기는 경우는 그 빈 행과 최근 봉 칸에 바로 쓰고,
+CURRENT의 행 수만 os.replace로 늘립니다. 이미 연 맵은 자기 행 수까지만 보므로 계속
+유효하지만, 다시 받은 최근 봉(장중 → 확정값)은 같은 자리에서 바뀌어 보입니다.
+
+새 종목, 중간 날짜, 빈 행 부족일 때는 전체 [날짜 x 티커] 배열 5개를 새로 만들어 새 세대
+디렉토리에 쓴 뒤 CURRENT를 바꿉니다. 이 경로는 패널 전체 크기만큼 메모리와 디스크 쓰기가
+들고, 새 세대부터 다시 빈 행이 생기므로 종목이 늘 때와 PANEL_SPARE_ROWS 거래일마다 한 번 생깁니다.
+
+STOCK_PANEL_DIR을 지정하면 stock_cache.save_bars가 저장할 때마다 queue_update()로
+반영합니다. daily_update는 실행 전체를 batched_updates()로 감싸 모든 묶음의 봉을 끝에서
+한 번에 반영합니다. 현재 세대 읽기 → 쓰기 → 발행은 스레드 잠금과 패널 디렉토리의
+파일 잠금(.lock) 안에서 하므로 cron과 대시보드가 동시에 써도 서로의 봉을 덮지 않습니다.
+
+사용 예:
+    python3 panel_store.py --build     # stock_data에서 패널 다시 만들기
+    python3 panel_store.py             # 현재 패널 정보
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: 프로세스 간 잠금 없이 스레드 잠금만 사용
+    fcntl = None
+
+DB_FILE = "stock_data.db"
+
+PANEL_DIR = os.getenv('STOCK_PANEL_DIR')
+PANEL_KEEP_GENERATIONS = 2    # 이전 세대를 열고 있는 프로세스를 위해 남겨둘 세대 수
+PANEL_SPARE_ROWS = 256        # 세대마다 미리 잡아두는 빈 날짜 행 (약 1년치 거래일)
+
+FIELDS = ['open', 'high', 'low', 'close', 'volume']
+COLUMN_NAMES = {'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'}
+
+# ((디렉토리, 세대 이름, 행 수), 패널) - 같은 프로세스에서는 세대나 행 수가 바뀔 때만 다시 엶
+_cached = (None, None)
+_cache_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+# flush_updates()가 반영할 봉 {티커: DataFrame} (이미 stock_data에 커밋된 값)
+_pending = {}
+_pending_lock = threading.Lock()
+_batch_depth = 0    # batched_updates() 중첩 수 (0이면 queue_update가 바로 반영)
+
+
+class Panel:
+    """한 세대의 패널 (필드 배열은 읽기 전용 메모리 맵)"""
+
+    def __init__(self, generation: str, tickers: list, days: np.ndarray, arrays: dict):
+        self.generation = generation
+        self.tickers = tickers
+        self.days = days
+        self.arrays = arrays
+        self.columns = {ticker: i for i, ticker in enumerate(tickers)}
+
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self.days.astype('datetime64[D]').astype('datetime64[ns]'), name='date')
+
+    def frame(self, field: str = 'close', tickers: list = None, start=None) -> pd.DataFrame:
+        """
+        필드 하나를 [날짜 x 티커] DataFrame으로 (tickers, start 미지정 시 복사 없음)
+
+        Args:
+            tickers: 대상 종목 (기본값: 전체, 패널에 없는 종목은 제외)
+            start: 이 날짜 이후만 (datetime 또는 YYYY-MM-DD)
+        """
+        array = self.arrays[field]
+        begin = 0
+        if start is not None:
+            begin = int(np.searchsorted(self.days, _to_day(start)))
+
+        if tickers is None:
+            columns = self.tickers
+            values = array[begin:]
+        else:
+            columns = [t for t in tickers if t in self.columns]
+            values = array[begin:, [self.columns[t] for t in columns]]
+
+        return pd.DataFrame(values, index=self.dates[begin:], columns=columns, copy=False)
+
+    def ticker_frame(self, ticker: str, start=None) -> pd.DataFrame:
+        """한 종목의 OHLCV (값이 없는 날짜 제외) - 없는 종목이면 None"""
+        if ticker not in self.columns:
+            return None
+        column = self.columns[ticker]
+        df = pd.DataFrame(
+            {COLUMN_NAMES[field]: self.arrays[field][:, column] for field in FIELDS},
+            index=self.dates
+        )
+        df = df[df['Close'].notna()]
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start)]
+        return df
+
+
+def _to_day(value) -> int:
+    return int(np.datetime64(pd.Timestamp(value).date(), 'D').astype(np.int64))
+
+
+def _read_current(panel_dir: str):
+    """CURRENT → (세대 이름, 유효한 날짜 행 수) - 행 수가 없는 이전 형식이면 None"""
+    try:
+        with open(os.path.join(panel_dir, 'CURRENT'), 'r', encoding='utf-8') as f:
+            parts = f.read().split()
+    except FileNotFoundError:
+        return None, None
+    if not parts:
+        return None, None
+    return parts[0], int(parts[1]) if len(parts) > 1 else None
+
+
+def _write_current(panel_dir: str, generation: str, rows: int):
+    tmp_path = os.path.join(panel_dir, 'CURRENT.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(f"{generation} {rows}")
+    os.replace(tmp_path, os.path.join(panel_dir, 'CURRENT'))
+
+
+def load_panel(panel_dir: str = None) -> Panel:
+    """
+    현재 세대 패널 열기 (같은 세대면 이미 연 맵을 재사용)
+
+    Returns:
+        Panel (패널이 없으면 None)
+    """
+    global _cached
+
+    panel_dir = panel_dir or PANEL_DIR
+    if not panel_dir:
+        return None
+
+    generation, rows = _read_current(panel_dir)
+    if generation is None:
+        return None
+
+    key = (panel_dir, generation, rows)
+    with _cache_lock:
+        if _cached[0] == key:
+            return _cached[1]
+
+    path = os.path.join(panel_dir, generation)
+    with open(os.path.join(path, 'index.json'), 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    if rows is None:
+        rows = index['rows']
+    # 빈 행(PANEL_SPARE_ROWS)은 제외하고 유효한 행까지만 보는 뷰
+    days = np.array(np.load(os.path.join(path, 'dates.npy'), mmap_mode='r')[:rows])
+    arrays = {
+        field: np.load(os.path.join(path, f'{field}.npy'), mmap_mode='r')[:rows]
+        for field in FIELDS
+    }
+    panel = Panel(generation, index['tickers'], days, arrays)
+
+    with _cache_lock:
+        _cached = (key, panel)
+    return panel
+
+
+def _publish(panel_dir: str, tickers: list, days: np.ndarray, arrays: dict) -> str:
+    """새 세대 디렉토리에 쓰고(빈 행 포함) CURRENT 교체, 오래된 세대 정리"""
+    os.makedirs(panel_dir, exist_ok=True)
+    current, _ = _read_current(panel_dir)
+    number = int(current.split('-')[1]) + 1 if current else 1
+    generation = f"gen-{number:06d}"
+    path = os.path.join(panel_dir, generation)
+    os.makedirs(path, exist_ok=True)
+
+    rows = len(days)
+    capacity = rows + PANEL_SPARE_ROWS
+    out = np.lib.format.open_memmap(os.path.join(path, 'dates.npy'), mode='w+', dtype=np.int32, shape=(capacity,))
+    out[:rows] = days
+    out[rows:] = 0
+    out.flush()
+    for field in FIELDS:
+        out = np.lib.format.open_memmap(
+            os.path.join(path, f'{field}.npy'), mode='w+', dtype=np.float64, shape=(capacity, len(tickers))
+        )
+        out[:rows] = arrays[field]
+        out[rows:] = np.nan
+        out.flush()
+    del out
+    with open(os.path.join(path, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump({'tickers': tickers, 'fields': FIELDS, 'rows': rows, 'capacity': capacity,
+                   'created_at': datetime.now().isoformat()}, f)
+
+    _write_current(panel_dir, generation, rows)
+
+    generations = sorted(name for name in os.listdir(panel_dir) if name.startswith('gen-'))
+    for name in generations[:-PANEL_KEEP_GENERATIONS]:
+        shutil.rmtree(os.path.join(panel_dir, name), ignore_errors=True)
+    return generation
+
+
+@contextmanager
+def _locked(panel_dir: str):
+    """같은 패널에 쓰는 스레드/프로세스 직렬화"""
+    with _write_lock:
+        os.makedirs(panel_dir, exist_ok=True)
+        with open(os.path.join(panel_dir, '.lock'), 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+
+def _build(panel_dir: str) -> str:
+    """stock_data 전체로 새 세대 만들기 (_locked 안에서 호출)"""
+    conn = sqlite3.connect(DB_FILE)
+    df = pd.read_sql_query(
+        'SELECT ticker, date, open, high, low, close, volume FROM stock_data ORDER BY ticker, date',
+        conn
+    )
+    conn.close()
+
+    df['date'] = pd.to_datetime(df['date'])
+    tickers = sorted(df['ticker'].unique())
+    dates = pd.DatetimeIndex(sorted(df['date'].unique()))
+    arrays = {
+        field: df.pivot(index='date', columns='ticker', values=field)
+                 .reindex(index=dates, columns=tickers).to_numpy(dtype=np.float64)
+        for field in FIELDS
+    }
+    days = dates.values.astype('datetime64[D]').astype(np.int32)
+    return _publish(panel_dir, tickers, days, arrays)
+
+
+def build_panel(panel_dir: str = None) -> str:
+    """
+    stock_data 전체로 패널 다시 만들기 (한 번의 쿼리)
+
+    모아둔 봉은 이미 stock_data에 있으므로 함께 비웁니다.
+
+    Returns:
+        새 세대 이름 (STOCK_PANEL_DIR 미지정이면 None)
+    """
+    panel_dir = panel_dir or PANEL_DIR
+    if not panel_dir:
+        return None
+
+    with _pending_lock:
+        _pending.clear()
+    with _locked(panel_dir):
+        return _build(panel_dir)
+
+
+def update_panel(frames: dict, panel_dir: str = None) -> str:
+    """
+    새 봉 반영 (보통 flush_updates()가 모아둔 봉으로 호출)
+
+    기존 종목의 마지막 날짜 이후 봉만 있으면 현재 세대의 빈 행에 바로 쓰고(_append),
+    새 종목/중간 날짜가 있거나 빈 행이 모자라면 축을 넓힌 새 세대를 만듭니다(_merge).
+    패널이 아직 없으면 stock_data로 처음부터 만듭니다. 현재 세대를 읽는 것부터 발행까지
+    잠금 안에서 하므로 다른 스레드/프로세스의 갱신을 잃지 않습니다.
+
+    Args:
+        frames: {티커: DataFrame(Open, High, Low, Close, Volume)}
+
+    Returns:
+        새 세대 이름 (STOCK_PANEL_DIR 미지정이거나 새 봉이 없으면 None)
+    """
+    panel_dir = panel_dir or PANEL_DIR
+    frames = {t: df for t, df in frames.items() if not df.empty}
+    if not panel_dir or not frames:
+        return None
+
+    with _locked(panel_dir):
+        panel = load_panel(panel_dir)
+        if panel is None:
+            return _build(panel_dir)
+        return _append(panel_dir, panel, frames) or _merge(panel_dir, panel, frames)
+
+
+def _frame_days(df: pd.DataFrame) -> np.ndarray:
+    return pd.DatetimeIndex(df.index).values.astype('datetime64[D]').astype(np.int32)
+
+
+def _append(panel_dir: str, panel: Panel, frames: dict) -> str:
+    """
+    현재 세대의 빈 행에 새 날짜를 바로 쓰기 (_locked 안에서 호출)
+
+    모든 종목이 패널에 있고 새 날짜가 모두 마지막 날짜 이후이며 빈 행이 남아 있을 때만
+    쓰고, 아니면 아무것도 쓰지 않고 None을 반환합니다 (호출자가 _merge로 새 세대를 만듦).
+    """
+    if any(ticker not in panel.columns for ticker in frames):
+        return None
+
+    frame_days = {ticker: _frame_days(df) for ticker, df in frames.items()}
+    new_days = np.setdiff1d(np.concatenate(list(frame_days.values())), panel.days)
+    if len(new_days) and len(panel.days) and new_days[0] <= panel.days[-1]:
+        return None
+
+    path = os.path.join(panel_dir, panel.generation)
+    dates_file = np.load(os.path.join(path, 'dates.npy'), mmap_mode='r+')
+    rows = len(panel.days)
+    total = rows + len(new_days)
+    if total > len(dates_file):
+        return None
+
+    days = np.concatenate([panel.days, new_days]).astype(np.int32)
+    for field in FIELDS:
+        out = np.load(os.path.join(path, f'{field}.npy'), mmap_mode='r+')
+        out[rows:total] = np.nan
+        for ticker, df in frames.items():
+            positions = np.searchsorted(days, frame_days[ticker])
+            out[positions, panel.columns[ticker]] = df[COLUMN_NAMES[field]].to_numpy(dtype=np.float64)
+        out.flush()
+    dates_file[rows:total] = new_days
+    dates_file.flush()
+
+    # 값을 모두 쓴 뒤 행 수를 늘리므로 읽는 쪽은 다 쓴 행만 봄
+    _write_current(panel_dir, panel.generation, total)
+    return panel.generation
+
+
+def _merge(panel_dir: str, panel: Panel, frames: dict) -> str:
+    """
+    현재 세대에 봉을 덮어쓴 새 세대 발행 (_locked 안에서 호출)
+
+    필드 5개의 [날짜 x 티커] 배열 전체를 새로 할당해 복사하고 새 디렉토리에 씁니다.
+    """
+    new_days = np.unique(np.concatenate([_frame_days(df) for df in frames.values()]))
+    days = np.union1d(panel.days, new_days).astype(np.int32)
+    tickers = sorted(set(panel.tickers) | set(frames))
+
+    # 기존 값을 새 축 위치로 복사
+    rows = np.searchsorted(days, panel.days)
+    columns = np.searchsorted(tickers, panel.tickers)
+    arrays = {}
+    for field in FIELDS:
+        array = np.full((len(days), len(tickers)), np.nan)
+        array[np.ix_(rows, columns)] = panel.arrays[field]
+        arrays[field] = array
+
+    for ticker, df in frames.items():
+        column = tickers.index(ticker)
+        positions = np.searchsorted(days, _frame_days(df))
+        for field in FIELDS:
+            arrays[field][positions, column] = df[COLUMN_NAMES[field]].to_numpy(dtype=np.float64)
+
+    return _publish(panel_dir, tickers, days, arrays)
+
+
+def _queue(frames: dict):
+    """_pending에 추가 (_pending_lock 안에서 호출, 같은 날짜는 나중 값)"""
+    for ticker, df in frames.items():
+        if df.empty:
+            continue
+        if ticker in _pending:
+            df = pd.concat([_pending[ticker], df])
+            df = df[~df.index.duplicated(keep='last')]
+        _pending[ticker] = df
+
+
+def queue_update(frames: dict):
+    """
+    저장한 봉 반영 (stock_cache.save_bars가 커밋 후 호출)
+
+    batched_updates() 안이면 블록이 끝날 때까지 모아두고, 아니면 바로 반영합니다.
+    반영에 실패하면 경고만 출력하고 봉은 다음 반영 때 다시 시도합니다.
+    """
+    with _pending_lock:
+        _queue(frames)
+        deferred = _batch_depth > 0
+    if not deferred:
+        _flush_quietly()
+
+
+@contextmanager
+def batched_updates():
+    """이 블록 안에서 저장한 봉을 모아두었다가 끝날 때 한 번에 반영 (daily_update 실행 단위)"""
+    global _batch_depth
+
+    with _pending_lock:
+        _batch_depth += 1
+    try:
+        yield
+    finally:
+        with _pending_lock:
+            _batch_depth -= 1
+            outermost = _batch_depth == 0
+        if outermost:
+            _flush_quietly()
+
+
+def flush_updates(panel_dir: str = None) -> str:
+    """
+    모아둔 봉을 한 세대로 반영
+
+    Returns:
+        새 세대 이름 (모아둔 봉이 없거나 STOCK_PANEL_DIR 미지정이면 None)
+    """
+    global _pending
+
+    panel_dir = panel_dir or PANEL_DIR
+    with _pending_lock:
+        frames, _pending = _pending, {}
+    if not panel_dir or not frames:
+        return None
+
+    try:
+        return update_panel(frames, panel_dir)
+    except Exception:
+        # 다음 flush에서 다시 시도 (그 사이 모인 봉이 더 최신)
+        with _pending_lock:
+            newer, _pending = _pending, {}
+            _queue(frames)
+            _queue(newer)
+        raise
+
+
+def _flush_quietly():
+    # 봉은 이미 stock_data에 커밋되었으므로 패널 실패로 저장/배치를 중단하지 않음
+    try:
+        flush_updates()
+    except Exception as e:
+        print(f"  ⚠️  Panel update failed: {str(e)[:80]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="전체 종목 일봉 패널 (메모리 맵)")
+    parser.add_argument('--build', action='store_true', help='stock_data에서 패널 다시 만들기')
+    parser.add_argument('--dir', default=PANEL_DIR, help='패널 디렉토리 (기본값: STOCK_PANEL_DIR)')
+    args = parser.parse_args()
+
+    if not args.dir:
+        print("❌ STOCK_PANEL_DIR 또는 --dir을 지정하세요.")
+        return
+
+    if args.build:
+        started = datetime.now()
+        generation = build_panel(args.dir)
+        elapsed = (datetime.now() - started).total_seconds()
+        print(f"✅ 패널 생성: {generation} ({elapsed:.1f}초)")
+
+    panel = load_panel(args.dir)
+    if panel is None:
+        print("⚠️  패널이 없습니다. --build로 만드세요.")
+        return
+
+    size = sum(array.nbytes for array in panel.arrays.values())
+    print(f"📊 {panel.generation}: {len(panel.tickers)}개 종목 x {len(panel.days)}일 "
+          f"({panel.dates[0].date()} ~ {panel.dates[-1].date()}), {size / 1024:,.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+캐시 DB ↔ Parquet 내보내기/가져오기
+
+stock_data.db 전체를 복사하지 않고도 데이터를 공유하거나 새 환경을 채울 수 있도록
+테이블을 Hive 형식으로 파티션된 Parquet(티커/지표별, 연도별)으로 내보내고
+다시 가져옵니다. pandas, DuckDB, Spark 등에서 SQLite 없이 바로 읽을 수 있습니다.
+
+    export_dir/
+        manifest.json
+        stock_data/ticker=AAPL/year=2025/....parquet
+        macro_data/indicator=VIX/year=2025/....parquet
+        signal_events/ticker=AAPL/year=2025/....parquet
+        perplexity_analysis/ticker=AAPL/year=2025/....parquet
+
+날짜 컬럼은 date 타입으로, AI 분석 본문/참고 자료는 압축을 풀어 문자열(참고 자료는
+JSON)로 저장합니다. 가져오기는 배치 단위 upsert를 한 트랜잭션으로 실행하며,
+stock_data는 stock_cache.save_bars를 거쳐 데이터 버전/배열 저장소/패널도 함께 갱신합니다.
+
+사용 예:
+    python3 parquet_io.py export parquet_export/
+    python3 parquet_io.py import parquet_export/ --tables stock_data macro_data
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+from data_version import bump_data_version
+
+DB_FILE = "stock_data.db"
+
+IMPORT_BATCH_SIZE = 5000
+
+# 테이블: (파티션 키 컬럼, 연도/date 타입 기준 컬럼, 기본키)
+TABLES = {
+    'stock_data': ('ticker', 'date', ('ticker', 'date')),
+    'macro_data': ('indicator', 'date', ('indicator', 'date')),
+    'signal_events': ('ticker', 'signal_date', ('ticker', 'signal_date')),
+    'perplexity_analysis': ('ticker', 'date', ('ticker', 'date')),
+}
+
+
+def _require_pyarrow():
+    """pyarrow 지연 import (내보내기/가져오기에서만 필요)"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("pyarrow가 필요합니다: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+
+def _has_table(conn, name: str) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone()
+    return row is not None
+
+
+def read_table(table: str) -> pd.DataFrame:
+    """내보낼 테이블 읽기 (AI 분석은 압축 해제)"""
+    conn = sqlite3.connect(DB_FILE)
+    if not _has_table(conn, table):
+        conn.close()
+        return pd.DataFrame()
+    df = pd.read_sql_query(f'SELECT * FROM {table}', conn)
+    conn.close()
+
+    if table == 'perplexity_analysis':
+        from perplexity_analyzer import decode_analysis_text, decode_citations
+        df['analysis'] = df['analysis'].map(decode_analysis_text)
+        df['citations'] = df['citations'].map(
+            lambda value: json.dumps(decode_citations(value), ensure_ascii=False)
+        )
+    return df
+
+
+def export_table(table: str, out_dir: str) -> int:
+    """
+    테이블 하나를 파티션된 Parquet으로 내보내기 (기존 내보내기 디렉토리는 교체)
+
+    Returns:
+        내보낸 행 수
+    """
+    pa, pq = _require_pyarrow()
+    partition_column, date_column, _ = TABLES[table]
+
+    df = read_table(table)
+    table_dir = os.path.join(out_dir, table)
+    if os.path.exists(table_dir):
+        shutil.rmtree(table_dir)
+    if df.empty:
+        return 0
+
+    df['year'] = df[date_column].str[:4].astype(int)
+    df[date_column] = pd.to_datetime(df[date_column]).dt.date
+
+    pq.write_to_dataset(
+        pa.Table.from_pandas(df, preserve_index=False),
+        root_path=table_dir,
+        partition_cols=[partition_column, 'year']
+    )
+    return len(df)
+
+
+def export_all(out_dir: str, tables: list = None) -> dict:
+    """
+    여러 테이블 내보내기 + manifest.json 기록
+
+    Returns:
+        {테이블: 행 수}
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    counts = {}
+    for table in tables or TABLES:
+        counts[table] = export_table(table, out_dir)
+        print(f"  📤 {table}: {counts[table]:,}행")
+
+    with open(os.path.join(out_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump({'exported_at': datetime.now().isoformat(), 'tables': counts}, f, indent=2)
+    return counts
+
+
+def read_export(table: str, in_dir: str) -> pd.DataFrame:
+    """내보낸 테이블 읽기 (파티션 컬럼 복원, 날짜는 YYYY-MM-DD 문자열로)"""
+    _, pq = _require_pyarrow()
+    partition_column, date_column, _ = TABLES[table]
+    table_dir = os.path.join(in_dir, table)
+    if not os.path.isdir(table_dir):
+        return pd.DataFrame()
+
+    df = pq.read_table(table_dir, partitioning='hive').to_pandas()
+    df = df.drop(columns=['year'], errors='ignore')
+    df[partition_column] = df[partition_column].astype(str)
+    df[date_column] = pd.to_datetime(df[date_column]).dt.strftime('%Y-%m-%d')
+    return df
+
+
+def _upsert_rows(conn, table: str, df: pd.DataFrame):
+    """배치 단위 upsert (호출자의 트랜잭션 안에서 실행)"""
+    _, _, key = TABLES[table]
+    columns = list(df.columns)
+    updates = ', '.join(f'{c} = excluded.{c}' for c in columns if c not in key)
+    sql = f'''
+        INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})
+        ON CONFLICT({', '.join(key)}) DO UPDATE SET {updates}
+    '''
+    df = df.astype(object).where(df.notna(), None)
+    rows = list(df.itertuples(index=False, name=None))
+    for i in range(0, len(rows), IMPORT_BATCH_SIZE):
+        conn.executemany(sql, rows[i:i + IMPORT_BATCH_SIZE])
+
+
+def import_table(table: str, in_dir: str) -> int:
+    """
+    내보낸 테이블 하나 가져오기 (한 트랜잭션)
+
+    Returns:
+        가져온 행 수
+    """
+    df = read_export(table, in_dir)
+    if df.empty:
+        return 0
+
+    if table == 'stock_data':
+        # 일봉은 공통 저장 경로 사용 (데이터 버전, 배열 저장소, 패널 함께 갱신)
+        from stock_cache import save_bars
+        df['date'] = pd.to_datetime(df['date'])
+        df = df.rename(columns={
+            'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'
+        })
+        frames = {ticker: group.drop(columns='ticker').set_index('date').sort_index()
+                  for ticker, group in df.groupby('ticker', sort=False)}
+        return save_bars(frames)
+
+    # 테이블 생성 (각 모듈의 init 함수가 import 시 실행됨)
+    if table == 'macro_data':
+        import macro_indicators  # noqa: F401
+    elif table == 'signal_events':
+        import daily_update  # noqa: F401
+    elif table == 'perplexity_analysis':
+        from perplexity_analyzer import encode_analysis_text, encode_citations
+        df['analysis'] = df['analysis'].map(encode_analysis_text)
+        df['citations'] = df['citations'].map(lambda value: encode_citations(json.loads(value or '[]')))
+
+    conn = sqlite3.connect(DB_FILE)
+    conn.execute('BEGIN IMMEDIATE')
+    _upsert_rows(conn, table, df)
+    if table == 'macro_data':
+        bump_data_version(conn, 'macro_data')
+    conn.commit()
+    conn.close()
+    return len(df)
+
+
+def import_all(in_dir: str, tables: list = None) -> dict:
+    """
+    여러 테이블 가져오기
+
+    Returns:
+        {테이블: 행 수}
+    """
+    counts = {}
+    for table in tables or TABLES:
+        counts[table] = import_table(table, in_dir)
+        print(f"  📥 {table}: {counts[table]:,}행")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="캐시 DB ↔ Parquet 내보내기/가져오기")
+    parser.add_argument('command', choices=['export', 'import'])
+    parser.add_argument('path', help='Parquet 디렉토리')
+    parser.add_argument('--tables', nargs='+', choices=list(TABLES), help='대상 테이블 (기본값: 전체)')
+    args = parser.parse_args()
+
+    started = datetime.now()
+    try:
+        if args.command == 'export':
+            print(f"📦 Parquet 내보내기 → {args.path}")
+            counts = export_all(args.path, args.tables)
+        else:
+            print(f"📦 Parquet 가져오기 ← {args.path}")
+            counts = import_all(args.path, args.tables)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return
+
+    elapsed = (datetime.now() - started).total_seconds()
+    print(f"✅ 완료: {sum(counts.values()):,}행 ({elapsed:.1f}초)")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,19 +3,44 @@
 Perplexity API를 사용한 주식 분석 모듈
 """
 
+import ast
+import json
 import os
 import requests
 import sqlite3
-from datetime import datetime
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
 from typing import Optional
 from dotenv import load_dotenv
 
+from api_metrics import (
+    OUTCOME_CACHED,
+    OUTCOME_ERROR,
+    OUTCOME_FRESH,
+    OUTCOME_REUSED,
+    classify_error,
+    record_api_call,
+)
+from db_snapshot import READ_ONLY, connect_read
+from migrations import migrate
+
 # .env 파일 로드
 load_dotenv()
 
 # 데이터베이스 파일
 DB_FILE = "stock_data.db"
 
+# 같은 종목의 기존 분석을 재사용할 수 있는 날짜 범위 (일, 0이면 재사용 안 함)
+ANALYSIS_REUSE_WINDOW_DAYS = int(os.getenv('ANALYSIS_REUSE_WINDOW_DAYS', '7'))
+
+# 재시도 대상 HTTP 상태 코드
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+# 분석 본문과 참고 자료를 zlib으로 압축 저장 (기존 평문 행도 그대로 읽음)
+ANALYSIS_CACHE_COMPRESS = os.getenv('ANALYSIS_CACHE_COMPRESS', '1') == '1'
+
 
 def init_analysis_cache_db():
     """분석 결과 캐시 테이블 초기화"""
@@ -29,21 +54,64 @@ def init_analysis_cache_db():
             analysis TEXT,
             citations TEXT,
             created_at TEXT,
+            signal_type TEXT,
+            reused_from TEXT,
             PRIMARY KEY (ticker, date)
         )
     ''')
 
+    # 기존 DB에 새 컬럼 추가
+    cursor.execute('PRAGMA table_info(perplexity_analysis)')
+    columns = [row[1] for row in cursor.fetchall()]
+    for column in ('signal_type', 'reused_from'):
+        if column not in columns:
+            cursor.execute(f'ALTER TABLE perplexity_analysis ADD COLUMN {column} TEXT')
+
     conn.commit()
     conn.close()
 
+    # 인덱스/스키마 변경은 migrations.py에서 버전 관리
+    migrate()
+
+
+def encode_analysis_text(text: str):
+    """분석 본문을 저장용 값으로 변환 (압축 시 BLOB)"""
+    if ANALYSIS_CACHE_COMPRESS:
+        return zlib.compress(text.encode('utf-8'), 9)
+    return text
+
+
+def decode_analysis_text(value) -> str:
+    """저장된 분석 본문 복원 (BLOB이면 압축 해제)"""
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode('utf-8')
+    return value or ''
+
+
+def encode_citations(citations: list):
+    """참고 자료 목록을 저장용 값으로 변환 (압축 시 JSON BLOB)"""
+    if ANALYSIS_CACHE_COMPRESS:
+        return zlib.compress(json.dumps(citations, ensure_ascii=False).encode('utf-8'), 9)
+    return str(citations)
+
+
+def decode_citations(value) -> list:
+    """저장된 참고 자료 목록 복원"""
+    if not value:
+        return []
+    if isinstance(value, bytes):
+        return json.loads(zlib.decompress(value).decode('utf-8'))
+    # 압축 이전 형식: str(list)
+    return ast.literal_eval(value)
+
 
 def get_cached_analysis(ticker: str, date: str) -> Optional[dict]:
     """캐시된 분석 결과 가져오기"""
-    conn = sqlite3.connect(DB_FILE)
+    conn = connect_read()
     cursor = conn.cursor()
 
     cursor.execute('''
-        SELECT analysis, citations, created_at
+        SELECT analysis, citations, created_at, reused_from
         FROM perplexity_analysis
         WHERE ticker = ? AND date = ?
     ''', (ticker, date))
@@ -56,25 +124,101 @@ def get_cached_analysis(ticker: str, date: str) -> Optional[dict]:
             'success': True,
             'ticker': ticker,
             'date': date,
-            'analysis': result[0],
-            'citations': eval(result[1]) if result[1] else [],
+            'analysis': decode_analysis_text(result[0]),
+            'citations': decode_citations(result[1]),
             'cached': True,
+            'reused': result[3] is not None,
+            'reused_from': result[3],
             'timestamp': result[2]
         }
 
     return None
 
 
-def save_analysis_to_cache(ticker: str, date: str, analysis: str, citations: list):
-    """분석 결과를 캐시에 저장"""
+def find_reusable_analysis(
+    ticker: str,
+    date: str,
+    signal_direction: Optional[int] = None,
+    window_days: int = ANALYSIS_REUSE_WINDOW_DAYS
+) -> Optional[dict]:
+    """
+    날짜 범위 안에서 재사용 가능한 기존 분석 찾기
+
+    같은 종목, ±window_days 이내, 같은 교차 방향(signal_direction)으로 새로 조회한 분석 중
+    날짜가 가장 가까운 것을 반환합니다. 재사용된 분석은 다시 재사용하지 않으며,
+    방향이 기록되지 않은 분석(이전 버전에서 저장)은 재사용하지 않습니다.
+
+    방향은 상태 라벨이 아니라 마지막 교차로 정합니다. STRONG BUY는 MA5 < MA20(데드크로스 이후),
+    WARNING은 MA5 > MA20(골든크로스 이후)일 때만 나오므로 라벨로는 방향을 알 수 없습니다.
+    """
+    if window_days <= 0 or signal_direction is None:
+        return None
+
+    target = datetime.strptime(date, '%Y-%m-%d')
+    start = (target - timedelta(days=window_days)).strftime('%Y-%m-%d')
+    end = (target + timedelta(days=window_days)).strftime('%Y-%m-%d')
+
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        SELECT date, analysis, citations, created_at
+        FROM perplexity_analysis
+        WHERE ticker = ? AND date BETWEEN ? AND ? AND date != ?
+          AND reused_from IS NULL AND signal_direction = ?
+    ''', (ticker, start, end, date, int(signal_direction)))
+
+    candidates = cursor.fetchall()
+    conn.close()
+
+    if not candidates:
+        return None
+
+    source = min(
+        candidates,
+        key=lambda row: abs((datetime.strptime(row[0], '%Y-%m-%d') - target).days)
+    )
+
+    return {
+        'success': True,
+        'ticker': ticker,
+        'date': date,
+        'analysis': decode_analysis_text(source[1]),
+        'citations': decode_citations(source[2]),
+        'cached': True,
+        'reused': True,
+        'reused_from': source[0],
+        'timestamp': source[3]
+    }
+
+
+def save_analysis_to_cache(
+    ticker: str,
+    date: str,
+    analysis: str,
+    citations: list,
+    signal_type: Optional[str] = None,
+    reused_from: Optional[str] = None,
+    signal_direction: Optional[int] = None
+):
+    """
+    분석 결과를 캐시에 저장
+
+    reused_from: 재사용한 원본 분석 날짜
+    signal_direction: 마지막 교차 방향 (1 골든크로스, -1 데드크로스)
+    """
+    if signal_direction is not None:
+        signal_direction = int(signal_direction)
+
     conn = sqlite3.connect(DB_FILE)
     cursor = conn.cursor()
 
     cursor.execute('''
         INSERT OR REPLACE INTO perplexity_analysis
-        (ticker, date, analysis, citations, created_at)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (ticker, date, analysis, str(citations), datetime.now().isoformat()))
+        (ticker, date, analysis, citations, created_at, signal_type, reused_from, signal_direction)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (ticker, date, encode_analysis_text(analysis), encode_citations(citations),
+          datetime.now().isoformat(), signal_type, reused_from, signal_direction))
 
     conn.commit()
     conn.close()
@@ -83,12 +227,20 @@ def save_analysis_to_cache(ticker: str, date: str, analysis: str, citations: lis
 class StockAnalyzer:
     """Perplexity API를 사용한 주식 분석기"""
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        reuse_window_days: Optional[int] = None,
+        max_retries: int = 2
+    ):
         """
         초기화
 
         Args:
             api_key: Perplexity API 키 (없으면 환경변수에서 가져옴)
+            reuse_window_days: 기존 분석 재사용 날짜 범위
+                (없으면 ANALYSIS_REUSE_WINDOW_DAYS 환경변수 값, 0이면 재사용 안 함)
+            max_retries: 429/5xx/네트워크 오류 시 재시도 횟수
         """
         self.api_key = api_key or os.getenv('PERPLEXITY_API_KEY')
         if not self.api_key:
@@ -97,17 +249,42 @@ class StockAnalyzer:
                 "PERPLEXITY_API_KEY 환경변수를 설정하세요."
             )
 
-        self.base_url = "https://api.perplexity.ai/chat/completions"
+        if reuse_window_days is None:
+            reuse_window_days = ANALYSIS_REUSE_WINDOW_DAYS
+        self.reuse_window_days = reuse_window_days
+        self.max_retries = max_retries
+
+        # PERPLEXITY_API_URL: 오프라인 테스트 시 fake_services.py 서버 주소
+        self.base_url = os.getenv('PERPLEXITY_API_URL', "https://api.perplexity.ai/chat/completions")
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
 
+        # 같은 분석기로 여러 번 호출할 때 TCP/TLS 연결 재사용 (스레드별 세션)
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        현재 스레드의 HTTP 세션
+
+        requests.Session은 스레드 안전이 보장되지 않으므로, 파이프라인의 분석 워커처럼
+        여러 스레드가 같은 분석기를 쓸 때 스레드마다 세션을 따로 만듭니다.
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.headers)
+            self._local.session = session
+        return session
+
     def analyze_stock_price_movement(
         self,
         ticker: str,
         date: str,
-        signal_type: Optional[str] = None
+        signal_type: Optional[str] = None,
+        signal_direction: Optional[int] = None
     ) -> dict:
         """
         주식 가격 변동 이유 분석
@@ -116,15 +293,37 @@ class StockAnalyzer:
             ticker: 주식 티커 심볼 (예: AAPL, TSLA)
             date: 분석 날짜 (YYYY-MM-DD)
             signal_type: 시그널 타입 (BUY, SELL, STRONG BUY, WARNING)
+            signal_direction: 마지막 교차 방향 (1 골든크로스, -1 데드크로스, 없으면 재사용 안 함)
 
         Returns:
             분석 결과 딕셔너리
         """
+        start_time = time.perf_counter()
+
+        def elapsed_ms():
+            return (time.perf_counter() - start_time) * 1000
+
         # 캐시 확인
         cached = get_cached_analysis(ticker, date)
         if cached:
+            record_api_call(ticker, date, OUTCOME_CACHED, elapsed_ms())
             return cached
 
+        # 가까운 날짜의 같은 방향 분석 재사용
+        reusable = find_reusable_analysis(ticker, date, signal_direction, self.reuse_window_days)
+        if reusable:
+            save_analysis_to_cache(
+                ticker,
+                date,
+                reusable['analysis'],
+                reusable['citations'],
+                signal_type=signal_type,
+                reused_from=reusable['reused_from'],
+                signal_direction=signal_direction
+            )
+            record_api_call(ticker, date, OUTCOME_REUSED, elapsed_ms())
+            return reusable
+
         # 한국 주식 여부 확인
         is_korean = ticker.endswith('.KS') or ticker.endswith('.KQ')
 
@@ -150,13 +349,32 @@ class StockAnalyzer:
             "search_recency_filter": "month"
         }
 
+        retries = 0
+        http_status = None
+
         try:
-            response = requests.post(
-                self.base_url,
-                headers=self.headers,
-                json=payload,
-                timeout=60
-            )
+            while True:
+                try:
+                    response = self.session.post(
+                        self.base_url,
+                        json=payload,
+                        timeout=60
+                    )
+                except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+                    if retries >= self.max_retries:
+                        raise
+                    retries += 1
+                    time.sleep(2 ** retries)
+                    continue
+
+                http_status = response.status_code
+                if http_status in RETRYABLE_STATUS and retries < self.max_retries:
+                    retries += 1
+                    retry_after = response.headers.get('Retry-After', '')
+                    time.sleep(float(retry_after) if retry_after.isdigit() else 2 ** retries)
+                    continue
+                break
+
             response.raise_for_status()
 
             result = response.json()
@@ -168,12 +386,30 @@ class StockAnalyzer:
                     ticker,
                     date,
                     parsed_result['analysis'],
-                    parsed_result.get('citations', [])
+                    parsed_result.get('citations', []),
+                    signal_type=signal_type,
+                    signal_direction=signal_direction
+                )
+                record_api_call(
+                    ticker, date, OUTCOME_FRESH, elapsed_ms(),
+                    http_status=http_status, usage=result.get('usage'), retries=retries
+                )
+            else:
+                record_api_call(
+                    ticker, date, OUTCOME_ERROR, elapsed_ms(),
+                    http_status=http_status, usage=result.get('usage'), retries=retries,
+                    error_class='parse_error'
                 )
 
             return parsed_result
 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, ValueError) as e:
+            error_status = http_status if http_status and http_status >= 400 else None
+            record_api_call(
+                ticker, date, OUTCOME_ERROR, elapsed_ms(),
+                http_status=http_status, retries=retries,
+                error_class=classify_error(e, error_status)
+            )
             return {
                 "success": False,
                 "ticker": ticker,
@@ -248,6 +484,7 @@ Answer in Korean.
                 "analysis": content,
                 "citations": citations,
                 "cached": False,
+                "reused": False,
                 "timestamp": datetime.now().isoformat()
             }
         except (KeyError, IndexError) as e:
@@ -262,4 +499,5 @@ Answer in Korean.
 
 
 # DB 초기화
-init_analysis_cache_db()
+if not READ_ONLY:
+    init_analysis_cache_db()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Bounded-queue stage pipeline
+
+Each stage runs its own worker threads and passes items to the next stage
+through a bounded queue, so throughput is set by the slowest stage rather
+than by the sum of all stages. Per-stage timing is collected for run
+summaries.
+"""
+
+import itertools
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class Stage:
+    """
+    One pipeline stage
+
+    Args:
+        name: label used in the timing summary
+        func: func(item, emit) - call emit(x) zero or more times to pass items downstream
+        workers: number of worker threads
+        maxsize: capacity of this stage's input queue (0 = unbounded)
+        priority: optional key(item) -> sortable; lower values are processed first
+    """
+
+    def __init__(self, name, func, workers=1, maxsize=0, priority=None):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.priority = priority
+        self.inbox = queue.PriorityQueue(maxsize) if priority else queue.Queue(maxsize)
+        self.next_stage = None
+
+        self.items = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.first_start = None
+        self.last_end = None
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._finished_workers = 0
+
+    def put(self, item):
+        if self.priority:
+            key = float('inf') if item is _DONE else self.priority(item)
+            self.inbox.put((key, next(self._seq), item))
+        else:
+            self.inbox.put(item)
+
+    def _get(self):
+        item = self.inbox.get()
+        return item[2] if self.priority else item
+
+    def _emit(self, item):
+        if self.next_stage is not None:
+            self.next_stage.put(item)
+
+    def _worker(self):
+        while True:
+            item = self._get()
+            if item is _DONE:
+                with self._lock:
+                    self._finished_workers += 1
+                    last = self._finished_workers == self.workers
+                if last:
+                    self._emit(_DONE)
+                else:
+                    # let sibling workers see the end marker too
+                    self.put(_DONE)
+                return
+
+            start = time.perf_counter()
+            try:
+                self.func(item, self._emit)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                print(f"  ❌ [{self.name}] {str(e)[:80]}")
+            end = time.perf_counter()
+
+            with self._lock:
+                self.items += 1
+                self.busy += end - start
+                self.first_start = start if self.first_start is None else min(self.first_start, start)
+                self.last_end = end if self.last_end is None else max(self.last_end, end)
+
+    def start(self):
+        threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def stats(self):
+        wall = (self.last_end - self.first_start) if self.first_start is not None else 0.0
+        return {
+            'stage': self.name,
+            'workers': self.workers,
+            'items': self.items,
+            'errors': self.errors,
+            'busy': self.busy,
+            'wall': wall
+        }
+
+
+class Pipeline:
+    """Chain of stages fed from an iterable"""
+
+    def __init__(self, stages):
+        self.stages = stages
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.next_stage = next_stage
+
+    def run(self, items):
+        """Feed items into the first stage and wait for every stage to drain"""
+        start = time.perf_counter()
+        threads = [t for stage in self.stages for t in stage.start()]
+
+        for item in items:
+            self.stages[0].put(item)
+        self.stages[0].put(_DONE)
+
+        for thread in threads:
+            thread.join()
+
+        self.elapsed = time.perf_counter() - start
+        return [stage.stats() for stage in self.stages]
+
+    def print_timing(self):
+        """Per-stage timing table"""
+        print(f"  {'Stage':<10}{'Workers':>8}{'Items':>7}{'Busy(s)':>10}{'Wall(s)':>10}")
+        for stats in (stage.stats() for stage in self.stages):
+            print(f"  {stats['stage']:<10}{stats['workers']:>8}{stats['items']:>7}"
+                  f"{stats['busy']:>10.1f}{stats['wall']:>10.1f}")
+        print(f"  {'Total':<10}{'':>8}{'':>7}{'':>10}{self.elapsed:>10.1f}")
+
+
+class RateLimiter:
+    """Minimum spacing between calls shared across threads"""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.min_interval
+        if wait_time > 0:
+            time.sleep(wait_time)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+스크립트 시작 시 import 비용 측정 (python -X importtime)
+
+대상 스크립트의 최상위 import 문만 뽑아 새 인터프리터에서 실행하고,
+모듈별 누적 import 시간을 정리합니다. 함수 안의 지연 import는 포함되지 않으므로
+--modules로 따로 측정해 비교할 수 있습니다.
+
+사용 예:
+    python3 profile_imports.py                      # app.py
+    python3 profile_imports.py daily_update.py --top 15
+    python3 profile_imports.py --modules plotly.graph_objects requests yfinance
+"""
+
+import ast
+import subprocess
+import sys
+
+
+def top_level_imports(script: str) -> list:
+    """스크립트의 최상위 import 문 (소스 문자열 리스트)"""
+    with open(script, 'r', encoding='utf-8') as f:
+        source = f.read()
+
+    tree = ast.parse(source)
+    return [
+        ast.get_source_segment(source, node)
+        for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+
+
+def _run_importtime(code: str):
+    """-X importtime으로 코드 실행 후 (stdout, [(모듈, self_us, cumulative_us, 최상위 여부)])"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True,
+        text=True
+    )
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # 들여쓰기 없는 항목 = 직접 import된 모듈 (하위 모듈 시간은 cumulative에 포함)
+        entries.append((name.strip(), int(self_us), int(cumulative_us), not name[1:].startswith(' ')))
+    return result.stdout, entries
+
+
+def measure_imports(statements: list) -> dict:
+    """
+    새 인터프리터에서 import 문 실행 후 -X importtime 결과 파싱
+
+    인터프리터 기동 시 로드되는 모듈(site, encodings 등)은 제외하고,
+    설치되지 않은 모듈은 건너뛰고 missing에 기록합니다.
+
+    Returns:
+        {'modules': [(모듈, self_us, cumulative_us), ...] (최상위 import만),
+         'all': 전체 모듈 리스트, 'total_us': 합계, 'missing': [...]}
+    """
+    code = '\n'.join(
+        f"try:\n    {stmt}\nexcept ImportError as e:\n    print('MISSING', {stmt!r}, e)"
+        for stmt in statements
+    )
+    _, baseline = _run_importtime('pass')
+    startup_modules = {name for name, _, _, _ in baseline}
+
+    stdout, entries = _run_importtime(code)
+    all_modules = [(name, self_us, cumulative_us)
+                   for name, self_us, cumulative_us, _ in entries if name not in startup_modules]
+    top_modules = [(name, self_us, cumulative_us)
+                   for name, self_us, cumulative_us, top in entries if top and name not in startup_modules]
+
+    missing = [line for line in stdout.splitlines() if line.startswith('MISSING')]
+
+    return {
+        'modules': top_modules,
+        'all': all_modules,
+        'total_us': sum(cumulative for _, _, cumulative in top_modules),
+        'missing': missing
+    }
+
+
+def print_profile(label: str, statements: list, top: int = 10):
+    """import 시간 리포트 출력"""
+    profile = measure_imports(statements)
+
+    print("="*80)
+    print(f"⏱️  Import 시간: {label}")
+    print("="*80)
+    print(f"\n합계: {profile['total_us'] / 1000:,.0f}ms ({len(profile['all'])}개 모듈 로드)")
+
+    print(f"\n{'모듈':<45}{'누적(ms)':>12}{'자체(ms)':>12}")
+    print("-" * 69)
+    for name, self_us, cumulative_us in sorted(profile['modules'], key=lambda x: -x[2])[:top]:
+        print(f"{name:<45}{cumulative_us / 1000:>12,.1f}{self_us / 1000:>12,.1f}")
+
+    if profile['missing']:
+        print("\n⚠️  설치되지 않아 측정하지 못한 import:")
+        for line in profile['missing']:
+            print(f"  - {line[len('MISSING '):]}")
+    print("="*80)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='스크립트 시작 시 import 비용 측정')
+    parser.add_argument('script', nargs='?', default='app.py', help='대상 스크립트 (기본값: app.py)')
+    parser.add_argument('--modules', nargs='+', help='스크립트 대신 지정한 모듈만 측정')
+    parser.add_argument('--top', type=int, default=10, help='표시할 모듈 수 (기본값: 10)')
+    args = parser.parse_args()
+
+    if args.modules:
+        print_profile(', '.join(args.modules), [f"import {m}" for m in args.modules], args.top)
+    else:
+        print_profile(args.script, top_level_imports(args.script), args.top)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+종목 목록용 스파크라인 (작은 SVG)
+
+stock_data에 저장된 최근 종가를 한 번의 쿼리로 읽어 종목별 SVG를 만들고,
+EMA5/EMA20 교차 지점(골든크로스 초록, 데드크로스 빨강)을 점으로 표시합니다.
+결과는 (티커, 마지막 봉 날짜) 기준으로 프로세스 메모리에 캐시되므로
+새 봉이 저장된 종목만 다시 만듭니다.
+"""
+
+import threading
+
+from db_snapshot import connect_read
+from stock_cache import get_last_dates
+
+SPARKLINE_POINTS = 40    # 표시할 최근 종가 수
+WARMUP_BARS = 40         # EMA20 안정화를 위해 추가로 읽는 봉 수
+WIDTH = 120
+HEIGHT = 28
+
+UP_COLOR = "#28a745"
+DOWN_COLOR = "#dc3545"
+
+# {티커: (마지막 봉 날짜, svg)}
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load_recent_closes(tickers: list, bars: int) -> dict:
+    """
+    종목별 최근 N개 종가 (한 번의 쿼리)
+
+    Returns:
+        {티커: [종가, ...]} - 오래된 날짜부터
+    """
+    if not tickers:
+        return {}
+
+    conn = connect_read()
+    placeholders = ','.join('?' * len(tickers))
+    rows = conn.execute(f'''
+        SELECT ticker, close FROM (
+            SELECT ticker, date, close,
+                   ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY date DESC) AS rn
+            FROM stock_data
+            WHERE ticker IN ({placeholders})
+        )
+        WHERE rn <= ?
+        ORDER BY ticker, date
+    ''', list(tickers) + [bars]).fetchall()
+    conn.close()
+
+    closes = {}
+    for ticker, close in rows:
+        if close is not None:
+            closes.setdefault(ticker, []).append(close)
+    return closes
+
+
+def ema(values: list, span: int) -> list:
+    """지수이동평균 (pandas ewm(span, adjust=False)와 같은 계산)"""
+    alpha = 2 / (span + 1)
+    result = []
+    for value in values:
+        result.append(value if not result else alpha * value + (1 - alpha) * result[-1])
+    return result
+
+
+def build_sparkline_svg(closes: list, points: int = SPARKLINE_POINTS) -> str:
+    """최근 종가 스파크라인 SVG (EMA5/EMA20 교차 지점 표시)"""
+    if len(closes) < 2:
+        return ''
+
+    ema5 = ema(closes, 5)
+    ema20 = ema(closes, 20)
+
+    shown = closes[-points:]
+    offset = len(closes) - len(shown)
+    low, high = min(shown), max(shown)
+    span = (high - low) or 1.0
+
+    def xy(i, value):
+        x = i * (WIDTH - 4) / (len(shown) - 1) + 2
+        y = HEIGHT - 2 - (value - low) * (HEIGHT - 4) / span
+        return f"{x:.1f},{y:.1f}"
+
+    line_color = UP_COLOR if shown[-1] >= shown[0] else DOWN_COLOR
+    polyline = ' '.join(xy(i, value) for i, value in enumerate(shown))
+
+    marks = []
+    for i in range(max(1, offset), len(closes)):
+        before = ema5[i - 1] - ema20[i - 1]
+        after = ema5[i] - ema20[i]
+        if before <= 0 < after or before >= 0 > after:
+            x, y = xy(i - offset, closes[i]).split(',')
+            color = UP_COLOR if after > 0 else DOWN_COLOR
+            marks.append(f'<circle cx="{x}" cy="{y}" r="2.5" fill="{color}"/>')
+
+    return (
+        f'<svg width="{WIDTH}" height="{HEIGHT}" viewBox="0 0 {WIDTH} {HEIGHT}" '
+        f'xmlns="http://www.w3.org/2000/svg">'
+        f'<polyline points="{polyline}" fill="none" stroke="{line_color}" stroke-width="1.5"/>'
+        f'{"".join(marks)}</svg>'
+    )
+
+
+def get_sparklines(tickers: list) -> dict:
+    """
+    여러 종목 스파크라인 (캐시 사용)
+
+    마지막 봉 날짜를 한 번에 확인하고, 캐시에 없거나 새 봉이 있는 종목만
+    한 번의 쿼리로 종가를 읽어 다시 만듭니다.
+
+    Returns:
+        {티커: svg} - 데이터 없는 종목 제외
+    """
+    last_dates = get_last_dates(tickers)
+
+    with _cache_lock:
+        stale = [t for t in last_dates if _cache.get(t, (None,))[0] != last_dates[t]]
+
+    if stale:
+        closes = load_recent_closes(stale, SPARKLINE_POINTS + WARMUP_BARS)
+        with _cache_lock:
+            for ticker in stale:
+                _cache[ticker] = (last_dates[ticker], build_sparkline_svg(closes.get(ticker, [])))
+
+    with _cache_lock:
+        return {t: _cache[t][1] for t in last_dates if t in _cache}
+
+
+def clear_sparkline_cache(ticker: str = None):
+    """스파크라인 캐시 비우기 (ticker 지정 시 해당 종목만)"""
+    with _cache_lock:
+        if ticker is None:
+            _cache.clear()
+        else:
+            _cache.pop(ticker, None)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+stock_data 테이블 기반 주가 캐시 (배치 작업용)
+
+app.py와 같은 stock_data 테이블을 사용하며, 종목별 마지막 저장일 이후의 일봉만
+한 번의 묶음 요청으로 가져와 저장합니다.
+"""
+
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+import corporate_actions
+import ohlcv_blobs
+import panel_store
+from changesets import init_change_log
+from data_version import bump_data_version
+from db_snapshot import connect_read
+from market_data import download
+
+DB_FILE = "stock_data.db"
+
+
+def init_stock_data_table():
+    """주식 데이터 테이블 초기화 (app.py의 init_db와 동일한 스키마)"""
+    conn = sqlite3.connect(DB_FILE)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stock_data (
+            ticker TEXT,
+            date TEXT,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume INTEGER,
+            PRIMARY KEY (ticker, date)
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+    # 내보내는 쪽이면 쓰기 전에 변경 기록 트리거 설치
+    init_change_log()
+
+
+def get_last_dates(tickers: list) -> dict:
+    """종목별 마지막 저장일 (한 번의 쿼리, 데이터 없는 종목은 제외)"""
+    if not tickers:
+        return {}
+
+    conn = connect_read()
+    placeholders = ','.join('?' * len(tickers))
+    rows = conn.execute(
+        f'SELECT ticker, MAX(date) FROM stock_data WHERE ticker IN ({placeholders}) GROUP BY ticker',
+        list(tickers)
+    ).fetchall()
+    conn.close()
+    return dict(rows)
+
+
+def save_bars(frames: dict) -> int:
+    """
+    일봉 저장 (한 트랜잭션)
+
+    Args:
+        frames: {티커: DataFrame(Open, High, Low, Close, Volume)}
+
+    Returns:
+        저장한 행 수
+    """
+    rows = []
+    for ticker, df in frames.items():
+        for date, row in zip(df.index.strftime('%Y-%m-%d'), df.itertuples(index=False)):
+            volume = int(row.Volume) if pd.notna(row.Volume) else 0
+            rows.append((ticker, date, float(row.Open), float(row.High), float(row.Low),
+                         float(row.Close), volume))
+
+    if not rows:
+        return 0
+
+    conn = sqlite3.connect(DB_FILE)
+    if ohlcv_blobs.BLOB_STORE_ENABLED:
+        # 배열 저장소를 끈 채 쓴 봉 등으로 이미 오래된 배열은 이어 붙이지 않고 다시 만듦
+        conn.execute('BEGIN IMMEDIATE')
+        stale = ohlcv_blobs.stale_tickers(conn, list(frames))
+    conn.executemany('''
+        INSERT OR REPLACE INTO stock_data (ticker, date, open, high, low, close, volume)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    if ohlcv_blobs.BLOB_STORE_ENABLED:
+        ohlcv_blobs.write_bars(conn, frames, stale)
+    bump_data_version(conn)
+    conn.commit()
+    conn.close()
+
+    # 패널은 DB 커밋 후 갱신 (daily_update 실행 중에는 모아서 끝에서 한 번에)
+    if panel_store.PANEL_DIR:
+        panel_store.queue_update(frames)
+
+    return len(rows)
+
+
+def update_stock_cache(tickers: list, period: str = "6mo") -> dict:
+    """
+    마지막 저장일 이후 일봉만 묶음으로 가져와 저장
+
+    최근 저장된 봉 몇 개(corporate_actions.OVERLAP_BARS)도 다시 받아 장중에 저장된 봉을
+    확정값으로 교체하고, 저장된 값과 비교해 분할/배당으로 수정 주가가 바뀐 종목은
+    전체 이력을 다시 씁니다. 시작일이 같은 종목끼리 한 번에 요청하므로 보통 1회 요청으로 끝납니다.
+    캐시에 없는 종목은 period 만큼 가져옵니다.
+
+    Returns:
+        {'tickers': 새 데이터가 있는 종목 수, 'bars': 저장한 봉 수, 'requests': 요청 수,
+         'missing': [...], 'adjusted': 이력을 다시 쓴 종목 리스트}
+    """
+    init_stock_data_table()
+    windows = corporate_actions.get_overlap_windows(tickers)
+    today = datetime.now().strftime('%Y-%m-%d')
+
+    # 시작일별로 묶기 (None = 전체 기간)
+    groups = {}
+    for ticker in tickers:
+        start, last = windows.get(ticker, (None, None))
+        if last is not None and last > today:
+            continue
+        groups.setdefault(start, []).append(ticker)
+
+    frames = {}
+    requests_count = 0
+    for start, group in groups.items():
+        try:
+            if start is None:
+                fetched = download(group, period=period)
+            else:
+                fetched = download(group, start=start)
+            requests_count += 1
+        except Exception as e:
+            print(f"  ⚠️  Download failed ({len(group)} tickers from {start or period}): {str(e)[:80]}")
+            continue
+        frames.update(fetched)
+
+    # 수정 주가가 바뀐 종목은 증분 저장 대신 전체 이력 교체
+    adjusted = corporate_actions.find_adjusted(frames, windows)
+    histories = {}
+    if adjusted:
+        for ticker, (check_date, ratio) in adjusted.items():
+            print(f"  🔁 {ticker}: Adjusted prices changed (close ratio {ratio:.4f} on {check_date}), rewriting history")
+        histories = corporate_actions.fetch_full_histories(list(adjusted))
+
+    bars = save_bars({t: df for t, df in frames.items() if t not in histories})
+    bars += corporate_actions.rewrite_histories(histories, adjusted)
+
+    return {
+        'tickers': len(frames),
+        'bars': bars,
+        'requests': requests_count,
+        'missing': [t for t in tickers if t not in frames and t not in windows],
+        'adjusted': sorted(histories)
+    }
+
+
+def load_stock_data(tickers: list, start=None) -> dict:
+    """
+    저장된 일봉 읽기 (한 번의 쿼리)
+
+    Args:
+        start: 이 날짜 이후만 (datetime 또는 YYYY-MM-DD)
+
+    Returns:
+        {티커: DataFrame(Open, High, Low, Close, Volume, DatetimeIndex)}
+    """
+    if not tickers:
+        return {}
+
+    if isinstance(start, datetime):
+        start = start.strftime('%Y-%m-%d')
+
+    # 배열 저장소를 쓰면 종목당 한 행만 읽고, 배열이 없는 종목만 stock_data에서 읽음
+    frames = {}
+    if ohlcv_blobs.BLOB_STORE_ENABLED:
+        frames = ohlcv_blobs.load_tickers(tickers, start=start)
+        tickers = [t for t in tickers if t not in frames]
+        if not tickers:
+            return frames
+
+    conn = connect_read()
+    placeholders = ','.join('?' * len(tickers))
+    query = f'''
+        SELECT ticker, date, open, high, low, close, volume FROM stock_data
+        WHERE ticker IN ({placeholders}) AND date >= ?
+        ORDER BY ticker, date
+    '''
+    df = pd.read_sql_query(query, conn, params=list(tickers) + [start or ''])
+    conn.close()
+
+    if df.empty:
+        return frames
+
+    df['date'] = pd.to_datetime(df['date'])
+    df = df.rename(columns={
+        'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'
+    })
+
+    for ticker, group in df.groupby('ticker', sort=False):
+        frames[ticker] = group.drop(columns='ticker').set_index('date')
+    return frames
+
@@ -4,16 +4,29 @@
 
 cd "$(dirname "$0")"
 
+# This DB is the changeset source: install change_log triggers before writing
+export CHANGESET_EXPORT=1
+
 echo "Starting daily update..."
 python3 daily_update.py
 
 if [ $? -eq 0 ]; then
     echo ""
-    echo "Update successful! Committing changes..."
-    git add stock_data.db
+    echo "Update successful! Compacting analysis cache..."
+    # Retention policy comes from ANALYSIS_RETENTION_DAYS / ANALYSIS_RETENTION_PER_TICKER
+    python3 analysis_cache_retention.py --compress --vacuum --report
+
+    echo ""
+    echo "Exporting changeset..."
+    # Only rows changed since the last export are committed; the app replays them at startup
+    python3 changesets.py export
+
+    echo ""
+    echo "Committing changes..."
+    git add changesets/
     git commit -m "Auto-update cache: $(date +'%Y-%m-%d %H:%M')"
     git push
-    echo "Done! Streamlit Cloud will auto-deploy the updated cache."
+    echo "Done! Streamlit Cloud will apply the new changeset on startup."
 else
     echo "Update failed. Check the logs above."
     exit 1